@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# settings desliga as conexões persistentes e troca o dashboard pela view async (DB_CONN_MODE)
+os.environ.setdefault("DJANGO_ASGI", "True")
 
 application = get_asgi_application()
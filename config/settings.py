@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
+from importlib.util import find_spec
 from pathlib import Path
 
 from django.conf.global_settings import DEFAULT_FROM_EMAIL
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy
 from dotenv import load_dotenv
 
@@ -25,8 +28,18 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-DATA_UPLOAD_MAX_MEMORY_SIZE = 20971520
-FILE_UPLOAD_MAX_MEMORY_SIZE = 20971520
+# Uploads acima de 2,5 MB vão pra arquivo temporário em disco em vez da RAM do worker.
+# Relatórios grandes usam o upload em partes (projeto_crm_final/uploads.py)
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+FILE_UPLOAD_HANDLERS = [
+    "projeto_crm_final.uploads.Sha256MemoryFileUploadHandler",
+    "projeto_crm_final.uploads.Sha256TemporaryFileUploadHandler",
+]
+
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1048576))        # bytes por parte (máx.)
+UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR', os.path.join(tempfile.gettempdir(), 'crm_uploads'))
+UPLOAD_EXPIRA_HORAS = int(os.getenv('UPLOAD_EXPIRA_HORAS', 24))         # uploads incompletos são descartados
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -57,11 +70,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "projeto_crm_final.metricas.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "projeto_crm_final.routers.ReplicaPinMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "projeto_crm_final.middleware.IntegranteMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -90,17 +106,99 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Conexões (DB_CONN_MODE):
+#   none       - uma conexão nova por request (handshake TCP + auth toda vez)
+#   persistent - cada worker reaproveita a conexão por DB_CONN_MAX_AGE segundos (padrão)
+#   pool       - pool do psycopg 3 por processo (só PostgreSQL; psycopg[binary,pool] do requirements.txt)
+# Com DB_REPLICA_HOST (ou DB_REPLICA_NAME) é criado o alias 'replica'; o que não for
+# definido com o prefixo DB_REPLICA_ vem das variáveis DB_ do primário.
+# No ASGI (config/asgi.py liga DJANGO_ASGI) 'persistent' vira 'none': cada thread do
+# sync_to_async seguraria uma conexão própria por CONN_MAX_AGE e esgotaria o max_connections
+# do banco. Conexões reaproveitadas no ASGI só com DB_CONN_MODE=pool.
+
+DJANGO_ASGI = os.getenv('DJANGO_ASGI', 'False') == 'True'
+DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'persistent')
+if DJANGO_ASGI and DB_CONN_MODE == 'persistent':
+    DB_CONN_MODE = 'none'
+
+
+def _database(prefix):
+    def env(name, default=None):
+        return os.getenv(f'{prefix}{name}', os.getenv(f'DB_{name}', default))
+
+    config = {
+        "ENGINE": env('ENGINE'),
+        "NAME": env('NAME'),
+        "USER": env('USER'),
+        "PASSWORD": env('PASSWORD'),
+        "HOST": env('HOST'),
+        "PORT": env('PORT'),
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": env('CONN_HEALTH_CHECKS', 'True') == 'True',
+        "OPTIONS": {},
+    }
+    if DB_CONN_MODE == 'pool' and 'postgresql' in (config['ENGINE'] or ''):
+        # o pool é do psycopg 3; instalado só com o psycopg2 o erro apareceria apenas na primeira conexão
+        if find_spec('psycopg') is None or find_spec('psycopg_pool') is None:
+            raise ImproperlyConfigured(
+                'DB_CONN_MODE=pool precisa do psycopg 3 com pool: pip install "psycopg[binary,pool]"'
+            )
+        config['OPTIONS']['pool'] = {
+            "min_size": int(env('POOL_MIN_SIZE', 2)),
+            "max_size": int(env('POOL_MAX_SIZE', 10)),
+            "timeout": int(env('POOL_TIMEOUT', 10)),
+        }
+    elif DB_CONN_MODE in ('persistent', 'pool'):
+        # pool não existe no SQLite; cai pra conexão persistente
+        config['CONN_MAX_AGE'] = int(env('CONN_MAX_AGE', 600))
+    return config
+
+
 DATABASES = {
+    "default": _database('DB_'),
+}
+
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = _database('DB_REPLICA_')
+    DATABASES['replica']['TEST'] = {"MIRROR": "default"}
+
+# Views com ReplicaReadMixin leem das réplicas; depois de uma escrita a sessão fica
+# REPLICA_STICKY_SECONDS lendo do primário (ver projeto_crm_final/routers.py)
+DATABASE_ROUTERS = ["projeto_crm_final.routers.ReplicaRouter"]
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local-memory por padrão; pra Redis use CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# e CACHE_LOCATION=redis://host:6379/0 (precisa do pacote redis)
+
+CACHES = {
     "default": {
-        "ENGINE": os.getenv('DB_ENGINE'),
-        "NAME": os.getenv('DB_NAME'),
-        "USER": os.getenv('DB_USER'),
-        "PASSWORD": os.getenv('DB_PASSWORD'),
-        "HOST": os.getenv('DB_HOST'),
-        "PORT": os.getenv('DB_PORT'),
+        "BACKEND": os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        "LOCATION": os.getenv('CACHE_LOCATION', 'projeto-crm'),
     }
 }
 
+# Tempo (s) que o perfil do usuário (equipe e projeto ativo) fica em cache; 0 desliga.
+# As invalidações (projeto_crm_final/cache.py) têm que chegar em todos os processos (workers do
+# gunicorn, run_workers, cron do sweep_deadlines), então o cache só liga com backend compartilhado
+# (Redis, Memcached, banco): no LocMemCache cada processo teria a sua cópia desatualizada.
+CACHE_COMPARTILHADO = not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+INTEGRANTE_CACHE_TIMEOUT = int(os.getenv('INTEGRANTE_CACHE_TIMEOUT', 300 if CACHE_COMPARTILHADO else 0))
+if INTEGRANTE_CACHE_TIMEOUT and not CACHE_COMPARTILHADO:
+    raise ImproperlyConfigured('INTEGRANTE_CACHE_TIMEOUT precisa de um CACHE_BACKEND compartilhado (ex.: Redis)')
+
+
+# Fila de jobs (projeto_crm_final/jobs.py, processada por manage.py run_workers)
+# JOBS_EAGER=True executa o job na hora, dentro do request (útil em dev sem worker rodando)
+
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
+JOBS_BACKOFF_BASE = int(os.getenv('JOBS_BACKOFF_BASE', 30))        # s, dobra a cada tentativa
+JOBS_BACKOFF_MAX = int(os.getenv('JOBS_BACKOFF_MAX', 3600))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', 600))                 # job 'running' há mais que isso volta pra fila
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,13 +220,63 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Email settings
 
-EMAIL_BACKEND=os.getenv('EMAIL_BACKEND')
-EMAIL_HOST=os.getenv('EMAIL_HOST')
-EMAIL_PORT=int(os.getenv('EMAIL_PORT'))
+# Sem EMAIL_BACKEND no .env os e-mails vão pro console; pra gravar em arquivo use
+# EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend e EMAIL_FILE_PATH
+EMAIL_BACKEND=os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH=os.getenv('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+EMAIL_HOST=os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT=int(os.getenv('EMAIL_PORT', 25))
 EMAIL_HOST_USER=os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD=os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS=os.getenv('EMAIL_USE_TLS')
 
+# Notificações são agrupadas por destinatário: o digest sai NOTIFICACOES_JANELA segundos
+# depois do primeiro evento pendente, numa única conexão SMTP pra todos os destinatários
+NOTIFICACOES_JANELA = int(os.getenv('NOTIFICACOES_JANELA', 900))
+
+# Métricas por request (projeto_crm_final/metricas.py): fração dos requests medidos em
+# detalhe (SQL, template), limite do log de lentos e header Server-Timing nos medidos
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.05))
+METRICS_SLOW_MS = int(os.getenv('METRICS_SLOW_MS', 1000))
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', str(DEBUG)) == 'True'
+METRICS_SLOW_LOG = os.getenv('METRICS_SLOW_LOG', os.path.join(tempfile.gettempdir(), 'crm_requests_lentos.log'))
+
+# Auditoria (projeto_crm_final/auditoria.py): as entradas ficam num buffer em memória e vão
+# pro banco num bulk_create a cada AUDIT_BUFFER_SIZE entradas ou AUDIT_FLUSH_SECONDS segundos
+# (0 desliga a thread de flush: só o limite de tamanho e a saída do processo gravam).
+# AUDIT_RETENCAO_MESES é o padrão do `manage.py particoes_audit --podar`
+AUDIT_BUFFER_SIZE = int(os.getenv('AUDIT_BUFFER_SIZE', 200))
+AUDIT_FLUSH_SECONDS = float(os.getenv('AUDIT_FLUSH_SECONDS', 5))
+AUDIT_RETENCAO_MESES = int(os.getenv('AUDIT_RETENCAO_MESES', 12))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'requests_lentos': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': METRICS_SLOW_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'projeto_crm_final.metricas': {
+            'handlers': ['console'],
+            'level': os.getenv('METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'projeto_crm_final.metricas.lentos': {
+            'handlers': ['requests_lentos'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 
 # Internationalization
@@ -22,19 +22,21 @@ PasswordResetConfirmView, PasswordResetCompleteView)
 from django.urls import path, reverse_lazy
 from django.views.decorators.http import require_POST
 
-from projeto_crm_final.views import SignUpView, HomeView, DashboardView, IntegrantesGetView, \
+from projeto_crm_final.views import SignUpView, HomeView, DashboardView, DashboardAsyncView, IntegrantesGetView, \
     UpdateRoleView, IntegrantesListaView, ProjetosCreateView, ProjetosUpdateView, ProjetosView, ProjetosGetView, \
     ProjetosDeleteView, EquipesView, EquipesCreateView, EquipesUpdateView, EquipesGetView, EquipesDeleteView, \
     assign_project, remove_project, edit_profile, delete_account, edit_account_info, change_password, equipes_invite, \
     TarefasCreateView, TarefasUpdateView, TarefasDeleteView, TarefasDetailView, TarefasAssign, TarefasReportView, \
-    EquipesLeaveView, TarefasExportCSSView, equipes_remove_member
+    EquipesLeaveView, TarefasExportCSSView, equipes_remove_member, UploadIniciarView, UploadParteView, \
+    EquipesConcluirView, AuditLogView, AuditLogJsonView, IndicadoresView
 
 PasswordResetCompleteView.success_url = reverse_lazy('account_login')
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('', HomeView.as_view(), name='home'),
-    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    # async só no ASGI: no WSGI a view async passaria por async_to_sync em todo request
+    path('dashboard/', (DashboardAsyncView if settings.DJANGO_ASGI else DashboardView).as_view(), name='dashboard'),
 
     path('account/login/', LoginView.as_view(template_name='account/login.html'), name='account_login'),
     path('account/login/', LoginView.as_view(template_name='account/login.html'), name='login'),
@@ -68,6 +70,8 @@ urlpatterns = [
 
 
     path('account/lista_integrantes', IntegrantesListaView.as_view(), name='admin_integ_list'),
+    path('account/auditoria/', AuditLogView.as_view(), name='admin_audit_list'),
+    path('account/auditoria/json/', AuditLogJsonView.as_view(), name='admin_audit_json'),
 
     path('equipes/', EquipesView.as_view(), name='equipes_list'),
     path('equipes/novo/', EquipesCreateView.as_view(), name='equipes_create'),
@@ -76,10 +80,12 @@ urlpatterns = [
     path('equipes/editar/<int:pk>/', EquipesUpdateView.as_view(), name='equipes_edit'),
     path("equipes/<int:equipe_id>", EquipesGetView.as_view(), name='equipes_detail'),
     path('equipes/<int:equipe_id>/projetos/', assign_project, name='equipes_projetos'),
+    path('equipes/<int:equipe_id>/concluir/', EquipesConcluirView.as_view(), name='equipes_concluir'),
     path('equipes/<int:equipe_id>/remove_projeto/', remove_project, name='remove_projeto'),
     path('equipes/<int:equipe_id>/remove-member/<uuid:member_id>/', equipes_remove_member,
                                                                     name='equipes_remove_member'),
     path('equipes/<int:pk>/excluir/', EquipesDeleteView.as_view(), name='equipes_delete'),
+    path('equipes/<int:equipe_id>/indicadores/', IndicadoresView.as_view(), name='equipes_indicadores'),
 
     path('projetos/', ProjetosView.as_view() , name='projetos_list'),
     path('projetos/novo/', ProjetosCreateView.as_view(), name='projetos_create'),
@@ -87,11 +93,15 @@ urlpatterns = [
     path("projetos/<int:projeto_id>", ProjetosGetView.as_view(), name='projetos_detail'),
     path('projetos/<int:pk>/excluir/', ProjetosDeleteView.as_view(), name='projetos_delete'),
     path('projetos/<int:projeto_id>/export-tasks/', TarefasExportCSSView.as_view(), name='projetos_tarefas_csv'),
+    path('projetos/<int:projeto_id>/indicadores/', IndicadoresView.as_view(), name='projetos_indicadores'),
 
+    path('tarefas/exportar/', TarefasExportCSSView.as_view(), name='tarefas_export'),
     path('tarefas/<int:task_id>/', TarefasAssign.as_view(), name='tarefas_assign'),
     path('projetos/<int:projeto_id>/tarefas/novo/', TarefasCreateView.as_view(),name='tarefas_create'),
     path('tarefas/editar/<int:pk>/', TarefasUpdateView.as_view(), name='tarefas_edit'),
     path('tarefas/excluir/<int:pk>/', TarefasDeleteView.as_view(), name='tarefas_delete'),
     path('tarefas/<int:pk>/', TarefasDetailView.as_view(), name='tarefas_detail'),
     path('tarefas/concluir/<int:task_id>/', TarefasReportView.as_view(), name='tarefas_report'),
+    path('uploads/', UploadIniciarView.as_view(), name='uploads_iniciar'),
+    path('uploads/<uuid:upload_id>/', UploadParteView.as_view(), name='uploads_parte'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
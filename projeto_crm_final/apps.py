@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProjetoCrmFinalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "projeto_crm_final"
+
+    def ready(self):
+        from projeto_crm_final import signals  # noqa: F401
@@ -0,0 +1,259 @@
+"""Auditoria das ações que alteram dados, gravada fora do caminho do request.
+
+registrar() só monta o AuditLog e põe num buffer em memória (depois do commit da
+transação da view: ação desfeita não é auditada). O buffer vai pro banco num único
+bulk_create quando junta AUDIT_BUFFER_SIZE entradas ou a cada AUDIT_FLUSH_SECONDS,
+numa thread do próprio processo, e também quando o processo termina (atexit, que o
+worker do gunicorn executa ao sair).
+
+A tabela é particionada por mês (UTC), pra que apagar o histórico antigo seja um DROP:
+- PostgreSQL: tabela particionada por RANGE(timestamp), uma partição por mês
+  (<tabela>_pAAAAMM) e uma partição default pro que cair fora delas;
+- SQLite: a tabela do model guarda só o mês corrente; rollover() move cada mês
+  anterior pra uma tabela <tabela>_pAAAAMM só de leitura.
+`manage.py particoes_audit` cria as partições futuras, faz o rollover e poda.
+"""
+import atexit
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from projeto_crm_final.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+TABELA = AuditLog._meta.db_table
+_PARTICAO = re.compile(rf'^{TABELA}_p(\d{{4}})(\d{{2}})$')
+
+
+def _ip(request):
+    return request.META.get('REMOTE_ADDR') or '0.0.0.0'
+
+
+class Buffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entradas = []
+        self.acordar = threading.Event()
+        self.thread = None
+
+    def adicionar(self, entrada):
+        with self.lock:
+            self.entradas.append(entrada)
+            cheio = len(self.entradas) >= settings.AUDIT_BUFFER_SIZE
+        if settings.AUDIT_FLUSH_SECONDS <= 0:
+            # sem thread (testes, comandos): o limite de tamanho ainda vale
+            if cheio:
+                self.flush()
+            return
+        self._iniciar_thread()
+        if cheio:
+            self.acordar.set()
+
+    def flush(self):
+        """Grava o que está no buffer; retorna quantas entradas foram gravadas"""
+        with self.lock:
+            entradas, self.entradas = self.entradas, []
+        if not entradas:
+            return 0
+        try:
+            AuditLog.objects.bulk_create(entradas, batch_size=settings.AUDIT_BUFFER_SIZE)
+        except DatabaseError:
+            logger.exception("Falha gravando %d entradas de auditoria", len(entradas))
+            with self.lock:
+                # devolve pro buffer pra próxima tentativa, sem crescer sem limite com o banco fora
+                self.entradas[:0] = entradas[-settings.AUDIT_BUFFER_SIZE * 10:]
+            return 0
+        return len(entradas)
+
+    def pendentes(self):
+        with self.lock:
+            return len(self.entradas)
+
+    def _iniciar_thread(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._loop, name='auditoria-flush', daemon=True)
+                self.thread.start()
+
+    def _loop(self):
+        while True:
+            self.acordar.wait(settings.AUDIT_FLUSH_SECONDS)
+            self.acordar.clear()
+            close_old_connections()
+            self.flush()
+
+    def _depois_do_fork(self):
+        # a thread não sobrevive ao fork; o que estava no buffer é do processo pai
+        self.lock = threading.Lock()
+        self.entradas = []
+        self.acordar = threading.Event()
+        self.thread = None
+
+
+buffer = Buffer()
+atexit.register(buffer.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=buffer._depois_do_fork)
+
+
+def registrar(request, action, onde):
+    """Audita uma ação do usuário logado, ex.: registrar(request, 'tarefa_excluida', f'tarefa:{pk}')"""
+    # request.integrante é um SimpleLazyObject, que embrulha None pra usuário sem perfil
+    integrante = getattr(request, 'integrante', None)
+    entrada = AuditLog(
+        usuario_id=integrante.pk if integrante else None,
+        action=action,
+        onde=onde,
+        ip_address=_ip(request),
+        timestamp=timezone.now(),
+    )
+    transaction.on_commit(lambda: buffer.adicionar(entrada))
+
+
+def registrar_sistema(action, ondes):
+    """Audita ações sem usuário (varreduras, jobs), uma entrada por `onde`, também depois do commit"""
+    agora = timezone.now()
+    entradas = [AuditLog(usuario=None, action=action, onde=onde, ip_address='0.0.0.0', timestamp=agora)
+                for onde in ondes]
+    transaction.on_commit(lambda: [buffer.adicionar(entrada) for entrada in entradas])
+
+
+def flush():
+    return buffer.flush()
+
+
+# ---- partições
+
+def inicio_do_mes(ano, mes):
+    return datetime(ano, mes, 1, tzinfo=dt_timezone.utc)
+
+
+def proximo_mes(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def mes_anterior(ano, mes):
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def meses(inicio, fim):
+    """(ano, mes) de inicio até fim, inclusive"""
+    atual = inicio
+    while atual <= fim:
+        yield atual
+        atual = proximo_mes(*atual)
+
+
+def mes_de(data):
+    data = data.astimezone(dt_timezone.utc)
+    return data.year, data.month
+
+
+def nome_particao(ano, mes):
+    return f'{TABELA}_p{ano:04d}{mes:02d}'
+
+
+def particoes():
+    """{(ano, mes): nome da tabela} das partições (PostgreSQL) ou meses arquivados (SQLite)"""
+    encontradas = {}
+    for nome in connection.introspection.table_names():
+        match = _PARTICAO.match(nome)
+        if match:
+            encontradas[(int(match[1]), int(match[2]))] = nome
+    return dict(sorted(encontradas.items()))
+
+
+def _sql_datetime(data):
+    return connection.ops.adapt_datetimefield_value(data)
+
+
+def criar_particoes(meses_a_frente=3, agora=None):
+    """PostgreSQL: garante a partição do mês corrente e das seguintes; retorna as criadas"""
+    if connection.vendor != 'postgresql':
+        return []
+    atual = mes_de(agora or timezone.now())
+    fim = atual
+    for _ in range(meses_a_frente):
+        fim = proximo_mes(*fim)
+    existentes = particoes()
+    criadas = []
+    with connection.cursor() as cursor:
+        for ano, mes in meses(atual, fim):
+            if (ano, mes) in existentes:
+                continue
+            nome = nome_particao(ano, mes)
+            cursor.execute(
+                f'CREATE TABLE {connection.ops.quote_name(nome)} PARTITION OF {connection.ops.quote_name(TABELA)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [inicio_do_mes(ano, mes), inicio_do_mes(*proximo_mes(ano, mes))],
+            )
+            criadas.append(nome)
+    return criadas
+
+
+def rollover(agora=None):
+    """SQLite: tira da tabela do model os meses anteriores ao corrente; retorna os arquivados.
+
+    Cada mês vai pra <tabela>_pAAAAMM (sem FK, só leitura). A tabela do model é recriada
+    com o mesmo DDL e recebe de volta só as linhas do mês corrente, então o custo é uma
+    cópia por mês e não um DELETE por linha.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    q = connection.ops.quote_name
+    atual = mes_de(agora or timezone.now())
+    inicio = _sql_datetime(inicio_do_mes(*atual))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("timestamp") FROM {q(TABELA)} WHERE "timestamp" < %s', [inicio])
+        mais_antigo = cursor.fetchone()[0]
+        if mais_antigo is None:
+            return []
+        # o SQLite devolve o texto gravado pelo Django, em UTC
+        if isinstance(mais_antigo, str):
+            mais_antigo = datetime.fromisoformat(mais_antigo)
+
+        existentes = particoes()
+        arquivados = []
+        for ano, mes in meses((mais_antigo.year, mais_antigo.month), mes_anterior(*atual)):
+            de, ate = _sql_datetime(inicio_do_mes(ano, mes)), _sql_datetime(inicio_do_mes(*proximo_mes(ano, mes)))
+            nome = nome_particao(ano, mes)
+            filtro = f'FROM {q(TABELA)} WHERE "timestamp" >= %s AND "timestamp" < %s'
+            if (ano, mes) in existentes:
+                cursor.execute(f'INSERT INTO {q(nome)} SELECT * {filtro}', [de, ate])
+            else:
+                cursor.execute(f'CREATE TABLE {q(nome)} AS SELECT * {filtro}', [de, ate])
+            arquivados.append(nome)
+
+        cursor.execute("SELECT sql FROM sqlite_master WHERE tbl_name = %s AND sql IS NOT NULL "
+                       "ORDER BY type = 'table' DESC", [TABELA])
+        ddl = [linha[0] for linha in cursor.fetchall()]
+        cursor.execute(f'CREATE TEMP TABLE auditlog_corrente AS SELECT * FROM {q(TABELA)} WHERE "timestamp" >= %s',
+                       [inicio])
+        cursor.execute(f'DROP TABLE {q(TABELA)}')
+        for sql in ddl:
+            cursor.execute(sql)
+        cursor.execute(f'INSERT INTO {q(TABELA)} SELECT * FROM auditlog_corrente')
+        cursor.execute('DROP TABLE auditlog_corrente')
+    return arquivados
+
+
+def podar(retencao_meses, agora=None):
+    """DROP das partições/arquivos com mais de `retencao_meses` meses; retorna as removidas"""
+    ano, mes = mes_de(agora or timezone.now())
+    corte = ano * 12 + mes - 1 - retencao_meses
+    removidas = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for (ano_p, mes_p), nome in particoes().items():
+            if ano_p * 12 + mes_p - 1 < corte:
+                cursor.execute(f'DROP TABLE {connection.ops.quote_name(nome)}')
+                removidas.append(nome)
+    return removidas
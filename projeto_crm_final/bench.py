@@ -0,0 +1,192 @@
+"""Benchmark de ponta a ponta das rotas de config/urls.py (ver manage.py bench_urls).
+
+Cada rota nomeada é chamada pelo test client, sem servidor, contra uma base gerada
+pelo seed (gerador.py) em várias escalas. Pra cada caso guarda p50/p95 de latência,
+número de queries e pico de memória alocada no request (tracemalloc, medido numa
+execução separada pra não pesar no tempo). O resultado é um dict serializável em JSON,
+e comparar() aponta as regressões entre dois resultados (ex.: dois commits).
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from projeto_crm_final import seeding
+from projeto_crm_final.models import Integrantes, Projetos
+
+# rota: (quem acessa, kwargs da url -> chave do contexto, query strings)
+# as query strings podem usar o contexto, ex.: '?projeto={projeto}'
+ROTAS = {
+    'home': ('anonimo', {}, ['']),
+    'account_login': ('anonimo', {}, ['']),
+    'account_signup': ('anonimo', {}, ['']),
+    'account_reset_password': ('anonimo', {}, ['']),
+    'password_reset_done': ('anonimo', {}, ['']),
+    'password_reset_complete': ('anonimo', {}, ['']),
+    'dashboard': ('lider', {}, ['']),
+    'account_user_detail': ('membro', {'person_id': 'integrante'}, ['']),
+    'account_profile_edit': ('membro', {}, ['']),
+    'account_login_info_edit': ('membro', {}, ['']),
+    'admin_integ_list': ('admin', {}, ['', '?role=LEAD', '?q=Ana']),
+    'admin_audit_list': ('admin', {}, ['', '?action=tarefa_editada', '?onde=equipe:{equipe}']),
+    'admin_audit_json': ('admin', {}, ['', '?usuario={usuario}&limite=200']),
+    'equipes_list': ('membro', {}, ['']),
+    'equipes_create': ('membro', {}, ['']),
+    'equipes_edit': ('lider', {'pk': 'equipe'}, ['']),
+    'equipes_detail': ('lider', {'equipe_id': 'equipe'}, ['']),
+    'equipes_delete': ('lider', {'pk': 'equipe'}, ['']),
+    'equipes_indicadores': ('membro', {'equipe_id': 'equipe'}, ['', '?dias=365']),
+    'projetos_list': ('membro', {}, [
+        '', '?status=active', '?status=canceled', '?status=overdue', '?status=done',
+        '?categoria=TI', '?prioridade=alta', '?status=active&prioridade=urgente',
+    ]),
+    'projetos_create': ('lider', {}, ['']),
+    'projetos_edit': ('lider', {'pk': 'projeto'}, ['']),
+    'projetos_detail': ('lider', {'projeto_id': 'projeto'}, ['']),
+    'projetos_delete': ('lider', {'pk': 'projeto'}, ['']),
+    'projetos_indicadores': ('lider', {'projeto_id': 'projeto'}, ['']),
+    'projetos_tarefas_csv': ('lider', {'projeto_id': 'projeto'}, ['', '?formato=ndjson']),
+    'tarefas_export': ('admin', {}, ['?equipe={equipe}', '?status=done']),
+    'tarefas_create': ('lider', {'projeto_id': 'projeto'}, ['']),
+    'tarefas_edit': ('lider', {'pk': 'tarefa'}, ['']),
+    'tarefas_delete': ('lider', {'pk': 'tarefa'}, ['']),
+    'tarefas_report': ('lider', {'task_id': 'tarefa'}, ['']),
+}
+
+# rotas sem GET que só leia dados
+IGNORADAS = {
+    'login': "mesma URL de account_login",
+    'account_logout': "só POST",
+    'account_delete': "só POST",
+    'change_password': "só POST",
+    'update_role': "só POST",
+    'password_reset_confirm': "precisa de token de e-mail",
+    'equipes_leave': "só POST",
+    'equipes_invite': "só POST",
+    'equipes_projetos': "só POST",
+    'equipes_concluir': "só POST",
+    'remove_projeto': "só POST",
+    'equipes_remove_member': "altera dados no GET",
+    'tarefas_assign': "só POST",
+    'tarefas_detail': "mesma URL de tarefas_assign",
+    'uploads_iniciar': "API de upload (POST)",
+    'uploads_parte': "API de upload (PUT)",
+}
+
+
+def rotas_nomeadas():
+    """Nomes das rotas do projeto (sem o admin do Django)"""
+    return {nome for nome in get_resolver().reverse_dict if isinstance(nome, str)}
+
+
+def sem_cobertura():
+    return rotas_nomeadas() - set(ROTAS) - set(IGNORADAS)
+
+
+def contexto():
+    """Ids usados nas URLs: o projeto ativo com mais tarefas, sua equipe, líder e um membro"""
+    projeto = (
+        Projetos.objects.filter(status='active', equipe__isnull=False)
+        .annotate(n=Count('tarefas_do_projeto')).order_by('-n', 'pk')
+        .select_related('equipe__leader__user').first()
+    )
+    equipe = projeto.equipe
+    membro = equipe.membros.exclude(pk=equipe.leader_id).select_related('user').first() or equipe.leader
+    # o seed não gera ADMIN: promove alguém de outra equipe
+    admin = Integrantes.objects.exclude(equipe=equipe).select_related('user').first() or membro
+    Integrantes.objects.filter(pk=admin.pk).update(role='ADMIN')
+    return {
+        'projeto': projeto.pk,
+        'equipe': equipe.pk,
+        'tarefa': projeto.tarefas_do_projeto.order_by('pk').values_list('pk', flat=True).first(),
+        'integrante': equipe.leader_id,
+        'usuario': equipe.leader_id,
+        'usuarios': {'lider': equipe.leader.user, 'membro': membro.user, 'admin': admin.user},
+    }
+
+
+def casos(ctx):
+    """(nome do caso, quem acessa, url) de todas as rotas em ROTAS"""
+    for rota, (quem, kwargs, queries) in ROTAS.items():
+        caminho = reverse(rota, kwargs={k: ctx[v] for k, v in kwargs.items()})
+        for query in queries:
+            yield f'{rota}{query}', quem, caminho + query.format(**ctx)
+
+
+def _request(client, url):
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def medir(client, url, repeticoes=20, aquecimento=2):
+    for _ in range(aquecimento):
+        _request(client, url)
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        response = _request(client, url)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            _request(client, url)
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(tempos), 3),
+        'p95_ms': round(tempos[max(0, int(len(tempos) * 0.95) - 1)], 3),
+        'queries': len(queries),
+        'pico_kb': round(pico / 1024, 1),
+    }
+
+
+def medir_escala(total_tarefas, semente=42, repeticoes=20, filtro=None):
+    """Gera a base na escala pedida (apagando um seed anterior) e mede todos os casos"""
+    if seeding.existe():
+        seeding.limpar()
+    seeding.semear(total_tarefas, semente=semente)
+    cache.clear()   # perfis em cache da escala anterior
+    ctx = contexto()
+
+    # view quebrada vira status 500 no resultado em vez de interromper o benchmark
+    clientes = {'anonimo': Client(raise_request_exception=False)}
+    for quem, user in ctx['usuarios'].items():
+        clientes[quem] = Client(raise_request_exception=False)
+        clientes[quem].force_login(user)
+
+    resultados = {}
+    for nome, quem, url in casos(ctx):
+        if filtro and filtro not in nome:
+            continue
+        resultados[nome] = medir(clientes[quem], url, repeticoes)
+    return resultados
+
+
+def comparar(anterior, atual, tolerancia=0.2):
+    """Regressões de `atual` em relação a `anterior`: p50 acima da tolerância ou mais queries"""
+    regressoes = []
+    for escala, casos_atuais in atual['escalas'].items():
+        casos_anteriores = anterior.get('escalas', {}).get(escala, {})
+        for nome, r in casos_atuais.items():
+            antes = casos_anteriores.get(nome)
+            if not antes:
+                continue
+            if r['queries'] > antes['queries']:
+                regressoes.append((escala, nome, 'queries', antes['queries'], r['queries']))
+            if antes['p50_ms'] and r['p50_ms'] > antes['p50_ms'] * (1 + tolerancia):
+                regressoes.append((escala, nome, 'p50_ms', antes['p50_ms'], r['p50_ms']))
+    return regressoes
@@ -0,0 +1,97 @@
+"""Armazenamento de relatórios endereçado por conteúdo.
+
+Cada arquivo é guardado uma vez em blobs/<sha256>; os relatórios apontam pro blob e
+reaproveitam o mesmo nome de arquivo. Reenviar um arquivo que já existe vira só um
+INSERT do relatório + refcount, sem gravar em disco nem subir pro Cloudinary de novo.
+Blobs que ficam sem referência são apagados por `manage.py gc_blobs`.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from projeto_crm_final.models import Blob
+
+BLOCO_LEITURA = 64 * 1024
+
+
+def sha256_de(arquivo):
+    """SHA-256 do arquivo enviado; vem pronto do upload handler / upload em partes"""
+    sha256 = getattr(arquivo, 'sha256', None)
+    if sha256:
+        return sha256
+    digest = hashlib.sha256()
+    arquivo.seek(0)
+    for bloco in arquivo.chunks(BLOCO_LEITURA):
+        digest.update(bloco)
+    arquivo.seek(0)
+    return digest.hexdigest()
+
+
+def armazenar(arquivo):
+    """Devolve o blob do conteúdo, já com a referência nova contada"""
+    sha256 = sha256_de(arquivo)
+    atualizados = Blob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1)
+    if atualizados:
+        return Blob.objects.get(sha256=sha256)
+
+    blob = Blob(sha256=sha256, tamanho=arquivo.size, refcount=1)
+    blob.arquivo.save(sha256, arquivo, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # outro request gravou o mesmo conteúdo ao mesmo tempo: fica com o dele
+        blob.arquivo.delete(save=False)
+        Blob.objects.filter(sha256=sha256).update(refcount=F('refcount') + 1)
+        blob = Blob.objects.get(sha256=sha256)
+    return blob
+
+
+def anexar(relatorio, arquivo):
+    """Liga o relatório ao blob do arquivo e salva o relatório; relatorio.arquivo passa a ser o do blob.
+
+    A referência nova e o INSERT do relatório vão na mesma transação: se o save falhar o refcount
+    volta, e o gc_blobs (que trava o blob pra apagar) não apaga um blob no meio do caminho.
+    """
+    with transaction.atomic():
+        blob = armazenar(arquivo)
+        relatorio.blob = blob
+        relatorio.arquivo = blob.arquivo.name
+        relatorio.save()
+    return blob
+
+
+def liberar(blob_id):
+    if blob_id:
+        Blob.objects.filter(pk=blob_id, refcount__gt=0).update(refcount=F('refcount') - 1)
+
+
+def recontar():
+    """Recalcula o refcount a partir dos relatórios (corrige desvios de deletes em massa)"""
+    corrigidos = 0
+    blobs = Blob.objects.annotate(
+        refs=Count('relatorios_projeto', distinct=True) + Count('relatorios_tarefa', distinct=True)
+    ).exclude(refcount=F('refs'))
+    for blob in blobs:
+        Blob.objects.filter(pk=blob.pk).update(refcount=blob.refs)
+        corrigidos += 1
+    return corrigidos
+
+
+def coletar(dry_run=False):
+    """Apaga blobs sem referência (banco e arquivo); retorna (quantidade, bytes)"""
+    orfaos = Blob.objects.filter(
+        refcount=0, relatorios_projeto__isnull=True, relatorios_tarefa__isnull=True
+    )
+    quantidade, liberados = 0, 0
+    for blob in orfaos:
+        quantidade += 1
+        liberados += blob.tamanho
+        if dry_run:
+            continue
+        with transaction.atomic():
+            # só apaga se ninguém referenciou o blob entre a listagem e agora
+            if Blob.objects.filter(pk=blob.pk, refcount=0).delete()[0]:
+                transaction.on_commit(lambda arquivo=blob.arquivo: arquivo.delete(save=False))
+    return quantidade, liberados
@@ -0,0 +1,69 @@
+"""Cache entre requests do perfil do usuário (integrante + equipe + projeto ativo).
+
+Cada usuário tem uma entrada própria, carimbada com a versão da equipe no momento
+em que foi gravada. Mudanças na equipe (ou nos projetos dela) só trocam a versão da
+equipe, o que invalida a entrada de todos os membros de uma vez, sem apagar N chaves.
+
+Fica desligado sem um cache compartilhado entre os processos (settings.CACHE_COMPARTILHADO).
+O integrante em cache é só pra leitura: quem for salvar o perfil usa
+middleware.integrante_para_escrita(), lido do banco.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+USER_KEY = 'crm:integrante:{}'
+EQUIPE_VERSION_KEY = 'crm:equipe:{}:versao'
+
+
+def _timeout():
+    return getattr(settings, 'INTEGRANTE_CACHE_TIMEOUT', 0)
+
+
+def ativo():
+    """Cache do perfil ligado (só com backend compartilhado, ver INTEGRANTE_CACHE_TIMEOUT)"""
+    return _timeout() > 0
+
+
+def get_equipe_version(equipe_id):
+    """Versão atual da equipe, criando uma se ainda não existir"""
+    key = EQUIPE_VERSION_KEY.format(equipe_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_equipe_version(equipe_id):
+    """Invalida o perfil em cache de todos os membros da equipe - O(1)"""
+    if equipe_id:
+        cache.set(EQUIPE_VERSION_KEY.format(equipe_id), uuid.uuid4().hex, None)
+
+
+def invalidate_user(user_id):
+    if user_id:
+        cache.delete(USER_KEY.format(user_id))
+
+
+def get_cached_integrante(user_id):
+    """Retorna o integrante em cache ou None se não houver ou estiver desatualizado"""
+    entry = cache.get(USER_KEY.format(user_id))
+    if entry is None:
+        return None
+
+    equipe_id = entry['integrante'].equipe_id
+    if equipe_id and cache.get(EQUIPE_VERSION_KEY.format(equipe_id)) != entry['versao']:
+        return None
+    return entry['integrante']
+
+
+def set_cached_integrante(integrante):
+    """Grava o integrante já carregado, carimbado com a versão atual da equipe"""
+    versao = get_equipe_version(integrante.equipe_id) if integrante.equipe_id else None
+    cache.set(
+        USER_KEY.format(integrante.user_id),
+        {'integrante': integrante, 'versao': versao},
+        _timeout(),
+    )
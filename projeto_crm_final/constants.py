@@ -36,9 +36,19 @@ STATUSPROJETO = [
     ('done','Concluído')
 ]
 
+# projeto em andamento da equipe: 'overdue' é o mesmo projeto, só com o prazo vencido (ver prazos.py)
+PROJETO_EM_ANDAMENTO = ('active', 'overdue')
+
 PRIORIDADE = [
     ('baixa','Baixa'),
     ('regular', 'Regular'),
     ('alta', 'Alta'),
     ('urgente', 'Urgente')
 ]
+
+STATUSJOB = [
+    ('pending', 'Na fila'),
+    ('running', 'Executando'),
+    ('done', 'Concluído'),
+    ('failed', 'Falhou')
+]
@@ -1,4 +1,4 @@
-from projeto_crm_final.models import Integrantes, Projetos
+from projeto_crm_final.middleware import get_integrante
 
 
 def navbar_context(request):
@@ -7,24 +7,17 @@ def navbar_context(request):
         'active_projeto': None,
         'active_equipe': None,
         'has_team': False,
+        'is_admin': False,
     }
 
-    if request.user.is_authenticated:
-        try:        #perfil usuario
-            profile = Integrantes.objects.get(user=request.user)
-            context['current_user_profile'] = profile
+    profile = get_integrante(request)      #perfil usuario, já carregado pelo middleware
+    if profile:
+        context['current_user_profile'] = profile
+        context['is_admin'] = profile.role == 'ADMIN'
 
-            if profile.equipe:      #equipee usuario
-                context['active_equipe'] = profile.equipe
-                context['has_team'] = True
-                                                    #projeto usuario
-                context['active_projeto'] = Projetos.objects.filter(
-                    equipe=profile.equipe,
-                    status='active'
-                ).first()
-
-        except Integrantes.DoesNotExist:
-            pass
+        if profile.equipe:      #equipee usuario
+            context['active_equipe'] = profile.equipe
+            context['has_team'] = True
+            context['active_projeto'] = profile.active_projeto      #projeto usuario
 
     return context
-
@@ -0,0 +1,204 @@
+"""Exportação de tarefas em streaming (CSV, NDJSON e XLSX).
+
+As linhas saem do banco em blocos (.iterator) com responsável e projeto no mesmo
+SELECT e são escritas direto na resposta, então a memória fica constante mesmo
+para centenas de milhares de tarefas.
+"""
+import csv
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import Q
+
+from projeto_crm_final.models import Tarefas
+
+CHUNK_SIZE = 2000
+
+COLUNAS = [
+    'Nome', 'Descrição', 'Status', 'Prioridade',
+    'Responsável', 'Data Criação', 'Prazo Final', 'Projeto'
+]
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def tarefas_visiveis(integrante):
+    """Tarefas que o integrante pode exportar: ADMIN vê tudo, os demais as da
+    própria equipe e as dos projetos que criaram"""
+    queryset = Tarefas.objects.all()
+    if integrante.role == 'ADMIN':
+        return queryset
+    visivel = Q(projetoparent__criador=integrante)
+    if integrante.equipe_id:
+        visivel |= Q(projetoparent__equipe_id=integrante.equipe_id)
+    return queryset.filter(visivel)
+
+
+def filtrar_tarefas(queryset, projeto=None, equipe=None, status=None, prazo_de=None, prazo_ate=None):
+    if projeto:
+        queryset = queryset.filter(projetoparent_id=projeto)
+    if equipe:
+        queryset = queryset.filter(equipe_id=equipe)
+    if status:
+        queryset = queryset.filter(status__in=status)
+    if prazo_de:
+        queryset = queryset.filter(prazofinal__gte=prazo_de)
+    if prazo_ate:
+        queryset = queryset.filter(prazofinal__lte=prazo_ate)
+    return queryset
+
+
+def linhas(queryset):
+    """Gera uma lista de valores por tarefa, na ordem de COLUNAS"""
+    queryset = queryset.select_related('responsavel', 'projetoparent').order_by(
+        'projetoparent_id', 'prazofinal', 'id'
+    )
+    for task in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            task.name,
+            task.descricao,
+            task.get_status_display(),
+            task.get_prioridade_display(),
+            f"{task.responsavel.nome} {task.responsavel.sobrenome}" if task.responsavel else "Não atribuído",
+            task.inicio.strftime('%d/%m/%Y %H:%M'),
+            task.prazofinal.strftime('%d/%m/%Y') if task.prazofinal else "",
+            task.projetoparent.name,
+        ]
+
+
+def _em_blocos(rows, size=500):
+    bloco = []
+    for row in rows:
+        bloco.append(row)
+        if len(bloco) >= size:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+# ---------- CSV
+
+class _Echo:
+    """Pseudo-buffer: csv.writer escreve e o valor volta direto pro gerador"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUNAS)
+    for bloco in _em_blocos(rows):
+        yield ''.join(writer.writerow(row) for row in bloco)
+
+
+# ---------- NDJSON
+
+def stream_ndjson(rows):
+    for bloco in _em_blocos(rows):
+        yield ''.join(json.dumps(dict(zip(COLUNAS, row)), ensure_ascii=False) + '\n' for row in bloco)
+
+
+# ---------- XLSX
+
+class _ZipBuffer:
+    """Destino não-seekable pro ZipFile; o gerador esvazia o que já foi escrito"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._partes)
+        self._partes = []
+        return data
+
+
+_XML_INVALIDO = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Tarefas" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_row(row):
+    celulas = ''.join(
+        f'<c t="inlineStr"><is><t xml:space="preserve">{escape(_XML_INVALIDO.sub("", str(valor)))}</t></is></c>'
+        for valor in row
+    )
+    return f'<row>{celulas}</row>'
+
+
+def stream_xlsx(rows):
+    """Planilha de uma aba escrita linha a linha dentro do zip (sem openpyxl e sem
+    montar o arquivo inteiro em memória)"""
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in _XLSX_ESTATICOS.items():
+            zf.writestr(name, content)
+        yield buffer.pop()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(COLUNAS).encode())
+            for bloco in _em_blocos(rows):
+                sheet.write(''.join(_xlsx_row(row) for row in bloco).encode())
+                yield buffer.pop()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.pop()
+
+
+STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'xlsx': stream_xlsx,
+}
@@ -0,0 +1,186 @@
+"""Análise de fluxo das tarefas (lead time, tempo de ciclo e vazão) sobre o histórico de status.
+
+exportar() lê as TransicaoTarefa numa consulta só e devolve um array estruturado do NumPy
+(tempos em microssegundos UTC); calcular() faz as contas de todas as tarefas e equipes de
+uma vez, com operações vetorizadas, sem laço por tarefa ou por projeto:
+
+- lead time: da criação da tarefa até a conclusão;
+- tempo de ciclo: da primeira vez em "doing" até a conclusão (só tarefas que passaram por "doing");
+- vazão: tarefas concluídas por equipe e por dia.
+
+Uma tarefa conta como concluída se o status atual é "done"; a data da conclusão é a da
+última transição. `manage.py fluxo_tarefas` imprime o resultado por equipe.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, F, PositiveSmallIntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from projeto_crm_final.models import TransicaoTarefa
+
+DTYPE = np.dtype([
+    ('tarefa', np.int64), ('equipe', np.int64), ('projeto', np.int64),
+    ('de', np.uint8), ('para', np.uint8), ('em', np.int64),
+])
+CRIADA = TransicaoTarefa.CRIADA
+DOING = TransicaoTarefa.CODIGOS['doing']
+DONE = TransicaoTarefa.CODIGOS['done']
+TODO = TransicaoTarefa.CODIGOS['todo']
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_DIA_US = 86_400_000_000
+_HORA_US = 3_600_000_000
+
+
+def microssegundos(momento):
+    return (momento - _EPOCA) // timedelta(microseconds=1)
+
+
+def exportar(equipes=None, projetos=None, chunk_size=10_000):
+    """Histórico das tarefas das `equipes`/`projetos` (ids ou querysets de ids; None = todas)"""
+    transicoes = TransicaoTarefa.objects.order_by('pk')
+    if equipes is not None:
+        transicoes = transicoes.filter(equipe_id__in=equipes)
+    if projetos is not None:
+        transicoes = transicoes.filter(projeto_id__in=projetos)
+    linhas = transicoes.values_list('tarefa_id', 'equipe_id', 'projeto_id', 'de', 'para', 'em')
+    return np.fromiter(
+        ((t, e, p, de, para, microssegundos(em)) for t, e, p, de, para, em in linhas.iterator(chunk_size=chunk_size)),
+        dtype=DTYPE,
+    )
+
+
+def _por_grupo(valores, grupo, n_grupos, percentis):
+    """Média e percentis (posto mais próximo, inferior) de `valores` por grupo; NaN em grupo vazio"""
+    n = np.bincount(grupo, minlength=n_grupos)
+    vazio = n == 0
+    soma = np.bincount(grupo, weights=valores, minlength=n_grupos)
+    resultado = {'media': np.divide(soma, n, out=np.full(n_grupos, np.nan), where=~vazio)}
+    if not len(valores):
+        return {**resultado, **{q: np.full(n_grupos, np.nan) for q in percentis}}
+
+    ordenados = valores[np.lexsort((valores, grupo))]
+    comeco = np.cumsum(n) - n
+    for q in percentis:
+        posicao = comeco + np.maximum(n - 1, 0) * q // 100
+        resultado[q] = np.where(vazio, np.nan, ordenados[np.minimum(posicao, len(ordenados) - 1)])
+    return resultado
+
+
+def calcular(dados, dias=28, hoje=None, percentis=(50, 85)):
+    """Métricas por equipe das tarefas concluídas nos últimos `dias` (até `hoje`, inclusive).
+
+    Devolve arrays alinhados com 'equipes' (ids em ordem crescente): 'concluidas',
+    'em_andamento' (tarefas em "doing" agora), 'lead_media_h'/'lead_p50_h'/...,
+    'ciclo_media_h'/'ciclo_p50_h'/... (horas, NaN quando não há tarefa) e 'vazao',
+    matriz equipes x dias com as conclusões de cada dia (datas em 'dias').
+    """
+    hoje = hoje or timezone.localdate()
+    inicio = hoje - timedelta(days=dias - 1)
+    # meia-noite local do primeiro dia; os dias seguintes são de 24h (vale enquanto o fuso não mudar
+    # de deslocamento dentro da janela), então o dia de cada conclusão sai de uma divisão no array todo
+    janela_de = microssegundos(timezone.make_aware(datetime.combine(inicio, datetime.min.time())))
+    janela_ate = janela_de + dias * _DIA_US
+
+    if not len(dados):
+        vazio = np.empty(0, dtype=np.float64)
+        resultado = {
+            'equipes': np.empty(0, dtype=np.int64),
+            'concluidas': np.empty(0, dtype=np.int64),
+            'em_andamento': np.empty(0, dtype=np.int64),
+            'vazao': np.zeros((0, dias), dtype=np.int64),
+            'dias': [inicio + timedelta(days=i) for i in range(dias)],
+        }
+        for nome in ('lead', 'ciclo'):
+            resultado[f'{nome}_media_h'] = vazio
+            for q in percentis:
+                resultado[f'{nome}_p{q}_h'] = vazio
+        return resultado
+
+    dados = dados[np.lexsort((dados['em'], dados['tarefa']))]
+    nova = np.ones(len(dados), dtype=bool)
+    nova[1:] = dados['tarefa'][1:] != dados['tarefa'][:-1]
+    primeira = np.flatnonzero(nova)
+    ultima = np.concatenate((primeira[1:], [len(dados)])) - 1
+    tarefa_idx = np.cumsum(nova) - 1
+    atual = dados[ultima]
+    criada_em = dados['em'][primeira]
+
+    # primeira entrada em "doing" de cada tarefa (o array já está em ordem de tempo)
+    em_doing = np.flatnonzero(dados['para'] == DOING)
+    com_doing, primeiro_doing = np.unique(tarefa_idx[em_doing], return_index=True)
+    comecou_em = np.full(len(primeira), -1, dtype=np.int64)
+    comecou_em[com_doing] = dados['em'][em_doing[primeiro_doing]]
+
+    equipes = np.unique(atual['equipe'])
+    equipe_idx = np.searchsorted(equipes, atual['equipe'])
+    n = len(equipes)
+
+    concluida = (atual['para'] == DONE) & (atual['em'] >= janela_de) & (atual['em'] < janela_ate)
+    fim = atual['em'][concluida]
+    grupo = equipe_idx[concluida]
+    lead = _por_grupo((fim - criada_em[concluida]) / _HORA_US, grupo, n, percentis)
+    ciclo_ok = comecou_em[concluida] >= 0
+    ciclo = _por_grupo((fim - comecou_em[concluida])[ciclo_ok] / _HORA_US, grupo[ciclo_ok], n, percentis)
+
+    vazao = np.bincount(grupo * dias + (fim - janela_de) // _DIA_US, minlength=n * dias).reshape(n, dias)
+
+    resultado = {
+        'equipes': equipes,
+        'concluidas': np.bincount(grupo, minlength=n),
+        'em_andamento': np.bincount(equipe_idx[atual['para'] == DOING], minlength=n),
+        'vazao': vazao,
+        'dias': [inicio + timedelta(days=i) for i in range(dias)],
+    }
+    for nome, valores in (('lead', lead), ('ciclo', ciclo)):
+        resultado[f'{nome}_media_h'] = valores['media']
+        for q in percentis:
+            resultado[f'{nome}_p{q}_h'] = valores[q]
+    return resultado
+
+
+def _codigo_do_status():
+    return Case(*(When(status=status, then=Value(c)) for status, c in TransicaoTarefa.CODIGOS.items()),
+                output_field=PositiveSmallIntegerField())
+
+
+def _inserir(*consultas):
+    """INSERT ... SELECT de cada consulta de tarefas anotada com t_de, t_para e t_em"""
+    q = connection.ops.quote_name
+    colunas = ', '.join(q(TransicaoTarefa._meta.get_field(nome).column)
+                        for nome in ('tarefa', 'equipe', 'projeto', 'de', 'para', 'em'))
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for consulta in consultas:
+            sql, params = consulta.order_by().annotate(
+                t_tarefa=F('pk'), t_equipe=F('equipe_id'), t_projeto=F('projetoparent_id'),
+            ).values_list('t_tarefa', 't_equipe', 't_projeto', 't_de', 't_para', 't_em').query.sql_with_params()
+            cursor.execute(f'INSERT INTO {q(TransicaoTarefa._meta.db_table)} ({colunas}) {sql}', params)
+            total += cursor.rowcount
+    return total
+
+
+def registrar_em_massa(tarefas, status, em=None):
+    """Transições das `tarefas` pro `status`, antes de um tarefas.update(status=status) (que não passa
+    pelo save); retorna quantas gravou"""
+    em = em or timezone.now()
+    return _inserir(tarefas.exclude(status=status).annotate(
+        t_de=_codigo_do_status(), t_para=Value(TransicaoTarefa.CODIGOS[status]),
+        t_em=Value(em, output_field=DateTimeField()),
+    ))
+
+
+def reconstruir(tarefas):
+    """Histórico aproximado de tarefas gravadas sem o save (seed): criação em `inicio` e, se saiu
+    de "todo", uma mudança direta pro status atual na conclusão (ou no último save).
+
+    São dois INSERT ... SELECT, sem trazer as tarefas pro Python; retorna quantas transições gravou.
+    """
+    return _inserir(
+        tarefas.annotate(t_de=Value(CRIADA), t_para=Value(TODO), t_em=F('inicio')),
+        tarefas.exclude(status='todo').annotate(t_de=Value(TODO), t_para=_codigo_do_status(),
+                                                t_em=Coalesce('concluida_em', 'atualizado')),
+    )
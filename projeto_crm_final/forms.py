@@ -3,7 +3,9 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
-from .models import Integrantes, Projetos, Tarefas, Equipes, RelatorioProjeto, RelatorioTarefa
+from . import uploads
+from .constants import PROJETO_EM_ANDAMENTO
+from .models import Integrantes, Projetos, Tarefas, Equipes, RelatorioProjeto, RelatorioTarefa, UploadParcial
 
 
 class SignupForm(UserCreationForm):
@@ -165,8 +167,8 @@ class EquipesForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
         # Estão na view mas coloquei aqui pra prevenir erros de validação
-        cleaned_data['leader'] = self.request.user.integrantes
-        cleaned_data['membros'] = [self.request.user.integrantes]
+        cleaned_data['leader'] = self.request.integrante
+        cleaned_data['membros'] = [self.request.integrante]
         return cleaned_data
 
 
@@ -192,10 +194,10 @@ class ProjetosForm(forms.ModelForm):
     def clean_name(self):
         name = self.cleaned_data.get('name')
         if self.instance and self.instance.pk:
-            if Projetos.objects.filter(name=name, status="active").exclude(pk=self.instance.pk).exists():
+            if Projetos.objects.filter(name=name, status__in=PROJETO_EM_ANDAMENTO).exclude(pk=self.instance.pk).exists():
                 raise forms.ValidationError("Um projeto com este nome já está ativo.")
         else:
-            if Projetos.objects.filter(name=name, status="active").exists():
+            if Projetos.objects.filter(name=name, status__in=PROJETO_EM_ANDAMENTO).exists():
                 raise forms.ValidationError("Um projeto com este nome já está ativo.")
         return name
 
@@ -206,7 +208,37 @@ class ProjetosForm(forms.ModelForm):
         return date
 
 
-class RelatorioForm(forms.ModelForm):
+class UploadEmPartesMixin:
+    """Aceita, no lugar do campo arquivo, um upload já enviado em partes (upload_id)"""
+
+    def __init__(self, *args, integrante=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.integrante = integrante
+        self.upload = None
+        self.fields['arquivo'].required = False
+        self.fields['upload_id'] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload_id = cleaned_data.get('upload_id')
+        if upload_id:
+            self.upload = UploadParcial.objects.filter(
+                pk=upload_id, usuario=self.integrante, concluido=True
+            ).first()
+            if self.upload is None:
+                self.add_error('arquivo', "Upload não encontrado ou incompleto")
+        elif not cleaned_data.get('arquivo'):
+            self.add_error('arquivo', "Este campo é obrigatório.")
+        return cleaned_data
+
+    def arquivo_enviado(self):
+        """O arquivo do relatório pra usar com `with` (fecha no fim): o do campo ou o do upload em partes"""
+        if self.upload is not None:
+            return uploads.arquivo_montado(self.upload)
+        return self.cleaned_data['arquivo']
+
+
+class RelatorioForm(UploadEmPartesMixin, forms.ModelForm):
     class Meta:
         model = RelatorioProjeto
         fields = ['arquivo']
@@ -216,7 +248,7 @@ class RelatorioForm(forms.ModelForm):
     def clean_arquivo(self):
         file = self.cleaned_data.get('arquivo')
         if file:
-            if file.size > 20 * 1024 * 1024:
+            if file.size > uploads.RELATORIO_TAMANHO_MAXIMO:
                 raise ValidationError("O arquivo é muito grande (máx. 20MB)")
             # Validar extensao?
 
@@ -280,7 +312,7 @@ class TarefasForm(forms.ModelForm):
 
         return cleaned_data
 
-class RelatorioTarefaForm(forms.ModelForm):
+class RelatorioTarefaForm(UploadEmPartesMixin, forms.ModelForm):
     class Meta:
         model = RelatorioTarefa
         fields = ['descricao', 'arquivo']
@@ -0,0 +1,207 @@
+"""Gerador determinístico de dados sintéticos pra benchmarks.
+
+Mesma semente + mesmas distribuições = mesma base, byte a byte, em qualquer máquina
+ou branch (não lê os .txt da raiz nem usa o `random` global). As distribuições ficam
+em DISTRIBUICOES e podem ser sobrescritas (manage.py seed --config arquivo.json).
+
+O gerador só produz dicts com referências por índice (equipe 3, usuário 17...);
+quem grava é o seeding.py: direto no banco ou num fixture JSON pro loaddata.
+"""
+import hashlib
+import json
+import random
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from projeto_crm_final.constants import CATEGORIA
+
+DISTRIBUICOES = {
+    # tamanho das equipes (uniforme, inclui o líder)
+    'membros_por_equipe': [3, 12],
+    'projetos_por_equipe': 4,
+    # tarefas por projeto: gaussiana com média/desvio, mínimo 1
+    'tarefas_por_projeto': {'media': 20, 'desvio': 8},
+    # pesos; os projetos que não são o ativo da equipe se dividem entre esses status.
+    # 'late' sai do prazo (todo/doing vencida), como a varredura de prazos deixaria
+    'status_tarefa': {'todo': 35, 'doing': 25, 'done': 30, 'canceled': 3},
+    'status_projeto_encerrado': {'done': 80, 'canceled': 20},
+    'prioridade': {'baixa': 20, 'regular': 50, 'alta': 20, 'urgente': 10},
+    # prazo em dias a partir de hoje: gaussiana (negativo = já venceu)
+    'prazo_dias': {'media': 20, 'desvio': 30},
+    'com_responsavel': 0.8,
+    # fração das tarefas 'done' com relatório e quantos arquivos diferentes existem
+    'relatorios': 0.3,
+    'arquivos_distintos': 20,
+}
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João',
+         'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vanessa', 'Wagner']
+SOBRENOMES = ['Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Melo',
+              'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza']
+CARGOS = ['Analista', 'Desenvolvedor', 'Designer', 'Gerente', 'Coordenador', 'Consultor',
+          'Estagiário', 'Especialista', 'Assistente', 'Arquiteto']
+PROJETO_TEMAS = ['Migração', 'Portal', 'Campanha', 'Auditoria', 'Integração', 'Treinamento',
+                 'Expansão', 'Automação', 'Relatório', 'Plataforma']
+PROJETO_ALVOS = ['de Vendas', 'do Financeiro', 'de Clientes', 'Interna', 'Regional', 'de Logística',
+                 'do RH', 'de Dados', 'Mobile', 'Jurídica']
+TAREFA_VERBOS = ['Revisar', 'Implementar', 'Testar', 'Documentar', 'Validar', 'Publicar', 'Corrigir',
+                 'Planejar', 'Medir', 'Apresentar']
+TAREFA_OBJETOS = ['contrato', 'relatório', 'tela de login', 'orçamento', 'cronograma', 'integração',
+                  'planilha', 'campanha', 'backlog', 'entrega']
+
+PREFIXO = 'seed_'
+
+
+def distribuicoes(config=None):
+    """DISTRIBUICOES com as chaves de `config` (dict ou caminho de um JSON) sobrescritas"""
+    if isinstance(config, str):
+        with open(config, encoding='utf-8') as f:
+            config = json.load(f)
+    desconhecidas = set(config or {}) - set(DISTRIBUICOES)
+    if desconhecidas:
+        raise ValueError(f"Distribuição desconhecida: {', '.join(sorted(desconhecidas))}")
+    return {**DISTRIBUICOES, **(config or {})}
+
+
+def conteudo_relatorio(indice, semente):
+    """Bytes do i-ésimo arquivo de relatório (sempre os mesmos pra mesma semente)"""
+    corpo = hashlib.sha256(f'{semente}:{indice}'.encode()).hexdigest() * 16
+    return f"Relatório sintético {indice}\n{corpo}\n".encode()
+
+
+class Gerador:
+    def __init__(self, total_tarefas, semente=42, config=None, hoje=None):
+        self.total_tarefas = total_tarefas
+        self.semente = semente
+        self.dist = distribuicoes(config)
+        # prazos são relativos a `hoje`; fixe a data pra gerar fixtures idênticos em dias diferentes
+        self.hoje = hoje or timezone.localdate()
+        self._planejar()
+
+    def _rng(self, secao):
+        # um Random por seção: usuarios(), projetos()... dão o mesmo resultado em qualquer ordem
+        return random.Random(f'{self.semente}:{secao}')
+
+    @staticmethod
+    def _escolher(rng, pesos):
+        return rng.choices(list(pesos), weights=list(pesos.values()))[0]
+
+    @staticmethod
+    def _gauss_int(rng, spec, minimo=None):
+        valor = round(rng.gauss(spec['media'], spec['desvio']))
+        return valor if minimo is None else max(minimo, valor)
+
+    def _planejar(self):
+        rng = self._rng('plano')
+        # tarefas por projeto até fechar o total pedido
+        self.tarefas_por_projeto = []
+        restante = self.total_tarefas
+        while restante > 0:
+            n = min(restante, self._gauss_int(rng, self.dist['tarefas_por_projeto'], minimo=1))
+            self.tarefas_por_projeto.append(n)
+            restante -= n
+
+        n_projetos = len(self.tarefas_por_projeto)
+        n_equipes = max(1, -(-n_projetos // self.dist['projetos_por_equipe']))
+        minimo, maximo = self.dist['membros_por_equipe']
+        self.tamanho_equipes = [rng.randint(minimo, maximo) for _ in range(n_equipes)]
+
+        # índice do primeiro usuário de cada equipe (o líder)
+        self.inicio_equipe = []
+        total = 0
+        for tamanho in self.tamanho_equipes:
+            self.inicio_equipe.append(total)
+            total += tamanho
+        self.n_usuarios = total
+
+    def membros(self, equipe):
+        inicio = self.inicio_equipe[equipe]
+        return range(inicio, inicio + self.tamanho_equipes[equipe])
+
+    def usuarios(self):
+        rng = self._rng('usuarios')
+        for equipe, tamanho in enumerate(self.tamanho_equipes):
+            for posicao in range(tamanho):
+                i = self.inicio_equipe[equipe] + posicao
+                username = f'{PREFIXO}{i:07d}'
+                yield {
+                    'username': username,
+                    'email': f'{username}@example.com',
+                    'nome': rng.choice(NOMES),
+                    'sobrenome': rng.choice(SOBRENOMES),
+                    'cargo': rng.choice(CARGOS),
+                    'telefone': f'219{rng.randint(1000000, 9999999)}',
+                    'role': 'LEAD' if posicao == 0 else 'MEMBER',
+                    'person_id': uuid.UUID(int=rng.getrandbits(128), version=4),
+                    'equipe': equipe,
+                }
+
+    def equipes(self):
+        for e in range(len(self.tamanho_equipes)):
+            yield {
+                'name': f'Equipe {e:06d}',
+                'descricao': f'Equipe sintética com {self.tamanho_equipes[e]} integrantes',
+                'leader': self.inicio_equipe[e],
+                'membros': list(self.membros(e)),
+            }
+
+    def projetos(self):
+        n_equipes = len(self.tamanho_equipes)
+        categorias = [c for c, _ in CATEGORIA]
+        rng = self._rng('projetos')
+        for p in range(len(self.tarefas_por_projeto)):
+            equipe = p % n_equipes
+            tema = f'{rng.choice(PROJETO_TEMAS)} {rng.choice(PROJETO_ALVOS)}'
+            projeto = {
+                'name': f'{tema} {p:07d}',
+                'descricao': f'{tema} (projeto sintético)',
+                'equipe': equipe,
+                'criador': self.inicio_equipe[equipe],
+                'categoria': rng.choice(categorias),
+                'prioridade': self._escolher(rng, self.dist['prioridade']),
+                # o primeiro projeto de cada equipe é o em andamento (projeto_unico_ativo_por_equipe)
+                'status': 'active' if p < n_equipes else self._escolher(rng, self.dist['status_projeto_encerrado']),
+                'prazofinal': self.hoje + timedelta(days=self._gauss_int(rng, self.dist['prazo_dias'])),
+            }
+            if projeto['status'] == 'active' and projeto['prazofinal'] < self.hoje:
+                projeto['status'] = 'overdue'       # como a varredura de prazos deixaria
+            yield projeto
+
+    def tarefas(self, projetos):
+        """Uma por vez (1M não cabe confortavelmente em memória); `projetos` é a lista de projetos()"""
+        rng = self._rng('tarefas')
+        t = 0
+        for p, quantidade in enumerate(self.tarefas_por_projeto):
+            projeto = projetos[p]
+            membros = self.membros(projeto['equipe'])
+            for _ in range(quantidade):
+                status = self._escolher(rng, self.dist['status_tarefa'])
+                relatorio = None
+                if status == 'done' and rng.random() < self.dist['relatorios']:
+                    relatorio = rng.randrange(self.dist['arquivos_distintos'])
+                name = f'{rng.choice(TAREFA_VERBOS)} {rng.choice(TAREFA_OBJETOS)}'
+                responsavel = rng.choice(membros) if rng.random() < self.dist['com_responsavel'] else None
+                prioridade = self._escolher(rng, self.dist['prioridade'])
+                prazofinal = projeto['prazofinal'] + timedelta(days=rng.randint(-10, 0))
+                # mesma regra da varredura de prazos (prazos.varrer)
+                if status in ('todo', 'doing') and prazofinal < self.hoje:
+                    status = 'late'
+                elif status == 'late' and prazofinal >= self.hoje:
+                    status = 'todo' if responsavel is None else 'doing'
+                yield {
+                    'name': name,
+                    'descricao': f'Tarefa sintética {t:07d}',
+                    'projeto': p,
+                    'equipe': projeto['equipe'],
+                    'responsavel': responsavel,
+                    'status': status,
+                    'prioridade': prioridade,
+                    'prazofinal': prazofinal,
+                    'relatorio': relatorio,
+                }
+                t += 1
+
+    def conteudo(self, indice):
+        return conteudo_relatorio(indice, self.semente)
@@ -0,0 +1,199 @@
+"""Indicadores de desempenho por equipe e projeto, pré-calculados por dia.
+
+IndicadorDiario guarda contadores por (equipe, projeto, dia) que dependem só do estado
+atual de cada tarefa. O save/delete de Tarefas troca a contribuição antiga da tarefa pela
+nova com UPDATE campo = campo + delta (criando a linha se ainda não existir), então a tela
+de indicadores lê O(dias) linhas em vez de varrer as tarefas.
+
+Quem altera tarefas sem passar pelo save (QuerySet.update, COPY do seed) precisa chamar
+atualizar(), mudar_status() ou recalcular(); `manage.py recalcular_indicadores` reconstrói tudo.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, DurationField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from projeto_crm_final.constants import PRIORIDADE, STATUS
+from projeto_crm_final.models import IndicadorDiario, Tarefas
+
+# campos da tarefa que mudam a sua contribuição
+CAMPOS = ('equipe_id', 'projetoparent_id', 'status', 'prioridade', 'prazofinal', 'inicio', 'concluida_em')
+FECHADAS = ('done', 'canceled')
+COLUNAS = (
+    ['criadas'] + [f'status_{s}' for s, _ in STATUS] + [f'prioridade_{p}' for p, _ in PRIORIDADE]
+    + ['concluidas', 'concluidas_no_prazo', 'ciclo_us', 'vencem']
+)
+
+
+def valores(tarefa):
+    return {campo: getattr(tarefa, campo) for campo in CAMPOS}
+
+
+def valores_anteriores(tarefa):
+    """Os CAMPOS como estão no banco, com a linha travada até o fim da transação (None se não existe).
+
+    Chame dentro do atomic que grava a tarefa: o que veio no from_db pode ter sido trocado por
+    outro save enquanto isso, e os dois aplicariam o delta a partir do mesmo estado.
+    """
+    banco = router.db_for_write(Tarefas, instance=tarefa)
+    return Tarefas.objects.using(banco).select_for_update().filter(pk=tarefa.pk).values(*CAMPOS).first()
+
+
+def _microssegundos(duracao):
+    return duracao // timedelta(microseconds=1)
+
+
+def contribuicao(v):
+    """{(equipe_id, projeto_id, dia): Counter de colunas} que a tarefa soma nos indicadores"""
+    linhas = defaultdict(Counter)
+    if not v or v['inicio'] is None:
+        return linhas
+
+    criacao = linhas[(v['equipe_id'], v['projetoparent_id'], timezone.localdate(v['inicio']))]
+    criacao['criadas'] += 1
+    for coluna in (f"status_{v['status']}", f"prioridade_{v['prioridade']}"):
+        if coluna in COLUNAS:
+            criacao[coluna] += 1
+
+    if v['status'] == 'done' and v['concluida_em']:
+        dia = timezone.localdate(v['concluida_em'])
+        conclusao = linhas[(v['equipe_id'], v['projetoparent_id'], dia)]
+        conclusao['concluidas'] += 1
+        conclusao['concluidas_no_prazo'] += dia <= v['prazofinal']
+        conclusao['ciclo_us'] += _microssegundos(v['concluida_em'] - v['inicio'])
+    elif v['status'] not in FECHADAS:
+        linhas[(v['equipe_id'], v['projetoparent_id'], v['prazofinal'])]['vencem'] += 1
+    return linhas
+
+
+def atualizar(antes, depois):
+    """Aplica a diferença entre duas contribuições (None = tarefa nova / apagada)"""
+    deltas = defaultdict(Counter)
+    for chave, colunas in contribuicao(depois).items():
+        deltas[chave].update(colunas)
+    for chave, colunas in contribuicao(antes).items():
+        deltas[chave].subtract(colunas)
+
+    for (equipe_id, projeto_id, dia), colunas in deltas.items():
+        delta = {coluna: n for coluna, n in colunas.items() if n}
+        if delta:
+            _aplicar(equipe_id, projeto_id, dia, delta)
+
+
+def mudar_status(tarefas, status):
+    """Ajusta os indicadores antes de um tarefas.update(status=status) entre status abertos.
+
+    Só a contagem por status do dia de criação muda; uma consulta agrupada dá o delta de
+    cada linha, sem carregar as tarefas.
+    """
+    if status in FECHADAS:
+        raise ValueError(f"mudar_status() não trata conclusão/cancelamento ({status}); use o save")
+    grupos = (tarefas.order_by().exclude(status=status).annotate(dia=TruncDate('inicio'))
+              .values('equipe_id', 'projetoparent_id', 'dia', 'status').annotate(n=Count('id')))
+    for r in grupos:
+        if r['status'] in FECHADAS:
+            raise ValueError(f"mudar_status() não reabre tarefas ({r['status']}); use o save")
+        _aplicar(r['equipe_id'], r['projetoparent_id'], r['dia'],
+                 {f"status_{r['status']}": -r['n'], f'status_{status}': r['n']})
+
+
+def _aplicar(equipe_id, projeto_id, dia, delta):
+    linha = IndicadorDiario.objects.filter(equipe_id=equipe_id, projeto_id=projeto_id, dia=dia)
+    incremento = {coluna: F(coluna) + n for coluna, n in delta.items()}
+    if linha.update(**incremento):
+        return
+    if not any(n > 0 for n in delta.values()):
+        return      # só tirando de uma linha que já foi apagada junto com o projeto/equipe
+    try:
+        with transaction.atomic():
+            IndicadorDiario.objects.create(equipe_id=equipe_id, projeto_id=projeto_id, dia=dia, **delta)
+    except IntegrityError:
+        linha.update(**incremento)      # outro request criou a linha entre o UPDATE e o INSERT
+
+
+def recalcular(projetos=None, batch_size=1000):
+    """Reconstrói os indicadores a partir das tarefas: todos, ou só dos `projetos` (ids ou queryset de ids)"""
+    tarefas = Tarefas.objects.order_by()
+    if projetos is not None:
+        tarefas = tarefas.filter(projetoparent_id__in=projetos)
+    chave = ('equipe_id', 'projetoparent_id', 'dia')
+    linhas = defaultdict(Counter)
+
+    criadas = (tarefas.annotate(dia=TruncDate('inicio')).values(*chave, 'status', 'prioridade')
+               .annotate(n=Count('id')))
+    for r in criadas:
+        linha = linhas[tuple(r[c] for c in chave)]
+        linha['criadas'] += r['n']
+        for coluna in (f"status_{r['status']}", f"prioridade_{r['prioridade']}"):
+            if coluna in COLUNAS:
+                linha[coluna] += r['n']
+
+    concluidas = (
+        tarefas.filter(status='done', concluida_em__isnull=False).annotate(dia=TruncDate('concluida_em'))
+        .values(*chave).annotate(
+            n=Count('id'),
+            no_prazo=Count('id', filter=Q(concluida_em__date__lte=F('prazofinal'))),
+            ciclo=Sum(F('concluida_em') - F('inicio'), output_field=DurationField()),
+        )
+    )
+    for r in concluidas:
+        linha = linhas[tuple(r[c] for c in chave)]
+        linha['concluidas'] += r['n']
+        linha['concluidas_no_prazo'] += r['no_prazo']
+        linha['ciclo_us'] += _microssegundos(r['ciclo'])
+
+    prazos = tarefas.exclude(status__in=FECHADAS).values('equipe_id', 'projetoparent_id', 'prazofinal') \
+        .annotate(n=Count('id'))
+    for r in prazos:
+        linhas[(r['equipe_id'], r['projetoparent_id'], r['prazofinal'])]['vencem'] += r['n']
+
+    with transaction.atomic():
+        existentes = IndicadorDiario.objects.all()
+        if projetos is not None:
+            existentes = existentes.filter(projeto_id__in=projetos)
+        existentes.delete()
+        IndicadorDiario.objects.bulk_create([
+            IndicadorDiario(equipe_id=equipe_id, projeto_id=projeto_id, dia=dia, **colunas)
+            for (equipe_id, projeto_id, dia), colunas in linhas.items()
+        ], batch_size=batch_size)
+    return len(linhas)
+
+
+def resumo(equipe_id=None, projeto_id=None, dias=30, hoje=None):
+    """Distribuição por status e prioridade, vazão diária, pontualidade, ciclo médio e prazos"""
+    hoje = hoje or timezone.localdate()
+    linhas = IndicadorDiario.objects.order_by()
+    if equipe_id is not None:
+        linhas = linhas.filter(equipe_id=equipe_id)
+    if projeto_id is not None:
+        linhas = linhas.filter(projeto_id=projeto_id)
+
+    totais = {coluna: valor or 0 for coluna, valor in linhas.aggregate(**{c: Sum(c) for c in COLUNAS}).items()}
+
+    inicio = hoje - timedelta(days=dias - 1)
+    por_dia = {
+        r['dia']: (r['n_criadas'], r['n_concluidas']) for r in linhas.filter(dia__range=(inicio, hoje))
+        .values('dia').annotate(n_criadas=Sum('criadas'), n_concluidas=Sum('concluidas'))
+    }
+    vazao = [(dia, *por_dia.get(dia, (0, 0))) for dia in (inicio + timedelta(days=i) for i in range(dias))]
+
+    prazos = linhas.filter(vencem__gt=0, dia__lte=hoje + timedelta(days=14)).values('dia') \
+        .annotate(n=Sum('vencem')).order_by('dia')
+    vencidas = sum(r['n'] for r in prazos if r['dia'] < hoje)
+
+    concluidas = totais['concluidas']
+    return {
+        'criadas': totais['criadas'],
+        'status': [(s, nome, totais[f'status_{s}']) for s, nome in STATUS],
+        'prioridade': [(p, nome, totais[f'prioridade_{p}']) for p, nome in PRIORIDADE],
+        'concluidas': concluidas,
+        'no_prazo_pct': round(100 * totais['concluidas_no_prazo'] / concluidas, 1) if concluidas else None,
+        'ciclo_medio': timedelta(microseconds=totais['ciclo_us'] // concluidas) if concluidas else None,
+        'vazao': vazao,
+        'concluidas_periodo': sum(c for _, _, c in vazao),
+        'proximos_prazos': [(r['dia'], r['n']) for r in prazos if r['dia'] >= hoje],
+        'vencidas': vencidas,
+    }
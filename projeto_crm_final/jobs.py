@@ -0,0 +1,258 @@
+"""Fila de jobs em background guardada no banco.
+
+As views só gravam um Job (enqueue) e respondem; `manage.py run_workers` pega os jobs
+pendentes e executa o handler registrado para o tipo. Falhas voltam pra fila com
+backoff exponencial até max_tentativas, depois ficam como 'failed' com o erro salvo.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import cloudinary.uploader
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from projeto_crm_final import notificacoes
+from projeto_crm_final.models import Job, Projetos, RelatorioProjeto, RelatorioTarefa, Tarefas
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(tipo):
+    """Decorator que registra a função como handler do tipo de job"""
+    def decorator(func):
+        HANDLERS[tipo] = func
+        return func
+    return decorator
+
+
+def enqueue(tipo, max_tentativas=5, atraso=None, **payload):
+    """Grava o job; o payload precisa ser serializável em JSON (ids, strings...)"""
+    executar_em = timezone.now() + (atraso or timedelta())
+    job = Job.objects.create(tipo=tipo, payload=payload, max_tentativas=max_tentativas, executar_em=executar_em)
+    if settings.JOBS_EAGER:
+        # roda depois do commit pra que o handler enxergue os dados gravados na view
+        transaction.on_commit(lambda: _run_eager(job))
+    return job
+
+
+def _run_eager(job):
+    if Job.objects.filter(pk=job.pk, status='pending').update(status='running', atualizado=timezone.now()):
+        run_job(job)
+
+
+def backoff(tentativas):
+    return timedelta(seconds=min(settings.JOBS_BACKOFF_BASE * 2 ** (tentativas - 1), settings.JOBS_BACKOFF_MAX))
+
+
+def requeue_stuck():
+    """Devolve pra fila jobs 'running' de workers que morreram no meio"""
+    agora = timezone.now()
+    limite = agora - timedelta(seconds=settings.JOBS_TIMEOUT)
+    return Job.objects.filter(status='running', atualizado__lt=limite).update(
+        status='pending', executar_em=agora, atualizado=agora
+    )
+
+
+def claim():
+    """Reserva o próximo job pendente.
+
+    O UPDATE condicional (status='pending') garante que dois workers nunca peguem o
+    mesmo job, em qualquer banco, sem precisar de SELECT ... FOR UPDATE.
+    """
+    agora = timezone.now()
+    candidatos = Job.objects.filter(status='pending', executar_em__lte=agora).order_by(
+        'executar_em', 'id'
+    ).values_list('id', flat=True)[:10]
+    for job_id in candidatos:
+        if Job.objects.filter(pk=job_id, status='pending').update(status='running', atualizado=agora):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.tipo)
+    job.tentativas += 1
+    try:
+        if handler is None:
+            raise LookupError(f"Nenhum handler registrado para '{job.tipo}'")
+        handler(**job.payload)
+    except Exception as e:
+        job.erro = f"{type(e).__name__}: {e}"
+        if handler is None or job.tentativas >= job.max_tentativas:
+            job.status = 'failed'
+            logger.exception("Job %s falhou definitivamente", job)
+        else:
+            job.status = 'pending'
+            job.executar_em = timezone.now() + backoff(job.tentativas)
+            logger.warning("Job %s falhou (tentativa %s), nova tentativa às %s", job, job.tentativas, job.executar_em)
+    else:
+        job.status = 'done'
+        job.erro = ''
+    job.save(update_fields=['status', 'tentativas', 'erro', 'executar_em', 'atualizado'])
+    return job
+
+
+def run_pending(limit=None):
+    """Executa jobs pendentes até esvaziar a fila (ou até `limit`); retorna quantos rodaram"""
+    requeue_stuck()
+    executados = 0
+    while limit is None or executados < limit:
+        job = claim()
+        if job is None:
+            break
+        run_job(job)
+        executados += 1
+    return executados
+
+
+def worker_loop(stop, poll=2.0):
+    """Loop de um worker (thread ou processo) até `stop` ser sinalizado"""
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            requeue_stuck()
+            job = claim()
+            if job is None:
+                stop.wait(poll)
+                continue
+            run_job(job)
+    finally:
+        connections.close_all()
+
+
+# ---------- Handlers
+
+def _upload(relatorio, asset_folder, public_id):
+    """Sobe o arquivo do relatório; com blob, cada conteúdo sobe uma vez só"""
+    blob = relatorio.blob
+    if blob is not None:
+        if not blob.cloudinary_url:
+            blob.cloudinary_url = _upload_cloudinary(blob.arquivo, 'blobs', blob.sha256)
+            blob.save(update_fields=['cloudinary_url'])
+        return blob.cloudinary_url
+    return _upload_cloudinary(relatorio.arquivo, asset_folder, public_id)
+
+
+def _upload_cloudinary(arquivo, asset_folder, public_id):
+    with arquivo.open('rb') as file:
+        upload_result = cloudinary.uploader.upload(
+            file=file,
+            asset_folder=asset_folder,
+            public_id=public_id,
+            override=True,
+            resource_type="raw"
+        )
+    return upload_result['secure_url']
+
+
+@register('upload_relatorio_projeto')
+def upload_relatorio_projeto(relatorio_id):
+    relatorio = RelatorioProjeto.objects.select_related('projeto', 'blob').get(pk=relatorio_id)
+    # numa nova tentativa depois de um upload que deu certo não sobe de novo
+    if not relatorio.cloudinary_url:
+        date_prefix = relatorio.enviado_em.strftime('%Y_%m_%d')
+        relatorio.cloudinary_url = _upload(
+            relatorio, 'relatorios', f'{date_prefix}_relatorio_{relatorio.projeto.name}'
+        )
+        relatorio.save(update_fields=['cloudinary_url'])
+    enqueue('email_projeto_concluido', relatorio_id=relatorio.pk)
+
+
+@register('email_projeto_concluido')
+def email_projeto_concluido(relatorio_id):
+    relatorio = RelatorioProjeto.objects.select_related('projeto__equipe').get(pk=relatorio_id)
+    projeto = relatorio.projeto
+    equipe = projeto.equipe
+    if equipe is None:
+        return
+
+    notificacoes.notificar_equipe(equipe, f'Projeto {projeto.name} Concluído', f'''
+    Parabéns à equipe {equipe.name}!
+    O projeto "{projeto.name}" foi concluído pelo líder da equipe.
+
+    Descrição do projeto:
+    {projeto.descricao}
+
+    Relatório disponível em: {relatorio.cloudinary_url or relatorio.arquivo.url}
+    ''')
+
+
+@register('upload_relatorio_tarefa')
+def upload_relatorio_tarefa(relatorio_id):
+    relatorio = RelatorioTarefa.objects.select_related('tarefa', 'blob').get(pk=relatorio_id)
+    if not relatorio.cloudinary_url:
+        task = relatorio.tarefa
+        date_prefix = relatorio.data_envio.strftime('%Y_%m_%d')
+        relatorio.cloudinary_url = _upload(
+            relatorio, 'relatorios_tarefas', f'{date_prefix}_relatorio_{task.id}_{task.name[:20]}'
+        )
+        relatorio.save(update_fields=['cloudinary_url'])
+    enqueue('email_tarefa_concluida', relatorio_id=relatorio.pk)
+
+
+@register('email_tarefa_concluida')
+def email_tarefa_concluida(relatorio_id):
+    relatorio = RelatorioTarefa.objects.select_related(
+        'tarefa__projetoparent__equipe', 'enviado_por'
+    ).get(pk=relatorio_id)
+    task = relatorio.tarefa
+    equipe = task.projetoparent.equipe
+    if equipe is None:
+        return
+
+    message = f'''
+    A tarefa "{task.name}" foi concluída por {relatorio.enviado_por.nome}.
+
+    Descrição da tarefa:
+    {task.descricao}
+
+    Relatório:
+    {relatorio.descricao}
+
+    Arquivo do relatório: {relatorio.arquivo.url}
+    '''
+    if relatorio.cloudinary_url:
+        message += f"\n    Link Cloudinary: {relatorio.cloudinary_url}"
+
+    notificacoes.notificar_equipe(equipe, f'Tarefa Concluída: {task.name}', message)
+
+
+@register('enviar_digests')
+def enviar_digests():
+    notificacoes.enviar_digests()
+
+
+@register('varrer_prazos')
+def varrer_prazos():
+    from projeto_crm_final import prazos     # prazos enfileira jobs
+
+    prazos.varrer()
+    prazos.agendar()
+
+
+@register('avisar_prazos')
+def avisar_prazos(tarefas=(), projetos=()):
+    """Avisa quem responde pelas tarefas/projetos que a varredura marcou como vencidos"""
+    # uma mensagem por pessoa com todas as tarefas dela (sem responsável: o líder da equipe)
+    por_email = defaultdict(list)
+    for task in Tarefas.objects.filter(pk__in=tarefas, status='late').select_related(
+        'responsavel__user', 'equipe__leader__user', 'projetoparent'
+    ).order_by('prazofinal'):
+        pessoa = task.responsavel or task.equipe.leader
+        por_email[pessoa.user.email].append(task)
+    for email, lista in por_email.items():
+        linhas = '\n'.join(f"- {t.name} ({t.projetoparent.name}), prazo {t.prazofinal:%d/%m/%Y}" for t in lista)
+        notificacoes.notificar([email], f'{len(lista)} tarefa(s) com prazo vencido',
+                               f"As tarefas abaixo passaram do prazo e foram marcadas como atrasadas:\n\n{linhas}")
+
+    for projeto in Projetos.objects.filter(pk__in=projetos, status='overdue').select_related('equipe', 'criador__user'):
+        assunto = f'Projeto Atrasado: {projeto.name}'
+        message = f'O projeto "{projeto.name}" passou do prazo ({projeto.prazofinal:%d/%m/%Y}) e foi marcado como atrasado.'
+        if projeto.equipe:
+            notificacoes.notificar_equipe(projeto.equipe, assunto, message)
+        else:
+            notificacoes.notificar([projeto.criador.user.email], assunto, message)
@@ -0,0 +1,133 @@
+# bench_conexoes.py
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from projeto_crm_final.models import Projetos
+
+MODOS = ['none', 'persistent', 'pool']
+
+
+class Command(BaseCommand):
+    help = ("Compara requests/s do DashboardView em cada DB_CONN_MODE (none, persistent, pool). "
+            "Cada modo roda num processo separado, chamando o WSGIHandler como o gunicorn faz.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', default=','.join(MODOS), help='Modos separados por vírgula')
+        parser.add_argument('--requests', type=int, default=300, help='Requests por modo')
+        parser.add_argument('--threads', type=int, default=4, help='Requests simultâneos')
+        parser.add_argument('--username', help='Usuário logado (padrão: líder de uma equipe com projeto ativo)')
+        parser.add_argument('--host', default='localhost', help='Host do request (precisa estar em ALLOWED_HOSTS)')
+        parser.add_argument('--output', help='Salva resultado em JSON')
+        parser.add_argument('--modo-interno', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['modo_interno']:
+            self.stdout.write(json.dumps(self.medir(options)))
+            return
+
+        resultados = {}
+        for modo in options['modos'].split(','):
+            cmd = [sys.executable, '-m', 'django', 'bench_conexoes', '--modo-interno', modo,
+                   '--requests', str(options['requests']), '--threads', str(options['threads']),
+                   '--host', options['host']]
+            if options['username']:
+                cmd += ['--username', options['username']]
+            env = {**os.environ, 'DB_CONN_MODE': modo,
+                   'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+            proc = subprocess.run(cmd, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise CommandError(f"Modo {modo} falhou:\n{proc.stderr}")
+            resultados[modo] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"DashboardView - {options['requests']} requests, {options['threads']} threads, {connection.vendor}"
+        ))
+        for modo, r in resultados.items():
+            if r.get('ignorado'):
+                self.stdout.write(f"{modo:>11}: ignorado ({r['ignorado']})")
+                continue
+            self.stdout.write(
+                f"{modo:>11}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:6.1f} ms  "
+                f"conexões abertas {r['conexoes']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'vendor': connection.vendor, 'modos': resultados}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
+
+    def usuario(self, username):
+        if username:
+            return User.objects.get(username=username)
+        projeto = Projetos.objects.filter(
+            status='active', equipe__isnull=False
+        ).select_related('equipe__leader__user').first()
+        if projeto is None:
+            raise CommandError("Banco vazio - rode os comandos populate_* (ou seed) antes.")
+        return projeto.equipe.leader.user
+
+    def medir(self, options):
+        modo = options['modo_interno']
+        if modo == 'pool' and 'pool' not in settings.DATABASES['default']['OPTIONS']:
+            return {'ignorado': 'pool só existe no PostgreSQL com psycopg 3'}
+
+        client = Client()
+        client.force_login(self.usuario(options['username']))
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        path = reverse('dashboard')
+        handler = WSGIHandler()
+
+        conexoes = []
+        lock = threading.Lock()
+
+        def contar(sender, **kwargs):
+            with lock:
+                conexoes.append(1)
+        connection_created.connect(contar)
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+                'SERVER_NAME': options['host'], 'SERVER_PORT': '80', 'HTTP_HOST': options['host'],
+                'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_COOKIE': cookie,
+                'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+            }
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            response.close()    # dispara request_finished, como o servidor WSGI
+            if response.status_code != 200:
+                raise CommandError(f"DashboardView respondeu {response.status_code}")
+            return (time.perf_counter() - start) * 1000
+
+        for _ in range(options['threads']):
+            request(None)   # aquecimento
+        conexoes.clear()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            tempos = sorted(pool.map(request, range(options['requests'])))
+        total = time.perf_counter() - start
+
+        return {
+            'rps': round(options['requests'] / total, 1),
+            'p50_ms': round(tempos[len(tempos) // 2], 2),
+            'p95_ms': round(tempos[int(len(tempos) * 0.95) - 1], 2),
+            'conexoes': len(conexoes),
+        }
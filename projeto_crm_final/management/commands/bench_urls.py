@@ -0,0 +1,95 @@
+# bench_urls.py
+import json
+import logging
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, \
+    teardown_databases, teardown_test_environment
+
+from projeto_crm_final import bench, seeding
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Mede latência (p50/p95), queries e pico de memória de cada rota nomeada, com o test client, "
+            "num banco de teste gerado pelo seed em cada escala. Não toca no banco configurado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1k,10k', help='Escalas (tarefas) separadas por vírgula')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Requests medidos por caso')
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--rota', help='Só os casos que contêm esse texto (ex.: projetos_list)')
+        parser.add_argument('--output', help='Salva resultado em JSON')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior pra apontar regressões')
+        parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento de p50 aceito (0.2 = 20%%)')
+        parser.add_argument('--falhar', action='store_true', help='Sai com erro se houver regressão')
+
+    def handle(self, *args, **options):
+        faltando = bench.sem_cobertura()
+        if faltando:
+            raise CommandError(f"Rotas sem caso em bench.ROTAS nem em bench.IGNORADAS: {', '.join(sorted(faltando))}")
+        try:
+            escalas = [seeding.total_de_tarefas(e) for e in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError(f"Escala inválida em {options['scales']}")
+
+        resultado = {
+            'commit': _commit(),
+            'vendor': connection.vendor,
+            'semente': options['semente'],
+            'repeticoes': options['repeticoes'],
+            'escalas': {},
+        }
+
+        # views que respondem 500 aparecem no resultado; o traceback de cada request só polui a saída
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        setup_test_environment()
+        bancos = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            with override_settings(
+                MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False, DATABASE_REPLICAS=[],
+                METRICS_SAMPLE_RATE=0, METRICS_SLOW_MS=float('inf'),
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': 'bench-urls'}},
+            ):
+                for total in escalas:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"{total} tarefas"))
+                    casos = bench.medir_escala(total, options['semente'], options['repeticoes'], options['rota'])
+                    resultado['escalas'][str(total)] = casos
+                    for nome, r in casos.items():
+                        estilo = self.style.ERROR if r['status'] >= 400 else (lambda s: s)
+                        self.stdout.write(estilo(
+                            f"  {nome:<45} {r['status']}  p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+                            f"{r['queries']:3d} queries  {r['pico_kb']:9.1f} KB"
+                        ))
+        finally:
+            teardown_databases(bancos, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as f:
+                anterior = json.load(f)
+            regressoes = bench.comparar(anterior, resultado, options['tolerancia'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Comparado com {anterior.get('commit') or options['comparar']}: {len(regressoes)} regressão(ões)"
+            ))
+            for escala, nome, metrica, antes, depois in regressoes:
+                self.stdout.write(self.style.WARNING(f"  [{escala}] {nome}: {metrica} {antes} -> {depois}"))
+            if regressoes and options['falhar']:
+                raise CommandError("Regressões de desempenho encontradas")
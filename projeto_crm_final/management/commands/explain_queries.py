@@ -0,0 +1,76 @@
+# explain_queries.py
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from projeto_crm_final.constants import PROJETO_EM_ANDAMENTO
+from projeto_crm_final.models import Projetos, Tarefas, AuditLog
+
+
+def hot_queries():
+    """Consultas mais frequentes das views, com ids reais tirados do banco"""
+    projeto = Projetos.objects.filter(status='active', equipe__isnull=False).first()
+    maior = Projetos.objects.annotate(n=Count('tarefas_do_projeto')).order_by('-n').first()
+    if not projeto or not maior:
+        raise CommandError("Banco vazio - rode os comandos populate_* (ou seed) antes.")
+    hoje = timezone.now().date()
+    usuario = AuditLog.objects.values_list('usuario_id', flat=True).first()
+
+    queries = {
+        # navbar_context / DashboardView / EquipesGetView / assign_project / Projetos.clean
+        'projeto_ativo_da_equipe': Projetos.objects.filter(equipe_id=projeto.equipe_id,
+                                                           status__in=PROJETO_EM_ANDAMENTO),
+        # ProjetosView ?status=overdue
+        'projetos_vencidos': Projetos.objects.filter(status='overdue').order_by('-inicio')[:12],
+        # prazos.varrer (sweep_deadlines)
+        'varredura_tarefas_vencidas': Tarefas.objects.filter(status__in=('todo', 'doing'), prazofinal__lt=hoje),
+        # DashboardView (kanban)
+        'kanban_do_projeto': Tarefas.objects.filter(projetoparent=maior).select_related('responsavel'),
+        'tarefas_por_status': Tarefas.objects.filter(projetoparent=maior, status='todo'),
+        # ProjetosGetView / TarefasExportCSSView
+        'tarefas_por_prazo': Tarefas.objects.filter(projetoparent=maior).order_by('prazofinal'),
+    }
+    if usuario:
+        queries['auditoria_do_usuario'] = AuditLog.objects.filter(usuario_id=usuario).order_by('-timestamp')[:50]
+    return queries
+
+
+class Command(BaseCommand):
+    help = ("Mostra o plano (EXPLAIN) e o tempo das consultas mais usadas. "
+            "Rode antes e depois de migrar para comparar os índices.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Execuções por consulta (mediana)')
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (só PostgreSQL)')
+        parser.add_argument('--output', help='Salva resultado em JSON para comparar depois')
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze só é suportado no PostgreSQL")
+            explain_options = {'analyze': True, 'buffers': True}
+
+        results = {}
+        for name, queryset in hot_queries().items():
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            plan = queryset.explain(**explain_options)
+            results[name] = {'mediana_ms': round(statistics.median(timings), 3), 'plano': plan}
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {results[name]['mediana_ms']} ms"))
+            self.stdout.write(plan)
+            self.stdout.write("")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'vendor': connection.vendor, 'consultas': results}, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
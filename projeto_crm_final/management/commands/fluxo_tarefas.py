@@ -0,0 +1,55 @@
+# fluxo_tarefas.py
+import csv
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import fluxo
+from projeto_crm_final.models import Equipes
+
+
+def _horas(valor):
+    return '-' if np.isnan(valor) else f"{valor:.1f}"
+
+
+class Command(BaseCommand):
+    help = ("Lead time, tempo de ciclo e vazão por equipe, calculados com NumPy sobre o histórico de "
+            "status das tarefas (TransicaoTarefa) de todos os projetos numa passada.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=28, help='Janela de conclusões (dias até hoje)')
+        parser.add_argument('--equipe', type=int, action='append', help='Só essa equipe (repetível)')
+        parser.add_argument('--csv', help='Grava uma linha por equipe nesse arquivo')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        dados = fluxo.exportar(equipes=options['equipe'])
+        exportado = time.perf_counter()
+        r = fluxo.calcular(dados, dias=options['dias'])
+        calculado = time.perf_counter()
+
+        nomes = dict(Equipes.objects.filter(pk__in=r['equipes'].tolist()).values_list('pk', 'name'))
+        colunas = ['equipe', 'concluidas', 'em_andamento', 'lead_media_h', 'lead_p50_h', 'lead_p85_h',
+                   'ciclo_media_h', 'ciclo_p50_h', 'ciclo_p85_h', 'vazao_dia']
+        linhas = [
+            [nomes.get(equipe, equipe), r['concluidas'][i], r['em_andamento'][i],
+             *(_horas(r[c][i]) for c in colunas[3:9]), f"{r['concluidas'][i] / options['dias']:.2f}"]
+            for i, equipe in enumerate(r['equipes'].tolist())
+        ]
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f)
+                escritor.writerow(colunas)
+                escritor.writerows(linhas)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['csv']}"))
+        else:
+            self.stdout.write('  '.join(f"{c:>13}" for c in colunas))
+            for linha in linhas:
+                self.stdout.write('  '.join(f"{str(v)[:13]:>13}" for v in linha))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(dados)} transições, {len(r['equipes'])} equipe(s): exportação "
+            f"{exportado - inicio:.2f}s, cálculo {calculado - exportado:.3f}s"
+        ))
@@ -0,0 +1,24 @@
+# gc_blobs.py
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import blobs
+
+
+class Command(BaseCommand):
+    help = "Apaga os blobs de relatório que não são mais referenciados por nenhum relatório."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recontar', action='store_true',
+                            help='Recalcula os refcounts a partir dos relatórios antes de coletar')
+        parser.add_argument('--dry-run', action='store_true', help='Só mostra o que seria apagado')
+
+    def handle(self, *args, **options):
+        if options['recontar']:
+            corrigidos = blobs.recontar()
+            self.stdout.write(f"{corrigidos} refcount(s) corrigido(s)")
+
+        quantidade, liberados = blobs.coletar(dry_run=options['dry_run'])
+        verbo = "seriam apagados" if options['dry_run'] else "apagados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{quantidade} blob(s) {verbo} ({liberados / 1024 / 1024:.1f} MB)"
+        ))
@@ -0,0 +1,15 @@
+# limpar_uploads.py
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import uploads
+
+
+class Command(BaseCommand):
+    help = "Descarta uploads em partes abandonados (registro e arquivo temporário)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, help='Idade mínima (padrão: UPLOAD_EXPIRA_HORAS)')
+
+    def handle(self, *args, **options):
+        removidos = uploads.limpar_expirados(options['horas'])
+        self.stdout.write(self.style.SUCCESS(f"{removidos} upload(s) descartado(s)"))
@@ -0,0 +1,92 @@
+# loadtest.py
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = ("Dispara GETs concorrentes contra um servidor já rodando e mede req/s e latência. "
+            "Rode com o mesmo banco contra gunicorn sync (config.wsgi) e uvicorn (config.asgi) pra comparar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Ex.: http://localhost:8000/dashboard/')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests simultâneos')
+        parser.add_argument('--requests', type=int, default=200, help='Requests por URL')
+        parser.add_argument('--username', help='Loga como esse usuário (sessão criada direto no banco)')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--output', help='Salva resultado em JSON')
+
+    def handle(self, *args, **options):
+        cookie = ''
+        if options['username']:
+            client = Client()
+            client.force_login(User.objects.get(username=options['username']))
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+        resultados = {}
+        for url in options['urls']:
+            resultados[url] = asyncio.run(self.carga(url, cookie, options))
+            r = resultados[url]
+            self.stdout.write(
+                f"{url}\n  {r['rps']:.1f} req/s  p50 {r['p50_ms']:.1f} ms  p95 {r['p95_ms']:.1f} ms  "
+                f"status {r['status']}  erros {r['erros']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(resultados, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
+
+    async def carga(self, url, cookie, options):
+        partes = urlsplit(url)
+        if partes.scheme != 'http':
+            raise CommandError("Só http:// (rode contra o servidor local)")
+        host, porta = partes.hostname, partes.port or 80
+        caminho = partes.path or '/'
+        if partes.query:
+            caminho += f'?{partes.query}'
+        pedido = (
+            f"GET {caminho} HTTP/1.1\r\nHost: {partes.netloc}\r\n"
+            + (f"Cookie: {cookie}\r\n" if cookie else '')
+            + "Connection: close\r\n\r\n"
+        ).encode()
+
+        semaforo = asyncio.Semaphore(options['concurrency'])
+        tempos, status, erros = [], {}, 0
+
+        async def um_request():
+            nonlocal erros
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, porta), options['timeout'])
+                    writer.write(pedido)
+                    await writer.drain()
+                    resposta = await asyncio.wait_for(reader.read(), options['timeout'])
+                    writer.close()
+                    codigo = int(resposta.split(b' ', 2)[1])
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    erros += 1
+                    return
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                status[codigo] = status.get(codigo, 0) + 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(um_request() for _ in range(options['requests'])))
+        total = time.perf_counter() - inicio
+
+        tempos.sort()
+        return {
+            'rps': len(tempos) / total if total else 0,
+            'p50_ms': statistics.median(tempos) if tempos else 0,
+            'p95_ms': tempos[int(len(tempos) * 0.95) - 1] if tempos else 0,
+            'status': status,
+            'erros': erros,
+        }
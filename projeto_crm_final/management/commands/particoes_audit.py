@@ -0,0 +1,31 @@
+# particoes_audit.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import auditoria
+
+
+class Command(BaseCommand):
+    help = ("Mantém as partições mensais da auditoria: cria as dos próximos meses (PostgreSQL), "
+            "arquiva os meses encerrados (SQLite) e, com --podar, faz DROP das mais antigas. "
+            "Rodar uma vez por dia (cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses-a-frente', type=int, default=3)
+        parser.add_argument('--podar', action='store_true', help='Remove as partições fora da retenção')
+        parser.add_argument('--retencao', type=int, help='Meses mantidos (padrão: AUDIT_RETENCAO_MESES)')
+
+    def handle(self, *args, **options):
+        for nome in auditoria.criar_particoes(options['meses_a_frente']):
+            self.stdout.write(f"criada {nome}")
+        for nome in auditoria.rollover():
+            self.stdout.write(f"arquivada {nome}")
+        if options['podar']:
+            retencao = options['retencao'] or settings.AUDIT_RETENCAO_MESES
+            for nome in auditoria.podar(retencao):
+                self.stdout.write(f"removida {nome}")
+
+        particoes = auditoria.particoes()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(particoes)} partição(ões): " + (', '.join(particoes.values()) or '-')
+        ))
@@ -211,9 +211,9 @@ class Command(BaseCommand):
 
             # Create 3-10 tasks per project
             num_tasks = random.randint(3, 10)
+            team_members = list(project.equipe.membros.all())
             for _ in range(num_tasks):
                 # Select random team member (20% chance for no responsible)
-                team_members = list(project.equipe.membros.all())
                 responsible = random.choice(team_members) if random.random() < 0.8 else None
 
                 Tarefas.objects.create(
@@ -3,6 +3,7 @@ import os
 import random
 import uuid
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.db import transaction
 from projeto_crm_final.models import Integrantes
@@ -48,14 +49,16 @@ def ensure_min_user_id(min_id):
         current_max = User.objects.all().order_by('-id').first().id or 0
     except Exception:
         current_max = 0
-    created = 0
-    while current_max < (min_id - 1):
-        current_max += 1
-        uname = f"_dummy_{current_max}"
-        if not User.objects.filter(username=uname).exists():
-            User.objects.create_user(username=uname, password=uuid.uuid4().hex[:8])
-            created += 1
-    return created
+    # uma senha só (hash uma vez) e um bulk_create, em vez de create_user por linha
+    password = make_password(uuid.uuid4().hex[:8])
+    existing = set(User.objects.filter(username__startswith="_dummy_").values_list('username', flat=True))
+    dummies = [
+        User(username=f"_dummy_{n}", password=password)
+        for n in range(current_max + 1, min_id)
+        if f"_dummy_{n}" not in existing
+    ]
+    User.objects.bulk_create(dummies)
+    return len(dummies)
 
 @transaction.atomic
 def create_integrantes(names_path, cargos_path, min_user_id=22):
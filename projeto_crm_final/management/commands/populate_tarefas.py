@@ -39,6 +39,7 @@ def create_tarefas(avg_per_project=3):
         ]
 
     created = 0
+    membros_por_equipe = {}
 
     try:
         from projeto_crm_final.constants import PRIORIDADE, STATUS
@@ -54,7 +55,9 @@ def create_tarefas(avg_per_project=3):
             name = random.choice(tarefa_names)
             descricao = random.choice(descriptions)
             equipe = projeto.equipe or random.choice(equipes) if equipes else None
-            membros = list(equipe.membros.all()) if equipe else []
+            if equipe and equipe.pk not in membros_por_equipe:
+                membros_por_equipe[equipe.pk] = list(equipe.membros.all())
+            membros = membros_por_equipe.get(equipe.pk, []) if equipe else []
             responsavel = random.choice(membros) if membros and random.random() < 0.8 else None
             status = random.choice(STATUS_VALUES)
             prioridade = random.choice(PRIORIDADE_VALUES)
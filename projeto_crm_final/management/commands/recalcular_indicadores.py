@@ -0,0 +1,16 @@
+# recalcular_indicadores.py
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import indicadores
+
+
+class Command(BaseCommand):
+    help = ("Reconstrói os indicadores diários (IndicadorDiario) a partir das tarefas. Necessário depois "
+            "de cargas ou updates em massa que não passam pelo save das tarefas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projeto', type=int, action='append', help='Só esse projeto (repetível)')
+
+    def handle(self, *args, **options):
+        linhas = indicadores.recalcular(options['projeto'])
+        self.stdout.write(self.style.SUCCESS(f"{linhas} linha(s) de indicadores gravada(s)"))
@@ -0,0 +1,53 @@
+# run_workers.py
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from projeto_crm_final import jobs
+
+
+class Command(BaseCommand):
+    help = ("Processa a fila de jobs (uploads pro Cloudinary, e-mails de conclusão) "
+            "com um pool de threads ou processos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Quantidade de workers')
+        parser.add_argument('--processes', action='store_true', help='Usa processos em vez de threads')
+        parser.add_argument('--poll', type=float, default=2.0, help='Espera (s) quando a fila está vazia')
+        parser.add_argument('--once', action='store_true', help='Esvazia a fila e sai (cron / deploy)')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            executados = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"{executados} job(s) executado(s)"))
+            return
+
+        if options['processes']:
+            # cada processo abre a própria conexão; a herdada do pai não pode ser compartilhada
+            connections.close_all()
+            stop = multiprocessing.Event()
+            workers = [multiprocessing.Process(target=jobs.worker_loop, args=(stop, options['poll']))
+                       for _ in range(options['workers'])]
+        else:
+            stop = threading.Event()
+            workers = [threading.Thread(target=jobs.worker_loop, args=(stop, options['poll']))
+                       for _ in range(options['workers'])]
+
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        for worker in workers:
+            worker.start()
+        modo = 'processos' if options['processes'] else 'threads'
+        self.stdout.write(f"{len(workers)} worker(s) ({modo}) aguardando jobs. Ctrl+C para parar.")
+
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=1)
+        except KeyboardInterrupt:
+            stop.set()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers finalizados"))
@@ -0,0 +1,58 @@
+# seed.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from projeto_crm_final import seeding
+
+
+class Command(BaseCommand):
+    help = ("Gera uma base sintética e reproduzível pra testes de carga (bulk_create em lotes, COPY no "
+            "PostgreSQL) ou um fixture JSON com ela. --scale 1k, 100k ou 1m tarefas (ou um número); "
+            "mesma --semente e --config = mesmos dados.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 100k, 1m ou a quantidade de tarefas')
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--config', help='JSON sobrescrevendo as distribuições de gerador.DISTRIBUICOES')
+        parser.add_argument('--batch-size', type=int, default=seeding.BATCH_SIZE)
+        parser.add_argument('--limpar', action='store_true', help='Apaga um seed anterior antes de gerar')
+        parser.add_argument('--fixture', help='Grava um fixture JSON nesse caminho em vez de gravar no banco')
+        parser.add_argument('--hoje', type=date.fromisoformat,
+                            help='Data base dos prazos no fixture (AAAA-MM-DD); padrão: hoje')
+
+    def handle(self, *args, **options):
+        try:
+            total = seeding.total_de_tarefas(options['scale'])
+        except ValueError:
+            raise CommandError(f"Escala inválida: {options['scale']}")
+
+        inicio = time.perf_counter()
+        try:
+            if options['fixture']:
+                with open(options['fixture'], 'w', encoding='utf-8') as saida:
+                    contagens = seeding.exportar_fixture(
+                        saida, total, semente=options['semente'], config=options['config'], hoje=options['hoje']
+                    )
+                destino = options['fixture']
+            else:
+                if options['limpar']:
+                    apagados = seeding.limpar()
+                    self.stdout.write(f"{apagados} registro(s) do seed anterior apagado(s)")
+                elif seeding.existe():
+                    raise CommandError("Já existe um seed no banco - use --limpar pra gerar de novo.")
+                contagens = seeding.semear(
+                    total, batch_size=options['batch_size'], semente=options['semente'], config=options['config']
+                )
+                destino = f"{connection.vendor}, {'COPY' if seeding.usa_copy() else 'bulk_create'}"
+        except ValueError as e:
+            raise CommandError(str(e))
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{n} {nome}" for nome, n in contagens.items())
+            + f" em {duracao:.1f}s ({destino})"
+        ))
+        self.stdout.write(f"Senha de todos os usuários: {seeding.SENHA_PADRAO}")
@@ -0,0 +1,16 @@
+# send_digests.py
+from django.core.management.base import BaseCommand
+
+from projeto_crm_final import notificacoes
+
+
+class Command(BaseCommand):
+    help = ("Envia os digests de notificação vencidos numa única conexão SMTP. "
+            "Normalmente o job 'enviar_digests' faz isso; útil em cron ou pra forçar o envio.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Ignora a janela e envia tudo que está pendente')
+
+    def handle(self, *args, **options):
+        enviados = notificacoes.enviar_digests(forcar=options['todos'])
+        self.stdout.write(self.style.SUCCESS(f"{enviados} digest(s) enviado(s)"))
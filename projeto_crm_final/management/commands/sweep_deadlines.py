@@ -0,0 +1,34 @@
+# sweep_deadlines.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projeto_crm_final import prazos
+
+
+class Command(BaseCommand):
+    help = ("Marca como atrasadas ('late') as tarefas e vencidos ('overdue') os projetos com prazo "
+            "anterior a hoje, e desfaz quando o prazo foi estendido. Rodar uma vez por dia (cron) ou "
+            "usar --agendar pra deixar o job 'varrer_prazos' se reagendando na fila (run_workers).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hoje', help='Data de referência AAAA-MM-DD (padrão: hoje)')
+        parser.add_argument('--batch-size', type=int, default=prazos.BATCH_SIZE)
+        parser.add_argument('--agendar', action='store_true', help='Só agenda o job diário e sai')
+
+    def handle(self, *args, **options):
+        if options['agendar']:
+            job = prazos.agendar()
+            if job is None:
+                raise CommandError("JOBS_EAGER está ligado: sem fila pra agendar, use o cron")
+            self.stdout.write(self.style.SUCCESS(f"Varredura agendada pra {job.executar_em:%d/%m/%Y %H:%M}"))
+            return
+
+        try:
+            hoje = date.fromisoformat(options['hoje']) if options['hoje'] else None
+        except ValueError:
+            raise CommandError(f"Data inválida em --hoje: {options['hoje']}")
+        contagens = prazos.varrer(hoje, options['batch_size'])
+        for nome, total in contagens.items():
+            self.stdout.write(f"  {nome.replace('_', ' '):<20} {total}")
+        self.stdout.write(self.style.SUCCESS(f"{sum(contagens.values())} mudança(s) de status"))
@@ -0,0 +1,48 @@
+# top_lentos.py
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from projeto_crm_final import metricas
+
+ORDENACOES = ['total_ms', 'p95_ms', 'requests', 'queries', 'duplicadas']
+
+
+class Command(BaseCommand):
+    help = ("Resume o log de requests lentos (METRICS_SLOW_LOG, incluindo os arquivos rotacionados) "
+            "e mostra as views que mais pesam.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--arquivo', default=settings.METRICS_SLOW_LOG)
+        parser.add_argument('--ordenar', choices=ORDENACOES, default='total_ms',
+                            help='total_ms = tempo somado de todos os requests da view')
+        parser.add_argument('--limite', type=int, default=10)
+        parser.add_argument('--json', action='store_true', help='Saída em JSON')
+
+    def handle(self, *args, **options):
+        caminhos = sorted(glob.glob(f"{glob.escape(options['arquivo'])}*"))
+        if not caminhos:
+            raise CommandError(f"Nenhum log em {options['arquivo']}")
+
+        resumo = metricas.resumir(metricas.ler_log(caminhos))
+        ordem = options['ordenar']
+        resumo.sort(key=lambda r: r[ordem] if r[ordem] is not None else -1, reverse=True)
+        resumo = resumo[:options['limite']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(resumo, indent=2, ensure_ascii=False))
+            return
+
+        def fmt(valor, largura):
+            return f"{'-':>{largura}}" if valor is None else f"{valor:>{largura}}"
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'view':<35} {'reqs':>6} {'p50':>9} {'p95':>9} {'máx':>9} {'sql':>8} {'queries':>8} {'repet.':>7} {'tpl':>8}"
+        ))
+        for r in resumo:
+            self.stdout.write(
+                f"{r['view'][:35]:<35} {r['requests']:>6} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['max_ms']:>9} "
+                f"{fmt(r['sql_ms'], 8)} {fmt(r['queries'], 8)} {fmt(r['duplicadas'], 7)} {fmt(r['template_ms'], 8)}"
+            )
@@ -0,0 +1,229 @@
+"""Métricas por request: tempo total, tempo em SQL, queries, queries repetidas e template.
+
+RequestMetricsMiddleware mede uma amostra dos requests (METRICS_SAMPLE_RATE): esses
+saem num log JSON estruturado e, com METRICS_SERVER_TIMING, no header Server-Timing.
+Qualquer request acima de METRICS_SLOW_MS, amostrado ou não, vai pro log rotativo de
+requests lentos, que `manage.py top_lentos` resume por view.
+
+Fora da amostra o custo é um perf_counter e um ContextVar vazio no wrapper das queries.
+"""
+import json
+import logging
+import math
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+logger_lentos = logging.getLogger(f'{__name__}.lentos')
+
+_medicao = ContextVar('medicao', default=None)
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Formato da query sem os valores: 'IN (%s, %s, %s)' e 'IN (%s)' contam como a mesma"""
+    sql = _LITERAIS.sub('?', sql)
+    sql = _LISTAS.sub('(%s)', sql)
+    return _ESPACOS.sub(' ', sql).strip()
+
+
+class Medicao:
+    __slots__ = ('sql_ms', 'queries', 'formatos', 'template_ms', '_profundidade')
+
+    def __init__(self):
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.formatos = Counter()
+        self.template_ms = 0.0
+        self._profundidade = 0
+
+    @property
+    def duplicadas(self):
+        """Queries com um formato que já tinha rodado neste request"""
+        return self.queries - len(self.formatos)
+
+
+def _wrapper(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.sql_ms += (time.perf_counter() - inicio) * 1000
+        medicao.queries += 1
+        medicao.formatos[fingerprint(sql)] += 1
+
+
+def _instalar_wrapper(connection, **kwargs):
+    if _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper)
+
+
+_render_original = None
+
+
+def _render(self, context):
+    medicao = _medicao.get()
+    if medicao is None:
+        return _render_original(self, context)
+    # {% include %} e {% extends %} renderizam templates dentro do template: só conta o de fora
+    medicao._profundidade += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        medicao._profundidade -= 1
+        if not medicao._profundidade:
+            medicao.template_ms += (time.perf_counter() - inicio) * 1000
+
+
+def instalar():
+    """Liga o wrapper de SQL em toda conexão (atual e futuras) e a medição de Template.render"""
+    global _render_original
+    connection_created.connect(_instalar_wrapper, dispatch_uid='metricas_execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _instalar_wrapper(connection)
+    if _render_original is None:
+        _render_original = Template.render
+        Template.render = _render
+
+
+def _registro(request, response, total_ms, medicao):
+    match = getattr(request, 'resolver_match', None)
+    registro = {
+        'ts': timezone.now().isoformat(),
+        'view': match.view_name if match else None,
+        'metodo': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total_ms, 2),
+        'amostrado': medicao is not None,
+    }
+    if medicao is not None:
+        registro.update({
+            'sql_ms': round(medicao.sql_ms, 2),
+            'queries': medicao.queries,
+            'duplicadas': medicao.duplicadas,
+            'template_ms': round(medicao.template_ms, 2),
+        })
+    return registro
+
+
+def server_timing(registro):
+    partes = [f"total;dur={registro['total_ms']}"]
+    if registro['amostrado']:
+        partes.append(f"sql;dur={registro['sql_ms']};desc=\"{registro['queries']} queries, "
+                      f"{registro['duplicadas']} repetidas\"")
+        partes.append(f"tpl;dur={registro['template_ms']}")
+    return ', '.join(partes)
+
+
+class RequestMetricsMiddleware:
+    """Mede os requests (ver o docstring do módulo); fica no topo do MIDDLEWARE"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        instalar()
+
+    def _iniciar(self):
+        if settings.METRICS_SAMPLE_RATE and random.random() < settings.METRICS_SAMPLE_RATE:
+            return Medicao()
+        return None
+
+    def _finalizar(self, request, response, inicio, medicao):
+        total_ms = (time.perf_counter() - inicio) * 1000
+        if medicao is None and total_ms < settings.METRICS_SLOW_MS:
+            return response
+
+        registro = _registro(request, response, total_ms, medicao)
+        if medicao is not None:
+            logger.info(json.dumps(registro))
+            if settings.METRICS_SERVER_TIMING:
+                response['Server-Timing'] = server_timing(registro)
+        if total_ms >= settings.METRICS_SLOW_MS:
+            logger_lentos.warning(json.dumps(registro))
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicao = self._iniciar()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self._finalizar(request, response, inicio, medicao)
+
+    async def __acall__(self, request):
+        medicao = self._iniciar()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self._finalizar(request, response, inicio, medicao)
+
+
+def ler_log(caminhos):
+    """Registros JSON do log de lentos (linhas que não são JSON são ignoradas)"""
+    for caminho in caminhos:
+        with open(caminho, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    yield json.loads(linha[linha.index('{'):])
+                except ValueError:
+                    continue
+
+
+def resumir(registros):
+    """Agrupa por view: quantidade, p50/p95/máximo e médias de SQL, queries e template"""
+    por_view = {}
+    for r in registros:
+        por_view.setdefault(r.get('view') or r['path'], []).append(r)
+
+    resumo = []
+    for view, lista in por_view.items():
+        tempos = sorted(r['total_ms'] for r in lista)
+        amostrados = [r for r in lista if r.get('amostrado')]
+
+        def media(campo):
+            if not amostrados:
+                return None
+            return round(sum(r[campo] for r in amostrados) / len(amostrados), 2)
+
+        resumo.append({
+            'view': view,
+            'requests': len(lista),
+            'p50_ms': tempos[len(tempos) // 2],
+            'p95_ms': tempos[math.ceil(len(tempos) * 0.95) - 1],
+            'max_ms': tempos[-1],
+            'total_ms': round(sum(tempos), 2),
+            'sql_ms': media('sql_ms'),
+            'queries': media('queries'),
+            'duplicadas': media('duplicadas'),
+            'template_ms': media('template_ms'),
+        })
+    return resumo
@@ -0,0 +1,93 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth.models import User
+from django.db.models import Prefetch
+from django.utils.functional import SimpleLazyObject
+
+from projeto_crm_final import cache
+from projeto_crm_final.constants import PROJETO_EM_ANDAMENTO
+from projeto_crm_final.models import Integrantes, Projetos
+
+
+def _query_integrante(user):
+    """Busca o perfil do usuário com equipe e projeto ativo já carregados"""
+    try:
+        integrante = Integrantes.objects.select_related('equipe').prefetch_related(
+            Prefetch(
+                'equipe__projetos_set',
+                queryset=Projetos.objects.filter(status__in=PROJETO_EM_ANDAMENTO),
+                to_attr='projetos_ativos',
+            )
+        ).get(user=user)
+    except Integrantes.DoesNotExist:
+        return None
+
+    equipe = integrante.equipe
+    integrante.active_projeto = equipe.projetos_ativos[0] if equipe and equipe.projetos_ativos else None
+    return integrante
+
+
+def _load_integrante(user):
+    if not user.is_authenticated:
+        return None
+
+    integrante = cache.get_cached_integrante(user.pk) if cache.ativo() else None
+    if integrante is None:
+        integrante = _query_integrante(user)
+        if integrante is None:
+            return None
+        if cache.ativo():
+            cache.set_cached_integrante(integrante)
+
+    # liga user <-> integrante pra que request.user.integrantes e integrante.user não consultem de novo
+    Integrantes.user.field.set_cached_value(integrante, user)
+    User.integrantes.related.set_cached_value(user, integrante)
+    return integrante
+
+
+def get_integrante(request):
+    """Perfil do usuário logado, consultado no máximo uma vez por request"""
+    if not hasattr(request, '_cached_integrante'):
+        request._cached_integrante = _load_integrante(request.user)
+    return request._cached_integrante
+
+
+def integrante_para_escrita(request):
+    """Perfil do usuário relido do banco, pra views que salvam o integrante.
+
+    request.integrante pode ter vindo do cache e estar desatualizado; salvar essa cópia
+    desfaria mudanças mais novas (role, equipe) feitas por outro request.
+    """
+    integrante = get_integrante(request)
+    if integrante is None:
+        return None
+    return Integrantes.objects.select_related('equipe').get(pk=integrante.pk)
+
+
+async def aget_integrante(request):
+    """Versão async de get_integrante; depois dela request.integrante não consulta mais o banco"""
+    if not hasattr(request, '_cached_integrante'):
+        user = await request.auser()
+        request._cached_integrante = await sync_to_async(_load_integrante)(user)
+    return request._cached_integrante
+
+
+class IntegranteMiddleware:
+    """Disponibiliza request.integrante (lazy) para context processors, mixins e views"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.integrante = SimpleLazyObject(lambda: get_integrante(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.integrante = SimpleLazyObject(lambda: get_integrante(request))
+        return await self.get_response(request)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:09
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0002_alter_integrantes_cargo"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="integrantes",
+            index=models.Index(
+                fields=["nome", "person_id"], name="integ_nome_person_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="integrantes",
+            index=models.Index(
+                django.db.models.functions.text.Upper("nome"),
+                name="integ_nome_upper_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+def cancelar_projetos_ativos_duplicados(apps, schema_editor):
+    # a constraint não entra com duas linhas ativas na mesma equipe: fica o ativo mais novo,
+    # os outros viram 'canceled'
+    Projetos = apps.get_model('projeto_crm_final', 'Projetos')
+    vistos, cancelar = set(), []
+    ativos = Projetos.objects.filter(status='active', equipe__isnull=False).order_by('equipe', '-inicio', '-pk')
+    for pk, equipe_id in ativos.values_list('pk', 'equipe_id'):
+        if equipe_id in vistos:
+            cancelar.append(pk)
+        vistos.add(equipe_id)
+    Projetos.objects.filter(pk__in=cancelar).update(status='canceled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0003_integrantes_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["usuario", "timestamp"], name="audit_usuario_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projetos",
+            index=models.Index(
+                fields=["equipe", "status"], name="projeto_equipe_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="projetos",
+            index=models.Index(
+                fields=["status", "prazofinal"], name="projeto_status_prazo_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tarefas",
+            index=models.Index(
+                fields=["projetoparent", "status", "prazofinal"],
+                name="tarefa_proj_status_prazo_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tarefas",
+            index=models.Index(
+                fields=["projetoparent", "prazofinal"], name="tarefa_proj_prazo_idx"
+            ),
+        ),
+        migrations.RunPython(cancelar_projetos_ativos_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="projetos",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "active")),
+                fields=("equipe",),
+                name="projeto_unico_ativo_por_equipe",
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0004_hot_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="relatoriotarefa",
+            name="cloudinary_url",
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tipo", models.CharField(max_length=100)),
+                ("payload", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Na fila"),
+                            ("running", "Executando"),
+                            ("done", "Concluído"),
+                            ("failed", "Falhou"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("tentativas", models.PositiveSmallIntegerField(default=0)),
+                ("max_tentativas", models.PositiveSmallIntegerField(default=5)),
+                (
+                    "executar_em",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("erro", models.TextField(blank=True)),
+                ("criado", models.DateTimeField(auto_now_add=True)),
+                ("atualizado", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "executar_em"], name="job_status_exec_idx"
+                    )
+                ],
+            },
+        ),
+    ]
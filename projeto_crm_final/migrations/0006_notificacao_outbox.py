@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0005_job_queue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Notificacao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("destinatario", models.EmailField(max_length=254)),
+                ("assunto", models.CharField(max_length=200)),
+                ("mensagem", models.TextField()),
+                ("criado", models.DateTimeField(auto_now_add=True)),
+                ("enviado_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["enviado_em", "destinatario", "criado"],
+                        name="notif_pendente_idx",
+                    )
+                ],
+            },
+        ),
+    ]
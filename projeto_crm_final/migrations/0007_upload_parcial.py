@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:23
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0006_notificacao_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadParcial",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("nome_arquivo", models.CharField(max_length=255)),
+                ("tamanho", models.PositiveBigIntegerField()),
+                ("sha256", models.CharField(max_length=64)),
+                ("recebido", models.PositiveBigIntegerField(default=0)),
+                ("concluido", models.BooleanField(default=False)),
+                ("criado", models.DateTimeField(auto_now_add=True)),
+                ("atualizado", models.DateTimeField(auto_now=True)),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="uploads",
+                        to="projeto_crm_final.integrantes",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:26
+
+import django.db.models.deletion
+import projeto_crm_final.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0007_upload_parcial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Blob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                (
+                    "arquivo",
+                    models.FileField(upload_to=projeto_crm_final.models._blob_path),
+                ),
+                ("tamanho", models.PositiveBigIntegerField()),
+                ("refcount", models.PositiveIntegerField(default=0)),
+                ("cloudinary_url", models.URLField(blank=True, null=True)),
+                ("criado", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="relatorioprojeto",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="relatorios_projeto",
+                to="projeto_crm_final.blob",
+            ),
+        ),
+        migrations.AddField(
+            model_name="relatoriotarefa",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="relatorios_tarefa",
+                to="projeto_crm_final.blob",
+            ),
+        ),
+    ]
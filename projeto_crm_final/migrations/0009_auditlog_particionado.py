@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def particionar(apps, schema_editor):
+    """PostgreSQL: recria a auditlog particionada por mês em "timestamp" (ver auditoria.py).
+
+    A PK de tabela particionada precisa conter a coluna de partição, então vira (id, timestamp);
+    pro Django a pk continua sendo id, que segue vindo de uma sequência única.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AuditLog = apps.get_model('projeto_crm_final', 'AuditLog')
+    tabela = AuditLog._meta.db_table
+    q = schema_editor.quote_name
+    legado = f'{tabela}_legado'
+
+    schema_editor.execute(f'ALTER TABLE {q(tabela)} RENAME TO {q(legado)}')
+    schema_editor.execute(
+        f'CREATE TABLE {q(tabela)} (LIKE {q(legado)} INCLUDING DEFAULTS INCLUDING IDENTITY) '
+        f'PARTITION BY RANGE ("timestamp")'
+    )
+    schema_editor.execute(f'ALTER TABLE {q(tabela)} ADD PRIMARY KEY ("id", "timestamp")')
+    schema_editor.execute(f'CREATE TABLE {q(tabela + "_default")} PARTITION OF {q(tabela)} DEFAULT')
+
+    # uma partição pra cada mês que já tem linhas, do mais antigo até 3 meses à frente
+    # (daí pra frente quem cria é o `manage.py particoes_audit`)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT date_trunc('month', MIN(\"timestamp\") AT TIME ZONE 'UTC'), "
+            f"date_trunc('month', now() AT TIME ZONE 'UTC') FROM {q(legado)}"
+        )
+        primeiro, atual = cursor.fetchone()
+    primeiro = primeiro or atual
+    ano, mes = primeiro.year, primeiro.month
+    ultimo = (atual.year + (atual.month + 2) // 12, (atual.month + 2) % 12 + 1)
+    while (ano, mes) <= ultimo:
+        proximo = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+        schema_editor.execute(
+            f'CREATE TABLE {q(f"{tabela}_p{ano:04d}{mes:02d}")} PARTITION OF {q(tabela)} '
+            f"FOR VALUES FROM ('{ano:04d}-{mes:02d}-01 00:00+00') TO ('{proximo[0]:04d}-{proximo[1]:02d}-01 00:00+00')"
+        )
+        ano, mes = proximo
+
+    schema_editor.execute(f'INSERT INTO {q(tabela)} SELECT * FROM {q(legado)}')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {q(tabela)}"
+    )
+    schema_editor.execute(f'DROP TABLE {q(legado)}')
+
+    # índices e FK com os mesmos nomes que o Django daria (criados depois do DROP, que libera os nomes)
+    usuario = AuditLog._meta.get_field('usuario')
+    schema_editor.execute(schema_editor._create_index_sql(AuditLog, fields=[usuario]))
+    schema_editor.execute(schema_editor._create_fk_sql(AuditLog, usuario, '_fk_%(to_table)s_%(to_column)s'))
+    for index in AuditLog._meta.indexes:
+        schema_editor.add_index(AuditLog, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0008_blob_storage"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="auditlog",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(particionar, migrations.RunPython.noop),
+    ]
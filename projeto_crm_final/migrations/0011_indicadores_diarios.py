@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_concluida_em(apps, schema_editor):
+    # melhor aproximação pras tarefas já concluídas: o último save
+    Tarefas = apps.get_model('projeto_crm_final', 'Tarefas')
+    Tarefas.objects.filter(status='done').update(concluida_em=models.F('atualizado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0010_auditlog_filtros"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tarefas",
+            name="concluida_em",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="IndicadorDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dia", models.DateField()),
+                ("criadas", models.IntegerField(default=0)),
+                ("status_todo", models.IntegerField(default=0)),
+                ("status_doing", models.IntegerField(default=0)),
+                ("status_done", models.IntegerField(default=0)),
+                ("status_late", models.IntegerField(default=0)),
+                ("status_canceled", models.IntegerField(default=0)),
+                ("prioridade_baixa", models.IntegerField(default=0)),
+                ("prioridade_regular", models.IntegerField(default=0)),
+                ("prioridade_alta", models.IntegerField(default=0)),
+                ("prioridade_urgente", models.IntegerField(default=0)),
+                ("concluidas", models.IntegerField(default=0)),
+                ("concluidas_no_prazo", models.IntegerField(default=0)),
+                ("ciclo_us", models.BigIntegerField(default=0)),
+                ("vencem", models.IntegerField(default=0)),
+                (
+                    "equipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="indicadores",
+                        to="projeto_crm_final.equipes",
+                    ),
+                ),
+                (
+                    "projeto",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="indicadores",
+                        to="projeto_crm_final.projetos",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["projeto", "dia"], name="indicador_projeto_dia_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("equipe", "dia", "projeto"),
+                        name="indicador_equipe_dia_projeto",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(preencher_concluida_em, migrations.RunPython.noop),
+    ]
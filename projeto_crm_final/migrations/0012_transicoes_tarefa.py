@@ -0,0 +1,117 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def reconstruir_transicoes(apps, schema_editor):
+    # o histórico anterior se perdeu: criação em `inicio` e, se saiu de "todo", uma mudança direta
+    # pro status atual na conclusão (ou no último save); mesma regra do fluxo.reconstruir()
+    Tarefas = apps.get_model('projeto_crm_final', 'Tarefas')
+    TransicaoTarefa = apps.get_model('projeto_crm_final', 'TransicaoTarefa')
+    codigos = {'todo': 1, 'doing': 2, 'done': 3, 'late': 4, 'canceled': 5}
+    lote = []
+    campos = ('pk', 'equipe_id', 'projetoparent_id', 'status', 'inicio', 'atualizado', 'concluida_em')
+    for pk, equipe_id, projeto_id, status, inicio, atualizado, concluida_em in \
+            Tarefas.objects.order_by('pk').values_list(*campos).iterator(chunk_size=2000):
+        comum = {'tarefa_id': pk, 'equipe_id': equipe_id, 'projeto_id': projeto_id}
+        lote.append(TransicaoTarefa(de=0, para=codigos['todo'], em=inicio, **comum))
+        if status != 'todo':
+            lote.append(TransicaoTarefa(de=codigos['todo'], para=codigos[status], em=concluida_em or atualizado,
+                                        **comum))
+        if len(lote) >= 2000:
+            TransicaoTarefa.objects.bulk_create(lote)
+            lote = []
+    TransicaoTarefa.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0011_indicadores_diarios"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransicaoTarefa",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "de",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Criada"),
+                            (1, "Para fazer"),
+                            (2, "Em andamento"),
+                            (3, "Feito"),
+                            (4, "Atrasada"),
+                            (5, "Cancelada"),
+                        ]
+                    ),
+                ),
+                (
+                    "para",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (1, "Para fazer"),
+                            (2, "Em andamento"),
+                            (3, "Feito"),
+                            (4, "Atrasada"),
+                            (5, "Cancelada"),
+                        ]
+                    ),
+                ),
+                ("em", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "equipe",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projeto_crm_final.equipes",
+                    ),
+                ),
+                (
+                    "projeto",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projeto_crm_final.projetos",
+                    ),
+                ),
+                (
+                    "tarefa",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transicoes",
+                        to="projeto_crm_final.tarefas",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tarefa", "em"], name="transicao_tarefa_em_idx"
+                    ),
+                    models.Index(
+                        fields=["equipe", "em"], name="transicao_equipe_em_idx"
+                    ),
+                    models.Index(
+                        fields=["projeto", "em"], name="transicao_projeto_em_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(reconstruir_transicoes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+def cancelar_projetos_em_andamento_duplicados(apps, schema_editor):
+    # a constraint agora também cobre 'overdue': numa equipe com projeto ativo e vencido fica o ativo
+    # mais novo (ou o vencido mais novo, se não houver ativo), os outros viram 'canceled'
+    Projetos = apps.get_model('projeto_crm_final', 'Projetos')
+    vistos, cancelar = set(), []
+    em_andamento = Projetos.objects.filter(status__in=('active', 'overdue'), equipe__isnull=False)
+    # 'active' < 'overdue': o ativo vem primeiro em cada equipe
+    for pk, equipe_id in em_andamento.order_by('equipe', 'status', '-inicio', '-pk').values_list('pk', 'equipe_id'):
+        if equipe_id in vistos:
+            cancelar.append(pk)
+        vistos.add(equipe_id)
+    Projetos.objects.filter(pk__in=cancelar).update(status='canceled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projeto_crm_final", "0012_transicoes_tarefa"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="projetos",
+            name="projeto_unico_ativo_por_equipe",
+        ),
+        migrations.AddIndex(
+            model_name="tarefas",
+            index=models.Index(
+                fields=["status", "prazofinal"], name="tarefa_status_prazo_idx"
+            ),
+        ),
+        migrations.RunPython(cancelar_projetos_em_andamento_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="projetos",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ("active", "overdue"))),
+                fields=("equipe",),
+                name="projeto_unico_ativo_por_equipe",
+            ),
+        ),
+    ]
@@ -1,17 +1,19 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
 
-from projeto_crm_final.models import Integrantes, Projetos
+from projeto_crm_final.middleware import aget_integrante
+from projeto_crm_final.pagination import keyset_page, encode_cursor, cursor_values
+from projeto_crm_final.routers import leituras_na_replica
 
 
 class AdminRequiredMixin:
     """Mixin para verificar se o usuário autenticado tem perfil de ADMIN"""
 
     def dispatch(self, request, *args, **kwargs):
-        usuario = Integrantes.objects.get(user=self.request.user)
-        is_authenticated = self.request.user.is_authenticated
-        admin = Integrantes.objects.filter(user=self.request.user).exists() if is_authenticated and usuario.role == 'ADMIN' else False
+        usuario = request.integrante       #perfil carregado pelo IntegranteMiddleware
+        admin = bool(usuario) and usuario.role == 'ADMIN'
         if not admin:
             messages.error(self.request, "Apenas administradores podem ter acesso à este canal.")
             return redirect('home')
@@ -29,12 +31,10 @@ class LeadRequiredMixin(UserPassesTestMixin):
         if not self.request.user.is_authenticated:
             return redirect('login')
 
-        try:
-            integrante = Integrantes.objects.get(user=self.request.user)
-            return integrante.role in ['ADMIN', 'LEAD']
-
-        except Integrantes.DoesNotExist:
+        integrante = self.request.integrante
+        if not integrante:
             return False
+        return integrante.role in ['ADMIN', 'LEAD']
 
 class ProjetoOwnerMixin:
     """ Mixin para possibilitar edição de projetos apenas por seus criadores
@@ -43,9 +43,8 @@ class ProjetoOwnerMixin:
     def dispatch(self, request, *args, **kwargs):
         projeto = self.get_object()
 
-        try:
-            integrante = request.user.integrantes
-        except AttributeError:
+        integrante = request.integrante
+        if not integrante:
             messages.error(request, "Você não tem permissão para modificar projetos")
             return redirect('projetos_list')
 
@@ -54,4 +53,73 @@ class ProjetoOwnerMixin:
             messages.error(request, "Apenas os criadores do projeto podem modificá-lo")
             return redirect('projetos_list')
 
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        return super().dispatch(request, *args, **kwargs)
+
+
+class KeysetPaginationMixin:
+    """Mixin de ListView: paginação normal por número de página e, com ?cursor=, paginação keyset.
+
+    O link de próxima página já usa o cursor do último item, então navegar para frente
+    não faz OFFSET. `keyset_ordering` precisa terminar num campo único (ex.: 'id').
+    Com `keyset_only` a primeira página também é keyset (sem o COUNT(*) do Paginator).
+    """
+    keyset_ordering = ('id',)
+    keyset_only = False
+    cursor_param = 'cursor'
+    next_cursor = None
+    prev_cursor = None
+
+    def get_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_only and self.cursor_param not in self.request.GET:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            page.object_list = list(page.object_list)
+            if page.has_next() and page.object_list:
+                self.next_cursor = encode_cursor(cursor_values(page.object_list[-1], self.keyset_ordering))
+            return paginator, page, page.object_list, is_paginated
+
+        object_list, self.next_cursor, self.prev_cursor = keyset_page(
+            queryset, self.keyset_ordering, self.request.GET.get(self.cursor_param), page_size
+        )
+        return None, None, object_list, False
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        context['prev_cursor'] = self.prev_cursor
+        context['cursor_mode'] = self.keyset_only or self.cursor_param in self.request.GET
+        return context
+
+
+class ReplicaReadMixin:
+    """GET/HEAD da view leem da réplica (se houver e a sessão não estiver fixada no primário).
+
+    Usuário e perfil são carregados antes, do primário, e o template é renderizado
+    ainda dentro do contexto pra que as consultas preguiçosas também usem a réplica.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        if request.user.is_authenticated:
+            bool(request.integrante)
+        with leituras_na_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+
+
+class AsyncLoginRequiredMixin:
+    """LoginRequiredMixin para views async: usuário e perfil são carregados sem ORM síncrono
+    e ficam em request.user / request.integrante para o resto do request"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        await aget_integrante(request)
+        return await super().dispatch(request, *args, **kwargs)
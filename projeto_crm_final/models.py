@@ -2,9 +2,11 @@ import uuid
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models.functions import Upper
+from django.utils import timezone
 
-from .constants import HIERARCH, STATUS, PRIORIDADE, CATEGORIA, STATUSPROJETO
+from .constants import HIERARCH, STATUS, PRIORIDADE, CATEGORIA, STATUSPROJETO, STATUSJOB, PROJETO_EM_ANDAMENTO
 
 
 class Integrantes(models.Model):
@@ -17,6 +19,14 @@ class Integrantes(models.Model):
     cargo = models.CharField(max_length=35, default='Não definido')
     equipe = models.ForeignKey('Equipes', on_delete=models.SET_NULL, null=True, blank=True, max_length=20)
 
+    class Meta:
+        indexes = [
+            # ordenação/cursor da lista de integrantes
+            models.Index(fields=['nome', 'person_id'], name='integ_nome_person_idx'),
+            # busca por prefixo sem diferenciar maiúsculas (ver IntegrantesListaView)
+            models.Index(Upper('nome'), name='integ_nome_upper_idx'),
+        ]
+
     @property
     def email(self):
         return self.user.email
@@ -56,7 +66,39 @@ class Equipes(models.Model):
     def __str__(self):
         return f"{self.name}"
 
-class Projetos(models.Model):
+class ValoresCarregadosMixin:
+    """Guarda os valores dos campos como vieram do banco, pra saber o que mudou no save"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))     #valores como vieram do banco
+        return instance
+
+    def get_loaded_value(self, attname):
+        """Valor do campo quando o objeto foi carregado/salvo (None para objetos novos)"""
+        return getattr(self, '_loaded_values', {}).get(attname)
+
+    def has_changed(self, *attnames):
+        """True se algum dos campos mudou desde que o objeto foi carregado (sempre True se novo)"""
+        if self._state.adding or not hasattr(self, '_loaded_values'):
+            return True
+        return any(getattr(self, attname) != self._loaded_values.get(attname) for attname in attnames)
+
+    def _guardar_valores(self):
+        self._loaded_values = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # os campos recarregados agora são o valor do banco
+        recarregados = {f.attname for f in self._meta.concrete_fields} - self.get_deferred_fields()
+        if fields is not None:
+            recarregados &= {self._meta.get_field(nome).attname for nome in fields}
+        self._loaded_values = {**getattr(self, '_loaded_values', {}),
+                               **{attname: getattr(self, attname) for attname in recarregados}}
+
+
+class Projetos(ValoresCarregadosMixin, models.Model):
     name = models.CharField(max_length=200, unique=True)
     descricao = models.TextField(max_length=300, blank=True)
     criador = models.ForeignKey(Integrantes, on_delete=models.CASCADE)
@@ -67,31 +109,87 @@ class Projetos(models.Model):
     status = models.CharField(max_length=20, choices=STATUSPROJETO, default='active')
     prazofinal = models.DateField()
 
+    class Meta:
+        indexes = [
+            # projeto ativo da equipe (navbar, dashboard, equipes, export)
+            models.Index(fields=['equipe', 'status'], name='projeto_equipe_status_idx'),
+            # filtro por status em ProjetosView e varredura de prazos (status + prazo vencido)
+            models.Index(fields=['status', 'prazofinal'], name='projeto_status_prazo_idx'),
+        ]
+        constraints = [
+            # no máximo um projeto em andamento (ativo ou vencido) por equipe (índice único parcial)
+            models.UniqueConstraint(
+                fields=['equipe'],
+                condition=models.Q(status__in=PROJETO_EM_ANDAMENTO),
+                name='projeto_unico_ativo_por_equipe',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
+    def _active_conflict(self):
+        """Outro projeto em andamento da mesma equipe, se houver"""
+        if self.status not in PROJETO_EM_ANDAMENTO or not self.equipe_id:
+            return None
+        return Projetos.objects.filter(
+            equipe_id=self.equipe_id,
+            status__in=PROJETO_EM_ANDAMENTO
+        ).exclude(pk=self.pk).first()
+
+    def _active_conflict_error(self, existing_active):
+        return ValidationError(
+            f"A equipe {self.equipe.name} já tem um projeto ativo: "
+            f"{existing_active.name}. Remova-o antes de adicionar um novo."
+        )
+
     def clean(self):
         # Checagem pra ver se o projeto está ativo e relacionado à uma equipe
-        if self.status == 'active' and self.equipe:
-            existing_active = Projetos.objects.filter(
-                equipe=self.equipe,
-                status='active'
-            ).exclude(pk=self.pk).first()
-
-            if existing_active:
-                raise ValidationError(
-                    f"A equipe {self.equipe.name} já tem um projeto ativo: "
-                    f"{existing_active.name}. Remova-o antes de adicionar um novo."
-                )
+        existing_active = self._active_conflict()
+        if existing_active:
+            raise self._active_conflict_error(existing_active)
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        # A regra "um projeto ativo por equipe" só pode quebrar se status ou equipe mudaram;
+        # nos outros saves não há consulta extra. Quem garante a regra de fato é a
+        # constraint projeto_unico_ativo_por_equipe - a checagem aqui é só pela mensagem.
+        if not self.has_changed('status', 'equipe_id'):
+            super().save(*args, **kwargs)
+        else:
+            self.clean()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                # outro request ativou um projeto na equipe entre a checagem e o save
+                existing_active = self._active_conflict()
+                if not existing_active:
+                    raise
+                raise self._active_conflict_error(existing_active)
+        self._guardar_valores()
+
+
+def _blob_path(instance, filename):
+    return f'blobs/{instance.sha256[:2]}/{instance.sha256}'
+
+
+class Blob(models.Model):
+    """Arquivo guardado uma única vez por conteúdo (SHA-256); relatórios iguais apontam pro mesmo blob"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    arquivo = models.FileField(upload_to=_blob_path)
+    tamanho = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    cloudinary_url = models.URLField(blank=True, null=True)
+    criado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.refcount} ref.)"
 
 
 class RelatorioProjeto(models.Model):
     projeto = models.ForeignKey(Projetos, on_delete=models.CASCADE)
     arquivo = models.FileField(upload_to='relatorios/')
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='relatorios_projeto')
     enviado_por = models.ForeignKey(Integrantes, on_delete=models.CASCADE)
     enviado_em = models.DateTimeField(auto_now_add=True)
     cloudinary_url = models.URLField(blank=True, null=True)
@@ -100,7 +198,7 @@ class RelatorioProjeto(models.Model):
         return f"Relatório para {self.projeto.name}"
 
 
-class Tarefas(models.Model):
+class Tarefas(ValoresCarregadosMixin, models.Model):
     name = models.CharField(max_length=200)
     descricao = models.TextField()
     projetoparent = models.ForeignKey(Projetos, on_delete=models.CASCADE, related_name="tarefas_do_projeto")
@@ -111,17 +209,49 @@ class Tarefas(models.Model):
     inicio = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     atualizado = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
     prioridade = models.CharField(max_length=10, choices=PRIORIDADE, default='regular')
+    concluida_em = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Tarefa"
         verbose_name_plural = "Tarefas"
         ordering = ['prazofinal']
+        indexes = [
+            # kanban/detalhe do projeto: filtra por projeto (+ status) e ordena por prazo
+            models.Index(fields=['projetoparent', 'status', 'prazofinal'], name='tarefa_proj_status_prazo_idx'),
+            models.Index(fields=['projetoparent', 'prazofinal'], name='tarefa_proj_prazo_idx'),
+            # varredura de prazos (prazos.py): tarefas abertas com prazo vencido
+            models.Index(fields=['status', 'prazofinal'], name='tarefa_status_prazo_idx'),
+        ]
 
 
     def save(self, *args, **kwargs):
+        from projeto_crm_final import indicadores   # indicadores importa os models
+
         if not self.equipe_id and self.projetoparent_id:
             self.equipe = self.projetoparent.equipe
-        super().save(*args, **kwargs)
+        # hora da conclusão: base do tempo de ciclo e do "no prazo" dos indicadores
+        if self.status != 'done':
+            self.concluida_em = None
+        elif self.concluida_em is None:
+            self.concluida_em = timezone.now()
+
+        with transaction.atomic():
+            antes = None if self._state.adding else indicadores.valores_anteriores(self)
+            super().save(*args, **kwargs)
+            indicadores.atualizar(antes, indicadores.valores(self))
+            # compara com o status travado do banco: uma cópia antiga não registra transição impossível
+            if antes is None or antes['status'] != self.status:
+                TransicaoTarefa.registrar(self, antes and antes['status'])
+        self._guardar_valores()
+
+    def delete(self, *args, **kwargs):
+        from projeto_crm_final import indicadores
+
+        with transaction.atomic():
+            antes = indicadores.valores_anteriores(self)
+            resultado = super().delete(*args, **kwargs)
+            indicadores.atualizar(antes, None)
+        return resultado
 
     def __str__(self):
         return f"{self.name} | {self.get_status_display()}"
@@ -131,8 +261,10 @@ class RelatorioTarefa(models.Model):
     tarefa = models.ForeignKey(Tarefas, on_delete=models.CASCADE, related_name='relatorios')
     descricao = models.TextField()
     arquivo = models.FileField(upload_to='relatorios_tarefas/')
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name='relatorios_tarefa')
     enviado_por = models.ForeignKey(Integrantes, on_delete=models.CASCADE)
     data_envio = models.DateTimeField(auto_now_add=True)
+    cloudinary_url = models.URLField(blank=True, null=True)
 
     def __str__(self):
         return f"Relatório para {self.tarefa.name} - {self.data_envio}"
@@ -143,7 +275,158 @@ class AuditLog(models.Model):
     action = models.CharField(max_length=100)       #o que ocorreu
     onde = models.CharField(max_length=100)         #aonde ocorreu a mudança
     ip_address = models.GenericIPAddressField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)   # hora da ação, não do flush (auditoria.py)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['usuario', 'timestamp'], name='audit_usuario_ts_idx'),
+            # um índice por filtro do navegador de auditoria, terminando na ordem da
+            # paginação keyset (timestamp, id)
+            models.Index(fields=['timestamp', 'id'], name='audit_ts_id_idx'),
+            models.Index(fields=['action', 'timestamp', 'id'], name='audit_action_ts_idx'),
+            models.Index(fields=['onde', 'timestamp', 'id'], name='audit_onde_ts_idx'),
+            models.Index(fields=['ip_address', 'timestamp', 'id'], name='audit_ip_ts_idx'),
+        ]
+
+
+class UploadParcial(models.Model):
+    """Upload em partes (retomável) de um relatório; as partes vão direto pra um arquivo temporário"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Integrantes, on_delete=models.CASCADE, related_name='uploads')
+    nome_arquivo = models.CharField(max_length=255)
+    tamanho = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    recebido = models.PositiveBigIntegerField(default=0)
+    concluido = models.BooleanField(default=False)
+    criado = models.DateTimeField(auto_now_add=True)
+    atualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nome_arquivo} ({self.recebido}/{self.tamanho})"
+
+
+class Job(models.Model):
+    """Fila de trabalhos em background (ver jobs.py e manage.py run_workers)"""
+    tipo = models.CharField(max_length=100)         #nome do handler registrado em jobs.py
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSJOB, default='pending')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=5)
+    executar_em = models.DateTimeField(default=timezone.now)
+    erro = models.TextField(blank=True)
+    criado = models.DateTimeField(auto_now_add=True)
+    atualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'executar_em'], name='job_status_exec_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.status})"
+
+
+class Notificacao(models.Model):
+    """Caixa de saída: eventos agrupados por destinatário e enviados em digest (ver notificacoes.py)"""
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=200)
+    mensagem = models.TextField()
+    criado = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['enviado_em', 'destinatario', 'criado'], name='notif_pendente_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.assunto} -> {self.destinatario}"
+
+
+class IndicadorDiario(models.Model):
+    """Rollup das tarefas por equipe, projeto e dia, mantido pelo save das tarefas (ver indicadores.py).
+
+    Cada tarefa soma na linha do dia em que foi criada (criadas e contagem por status e
+    prioridade atuais), na do dia em que foi concluída (concluídas, no prazo, tempo de
+    ciclo) e, enquanto aberta, na do seu prazo (vencem).
+    """
+    equipe = models.ForeignKey(Equipes, on_delete=models.CASCADE, related_name='indicadores')
+    projeto = models.ForeignKey(Projetos, on_delete=models.CASCADE, related_name='indicadores')
+    dia = models.DateField()
+
+    criadas = models.IntegerField(default=0)
+    status_todo = models.IntegerField(default=0)
+    status_doing = models.IntegerField(default=0)
+    status_done = models.IntegerField(default=0)
+    status_late = models.IntegerField(default=0)
+    status_canceled = models.IntegerField(default=0)
+    prioridade_baixa = models.IntegerField(default=0)
+    prioridade_regular = models.IntegerField(default=0)
+    prioridade_alta = models.IntegerField(default=0)
+    prioridade_urgente = models.IntegerField(default=0)
+
+    concluidas = models.IntegerField(default=0)
+    concluidas_no_prazo = models.IntegerField(default=0)
+    ciclo_us = models.BigIntegerField(default=0)            # soma de inicio -> concluida_em (microssegundos)
+    vencem = models.IntegerField(default=0)                 # tarefas abertas com prazo neste dia
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['equipe', 'dia', 'projeto'], name='indicador_equipe_dia_projeto'),
+        ]
+        indexes = [
+            models.Index(fields=['projeto', 'dia'], name='indicador_projeto_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.projeto_id} em {self.dia}"
+
+
+class TransicaoTarefa(models.Model):
+    """Histórico das mudanças de status das tarefas, só de inclusão (ver fluxo.py).
+
+    Gravado pelo save de Tarefas na mesma transação da mudança. Os status vão como
+    códigos de 1 byte (CODIGOS, 0 = tarefa criada) e equipe/projeto são copiados da
+    tarefa, pra exportar o histórico de muitos projetos sem join.
+    """
+    CRIADA = 0
+    CODIGOS = {status: codigo for codigo, (status, _) in enumerate(STATUS, 1)}
+    ESCOLHAS = [(codigo, nome) for codigo, (_, nome) in enumerate(STATUS, 1)]
+
+    tarefa = models.ForeignKey(Tarefas, on_delete=models.CASCADE, related_name='transicoes', db_index=False)
+    equipe = models.ForeignKey(Equipes, on_delete=models.CASCADE, related_name='+', db_index=False)
+    projeto = models.ForeignKey(Projetos, on_delete=models.CASCADE, related_name='+', db_index=False)
+    de = models.PositiveSmallIntegerField(choices=[(CRIADA, 'Criada')] + ESCOLHAS)
+    para = models.PositiveSmallIntegerField(choices=ESCOLHAS)
+    em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tarefa', 'em'], name='transicao_tarefa_em_idx'),
+            models.Index(fields=['equipe', 'em'], name='transicao_equipe_em_idx'),
+            models.Index(fields=['projeto', 'em'], name='transicao_projeto_em_idx'),
+        ]
+
+    @classmethod
+    def registrar(cls, tarefa, status_anterior=None, em=None):
+        """`status_anterior` é o status gravado no banco, lido com a linha travada na mesma transação
+        (indicadores.valores_anteriores), e não o que o objeto tinha ao ser carregado"""
+        return cls.objects.create(
+            tarefa=tarefa, equipe_id=tarefa.equipe_id, projeto_id=tarefa.projetoparent_id,
+            de=cls.CODIGOS.get(status_anterior, cls.CRIADA), para=cls.CODIGOS[tarefa.status],
+            em=em or tarefa.atualizado,
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("TransicaoTarefa não pode ser alterada, só incluída")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("TransicaoTarefa não pode ser apagada (só junto com a tarefa)")
+
+    def __str__(self):
+        return f"tarefa {self.tarefa_id}: {self.get_de_display()} -> {self.get_para_display()} em {self.em}"
 
 
 
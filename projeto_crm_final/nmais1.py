@@ -0,0 +1,139 @@
+"""Detector de N+1 pros testes.
+
+Toda query executada dentro de detectar() é reduzida ao formato (metricas.fingerprint)
+e guardada com a origem: o nó de template que a disparou ({{ membro.user.email }} na
+linha 12 de equipes_detail.html) e a linha de código do projeto mais próxima. Um formato
+que se repete mais que `limite` vezes no mesmo request é um N+1.
+
+Os testes usam DetectorClient no lugar do Client, então um N+1 novo quebra o build
+com o relatório de onde ele vem.
+"""
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+
+from projeto_crm_final.metricas import fingerprint
+
+LIMITE = 5
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_IGNORAR = {os.path.abspath(__file__), os.path.join(_APP_DIR, 'metricas.py'), os.path.join(_APP_DIR, 'tests.py')}
+_TEMPLATE_BASE = os.path.join('django', 'template', 'base.py')
+
+_COLUNAS = re.compile(r'^SELECT .*? FROM')
+
+_coleta = ContextVar('coleta_nmais1', default=None)
+
+
+class NMais1Error(AssertionError):
+    pass
+
+
+def _origem():
+    """(nó de template, linha de código do projeto) de quem disparou a query"""
+    template = codigo = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and codigo):
+        arquivo = frame.f_code.co_filename
+        if template is None and frame.f_code.co_name == 'render_annotated' and arquivo.endswith(_TEMPLATE_BASE):
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None:
+                template = f"{origin.template_name}:{token.lineno if token else '?'}"
+        if codigo is None and arquivo.startswith(_APP_DIR) and arquivo not in _IGNORAR:
+            codigo = f"{os.path.relpath(arquivo, os.path.dirname(_APP_DIR))}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return template, codigo
+
+
+class Coleta:
+    def __init__(self):
+        self.origens = defaultdict(Counter)     # formato -> Counter de origens
+
+    def registrar(self, sql):
+        self.origens[fingerprint(sql)][_origem()] += 1
+
+    def repetidas(self, limite=LIMITE):
+        return {
+            formato: origens for formato, origens in self.origens.items()
+            if sum(origens.values()) > limite
+        }
+
+    def relatorio(self, limite=LIMITE):
+        linhas = []
+        for formato, origens in self.repetidas(limite).items():
+            linhas.append(f"{sum(origens.values())}x {_COLUNAS.sub('SELECT ... FROM', formato, count=1)[:300]}")
+            for (template, codigo), vezes in origens.most_common(3):
+                linhas.append(f"    {vezes}x template {template or '-'} | código {codigo or '-'}")
+        return '\n'.join(linhas)
+
+    def verificar(self, limite=LIMITE, onde=''):
+        if self.repetidas(limite):
+            raise NMais1Error(f"N+1 em {onde} (mais de {limite} queries iguais):\n{self.relatorio(limite)}")
+
+
+def _wrapper(execute, sql, params, many, context):
+    coleta = _coleta.get()
+    if coleta is not None:
+        coleta.registrar(sql)
+    return execute(sql, params, many, context)
+
+
+def _instalar_wrapper(connection, **kwargs):
+    if _wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper)
+
+
+def instalar():
+    connection_created.connect(_instalar_wrapper, dispatch_uid='nmais1_execute_wrapper')
+    for connection in connections.all(initialized_only=True):
+        _instalar_wrapper(connection)
+
+
+@contextmanager
+def detectar():
+    """Coleta as queries do bloco (inclusive das threads do sync_to_async, via ContextVar)"""
+    instalar()
+    coleta = Coleta()
+    token = _coleta.set(coleta)
+    try:
+        yield coleta
+    finally:
+        _coleta.reset(token)
+
+
+class DetectorClient(Client):
+    """Client de teste que falha o request com NMais1Error se ele tiver um N+1"""
+    limite_nmais1 = LIMITE
+
+    def request(self, **request):
+        with detectar() as coleta:
+            response = super().request(**request)
+            if response.streaming:
+                # as queries de um StreamingHttpResponse (exports) rodam enquanto o corpo é lido
+                response.streaming_content = [b''.join(response.streaming_content)]
+        coleta.verificar(self.limite_nmais1, request.get('PATH_INFO', ''))
+        return response
+
+
+class AsyncDetectorClient(AsyncClient):
+    limite_nmais1 = LIMITE
+
+    async def request(self, **request):
+        with detectar() as coleta:
+            response = await super().request(**request)
+            if response.streaming:
+                if response.is_async:
+                    corpo = b''.join([parte async for parte in response.streaming_content])
+                else:
+                    corpo = b''.join(response.streaming_content)
+                response.streaming_content = [corpo]
+        coleta.verificar(self.limite_nmais1, request.get('path', ''))
+        return response
@@ -0,0 +1,93 @@
+"""Notificações por e-mail em digest.
+
+Os eventos (tarefa concluída, projeto concluído...) viram linhas de Notificacao, uma
+por destinatário. O envio junta tudo que está pendente para cada destinatário numa
+mensagem só e manda todas as mensagens numa única conexão SMTP.
+"""
+import textwrap
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from projeto_crm_final.models import Notificacao
+
+
+def notificar(destinatarios, assunto, mensagem):
+    """Grava a notificação na caixa de saída e agenda o envio do digest"""
+    destinatarios = sorted({email for email in destinatarios if email})
+    if not destinatarios:
+        return []
+    mensagem = textwrap.dedent(mensagem).strip()
+    notificacoes = Notificacao.objects.bulk_create([
+        Notificacao(destinatario=email, assunto=assunto, mensagem=mensagem)
+        for email in destinatarios
+    ])
+    agendar_digest()
+    return notificacoes
+
+
+def notificar_equipe(equipe, assunto, mensagem):
+    """Notifica todos os membros da equipe (e-mails buscados numa consulta só)"""
+    emails = list(equipe.membros.exclude(user__email='').values_list('user__email', flat=True))
+    if settings.EMAIL_HOST_USER:
+        emails.append(settings.EMAIL_HOST_USER)  # cópia pro system
+    return notificar(emails, assunto, mensagem)
+
+
+def agendar_digest():
+    """Garante um job 'enviar_digests' na fila para o fim da janela atual"""
+    from projeto_crm_final import jobs
+    from projeto_crm_final.models import Job
+
+    if not Job.objects.filter(tipo='enviar_digests', status='pending').exists():
+        jobs.enqueue('enviar_digests', atraso=timedelta(seconds=settings.NOTIFICACOES_JANELA))
+
+
+def montar_digest(destinatario, notificacoes):
+    if len(notificacoes) == 1:
+        assunto = notificacoes[0].assunto
+        corpo = notificacoes[0].mensagem
+    else:
+        assunto = f'{len(notificacoes)} atualizações no CRM'
+        corpo = '\n\n'.join(
+            f"— {n.assunto} ({timezone.localtime(n.criado):%d/%m %H:%M})\n{n.mensagem}"
+            for n in notificacoes
+        )
+    return EmailMessage(assunto, corpo, settings.DEFAULT_FROM_EMAIL, [destinatario])
+
+
+def enviar_digests(agora=None, forcar=False):
+    """Envia os digests vencidos; retorna quantos e-mails foram enviados.
+
+    Um destinatário entra no envio quando a notificação pendente mais antiga dele já
+    passou da janela (NOTIFICACOES_JANELA); `forcar` ignora a janela.
+    """
+    agora = agora or timezone.now()
+    pendentes = Notificacao.objects.filter(enviado_em__isnull=True)
+    if not forcar:
+        limite = agora - timedelta(seconds=settings.NOTIFICACOES_JANELA)
+        vencidos = pendentes.filter(criado__lte=limite).values('destinatario')
+        pendentes = pendentes.filter(destinatario__in=vencidos)
+
+    mensagens, ids = [], []
+    for destinatario, grupo in groupby(pendentes.order_by('destinatario', 'criado', 'id'),
+                                       key=lambda n: n.destinatario):
+        grupo = list(grupo)
+        mensagens.append(montar_digest(destinatario, grupo))
+        ids.extend(n.pk for n in grupo)
+
+    if not mensagens:
+        return 0
+
+    # uma conexão SMTP pra todos os digests
+    with get_connection() as connection:
+        enviados = connection.send_messages(mensagens)
+    Notificacao.objects.filter(pk__in=ids).update(enviado_em=agora)
+
+    # o que chegou depois do corte fica pra próxima janela
+    if Notificacao.objects.filter(enviado_em__isnull=True).exists():
+        agendar_digest()
+    return enviados
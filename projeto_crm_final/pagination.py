@@ -0,0 +1,88 @@
+"""Paginação por cursor (keyset).
+
+Em vez de OFFSET, a próxima página é buscada a partir dos valores de ordenação do
+último item visto (WHERE (nome, id) > (...)), então o custo não cresce com a página.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder corta os microssegundos, o que quebraria cursores por timestamp
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, backwards=False):
+    payload = json.dumps({'v': values, 'b': backwards}, cls=CursorJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Retorna (valores, backwards). Cursor vazio = primeira página."""
+    if not cursor:
+        return None, False
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return payload['v'], bool(payload['b'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise Http404("Cursor de paginação inválido")
+
+
+def _field_name(field):
+    return field.lstrip('-')
+
+
+def cursor_values(obj, ordering):
+    return [getattr(obj, _field_name(field)) for field in ordering]
+
+
+def keyset_filter(ordering, values, backwards=False):
+    """(a, b) > (va, vb) expandido para a > va OR (a = va AND b > vb), respeitando '-'"""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        descending = field.startswith('-')
+        lookup = 'gt' if descending == backwards else 'lt'
+        step = Q(**{f'{_field_name(field)}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            step &= Q(**{_field_name(previous): value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor, page_size):
+    """Busca uma página a partir do cursor.
+
+    Retorna (itens, next_cursor, prev_cursor); os cursores são None quando não há página.
+    """
+    values, backwards = decode_cursor(cursor)
+    if values is not None and len(values) != len(ordering):
+        raise Http404("Cursor de paginação inválido")
+
+    if backwards:
+        queryset = queryset.order_by(*[f[1:] if f.startswith('-') else f'-{f}' for f in ordering])
+    else:
+        queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(keyset_filter(ordering, values, backwards))
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+        has_next, has_prev = values is not None, has_more
+    else:
+        has_next, has_prev = has_more, values is not None
+
+    next_cursor = encode_cursor(cursor_values(items[-1], ordering)) if has_next and items else None
+    prev_cursor = encode_cursor(cursor_values(items[0], ordering), backwards=True) if has_prev and items else None
+    return items, next_cursor, prev_cursor
@@ -0,0 +1,116 @@
+"""Varredura dos prazos: grava 'late' nas tarefas e 'overdue' nos projetos vencidos.
+
+Roda uma vez por dia, pelo cron (`manage.py sweep_deadlines`) ou pelo job 'varrer_prazos',
+que se reagenda pra depois da meia-noite seguinte enquanto houver worker (run_workers).
+Assim as telas e o filtro de "Atrasados" leem o status gravado em vez de comparar o prazo
+com a data de hoje a cada request.
+
+- tarefas 'todo'/'doing' com prazo antes de hoje -> 'late'; 'late' com o prazo estendido
+  volta pra 'doing' (tem responsável) ou 'todo';
+- projetos 'active' com prazo antes de hoje -> 'overdue'; 'overdue' com o prazo estendido
+  volta pra 'active'. Um projeto vencido continua sendo o projeto da equipe (PROJETO_EM_ANDAMENTO).
+
+Cada mudança é um UPDATE por lote de ids, travados com SELECT ... FOR UPDATE SKIP LOCKED
+(o que um request estiver salvando fica pra próxima varredura). Como o UPDATE não passa
+pelo save, o lote faz o que o save faria: grava as transições (fluxo), ajusta os
+indicadores, audita as mudanças de projeto e troca a versão do cache das equipes. As
+tarefas/projetos que venceram vão num job 'avisar_prazos' por lote.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from projeto_crm_final import auditoria, fluxo, indicadores, jobs
+from projeto_crm_final.cache import bump_equipe_version
+from projeto_crm_final.models import Job, Projetos, Tarefas
+
+BATCH_SIZE = 1000
+HORARIO = time(0, 5)        # horário local da varredura agendada
+
+
+def _em_lotes(queryset, batch_size, mover):
+    """Chama mover(ids) pra cada lote de até `batch_size` linhas do queryset, em transações separadas"""
+    total, ultimo = 0, None
+    while True:
+        with transaction.atomic():
+            lote = queryset.order_by('pk')
+            if ultimo is not None:
+                lote = lote.filter(pk__gt=ultimo)
+            ids = list(lote.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            total += mover(ids)
+            ultimo = ids[-1]
+
+
+def mover_tarefas(tarefas, status, agora=None, batch_size=BATCH_SIZE, avisar=False):
+    """UPDATE das `tarefas` pro `status` (aberto) mantendo histórico e indicadores; retorna quantas"""
+    agora = agora or timezone.now()
+
+    def mover(ids):
+        lote = Tarefas.objects.filter(pk__in=ids)
+        indicadores.mudar_status(lote, status)
+        fluxo.registrar_em_massa(lote, status, agora)
+        movidas = lote.update(status=status, atualizado=agora)
+        if avisar:
+            jobs.enqueue('avisar_prazos', tarefas=ids)
+        return movidas
+
+    return _em_lotes(tarefas.exclude(status=status), batch_size, mover)
+
+
+def mover_projetos(projetos, status, acao, batch_size=BATCH_SIZE, avisar=False):
+    """UPDATE dos `projetos` pro `status`, auditado como `acao` e invalidando o cache das equipes"""
+
+    def mover(ids):
+        lote = Projetos.objects.filter(pk__in=ids)
+        equipes = set(lote.exclude(equipe__isnull=True).values_list('equipe_id', flat=True))
+        movidos = lote.update(status=status)
+        auditoria.registrar_sistema(acao, [f'projeto:{pk}' for pk in ids])
+        transaction.on_commit(lambda: [bump_equipe_version(equipe_id) for equipe_id in equipes])
+        if avisar:
+            jobs.enqueue('avisar_prazos', projetos=ids)
+        return movidos
+
+    return _em_lotes(projetos.exclude(status=status), batch_size, mover)
+
+
+def varrer(hoje=None, batch_size=BATCH_SIZE):
+    """Uma varredura completa; retorna as contagens de cada tipo de mudança"""
+    hoje = hoje or timezone.localdate()
+    agora = timezone.now()
+    abertas = Tarefas.objects.filter(status__in=('todo', 'doing'))
+    atrasadas = Tarefas.objects.filter(status='late', prazofinal__gte=hoje)
+    return {
+        'tarefas_atrasadas': mover_tarefas(abertas.filter(prazofinal__lt=hoje), 'late', agora, batch_size,
+                                           avisar=True),
+        'tarefas_reabertas': (
+            mover_tarefas(atrasadas.filter(responsavel__isnull=False), 'doing', agora, batch_size)
+            + mover_tarefas(atrasadas.filter(responsavel__isnull=True), 'todo', agora, batch_size)
+        ),
+        'projetos_vencidos': mover_projetos(Projetos.objects.filter(status='active', prazofinal__lt=hoje),
+                                            'overdue', 'projeto_vencido', batch_size, avisar=True),
+        'projetos_reabertos': mover_projetos(Projetos.objects.filter(status='overdue', prazofinal__gte=hoje),
+                                             'active', 'projeto_reaberto', batch_size),
+    }
+
+
+def proxima_execucao(agora=None):
+    agora = timezone.localtime(agora)
+    proxima = timezone.make_aware(datetime.combine(agora.date(), HORARIO))
+    if proxima <= agora:
+        proxima = timezone.make_aware(datetime.combine(agora.date() + timedelta(days=1), HORARIO))
+    return proxima
+
+
+def agendar(agora=None):
+    """Garante um job 'varrer_prazos' pendente pro próximo HORARIO; None com JOBS_EAGER (sem fila: use o cron)"""
+    if settings.JOBS_EAGER:
+        return None
+    pendente = Job.objects.filter(tipo='varrer_prazos', status='pending').first()
+    if pendente:
+        return pendente
+    agora = agora or timezone.now()
+    return jobs.enqueue('varrer_prazos', atraso=proxima_execucao(agora) - agora)
@@ -0,0 +1,98 @@
+"""Leituras em réplica com "fixação" no primário depois de uma escrita.
+
+Só as views marcadas com ReplicaReadMixin leem da réplica (GET/HEAD); todo o resto,
+e qualquer escrita, vai pro 'default'. Quando um request escreve no banco, a sessão
+fica fixada no primário por REPLICA_STICKY_SECONDS, então quem acabou de salvar
+(ex.: assign_project -> equipes_detail) não vê dado velho por causa do atraso da réplica.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+SESSION_KEY = '_replica_fixado_ate'
+
+_leitura_replica = ContextVar('leitura_replica', default=False)
+_fixado = ContextVar('fixado_no_primario', default=False)
+_escritas = ContextVar('escritas', default=None)
+
+
+@contextmanager
+def leituras_na_replica():
+    token = _leitura_replica.set(True)
+    try:
+        yield
+    finally:
+        _leitura_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _leitura_replica.get() or _fixado.get():
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        escritas = _escritas.get()
+        if escritas is not None:
+            escritas.append(model._meta.label)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # réplicas têm os mesmos dados do primário
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Fixa a sessão no primário por um tempo depois de qualquer escrita no banco"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        escritas = []
+        token_fixado = _fixado.set(request.session.get(SESSION_KEY, 0) > time.time())
+        token_escritas = _escritas.set(escritas)
+        try:
+            response = self.get_response(request)
+        finally:
+            _fixado.reset(token_fixado)
+            _escritas.reset(token_escritas)
+
+        if escritas:
+            request.session[SESSION_KEY] = time.time() + settings.REPLICA_STICKY_SECONDS
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        escritas = []
+        token_fixado = _fixado.set(await request.session.aget(SESSION_KEY, 0) > time.time())
+        token_escritas = _escritas.set(escritas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _fixado.reset(token_fixado)
+            _escritas.reset(token_escritas)
+
+        if escritas:
+            await request.session.aset(SESSION_KEY, time.time() + settings.REPLICA_STICKY_SECONDS)
+        return response
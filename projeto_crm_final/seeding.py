@@ -0,0 +1,323 @@
+"""Carga de dados em massa pra testes de carga e benchmarks (ver manage.py seed).
+
+Os dados vêm do gerador determinístico (gerador.py). Nada aqui passa pelo save() dos
+models: usuários, integrantes, equipes e projetos vão com bulk_create em lotes, e as
+tabelas grandes (tarefas e membros das equipes) vão com COPY quando o banco é
+PostgreSQL. A senha é gerada com make_password uma vez só e reaproveitada em todos
+os usuários. Como as tarefas não passam pelo save, os indicadores diários e o histórico
+de status (fluxo.reconstruir) dos projetos do seed são gerados no fim. exportar_fixture() grava a mesma base num fixture JSON
+em vez do banco.
+"""
+import hashlib
+import io
+import itertools
+import json
+from collections import Counter
+from datetime import datetime, time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from projeto_crm_final import blobs, fluxo, indicadores
+from projeto_crm_final.gerador import PREFIXO, Gerador
+from projeto_crm_final.models import Blob, Equipes, Integrantes, Projetos, RelatorioTarefa, Tarefas
+
+SENHA_PADRAO = 'seed1234'
+
+MULTIPLICADORES = {'k': 1_000, 'm': 1_000_000}
+
+BATCH_SIZE = 5000
+
+
+def total_de_tarefas(escala):
+    """'1k' / '100k' / '1m' ou um número qualquer de tarefas"""
+    escala = str(escala).lower()
+    multiplicador = MULTIPLICADORES.get(escala[-1:], 1)
+    if multiplicador > 1:
+        escala = escala[:-1]
+    total = int(escala) * multiplicador
+    if total < 1:
+        raise ValueError("A escala precisa ser positiva")
+    return total
+
+
+def _lotes(objs, batch_size):
+    objs = iter(objs)
+    while lote := list(itertools.islice(objs, batch_size)):
+        yield lote
+
+
+def usa_copy():
+    return connection.vendor == 'postgresql'
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''     # vazio sem aspas = NULL no COPY ... CSV
+    return '"' + str(valor).replace('"', '""') + '"'
+
+
+def copiar(model, objs, batch_size=BATCH_SIZE):
+    """COPY das instâncias (sem retornar pks): psycopg 3 usa cursor.copy, psycopg2 copy_expert"""
+    campos = [f for f in model._meta.concrete_fields if not (f.primary_key and f.get_default() is None)]
+    colunas = ', '.join(connection.ops.quote_name(f.column) for f in campos)
+    sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({colunas}) FROM STDIN"
+    total = 0
+    with connection.cursor() as cursor:
+        bruto = cursor.cursor
+        for lote in _lotes(objs, batch_size):
+            linhas = [
+                [f.get_db_prep_save(f.pre_save(obj, True), connection) for f in campos]
+                for obj in lote
+            ]
+            if hasattr(bruto, 'copy'):
+                with bruto.copy(sql) as copy:
+                    for linha in linhas:
+                        copy.write_row(linha)
+            else:
+                buffer = io.StringIO()
+                for linha in linhas:
+                    buffer.write(','.join(_valor_csv(v) for v in linha) + '\n')
+                buffer.seek(0)
+                bruto.copy_expert(f"{sql} WITH (FORMAT csv)", buffer)
+            total += len(linhas)
+    return total
+
+
+def inserir(model, objs, batch_size=BATCH_SIZE, copy=False):
+    """Insere em lotes; com copy=True usa COPY no PostgreSQL (as instâncias não recebem pk)"""
+    if copy and usa_copy():
+        return copiar(model, objs, batch_size)
+    total = 0
+    for lote in _lotes(objs, batch_size):
+        model.objects.bulk_create(lote, batch_size=batch_size)
+        total += len(lote)
+    return total
+
+
+def _ids_por_username(usernames):
+    """pks dos usuários criados (nem todo banco devolve as pks no bulk_create)"""
+    ids = dict(
+        User.objects.filter(username__startswith=PREFIXO).values_list('username', 'id')
+    )
+    return [ids[u] for u in usernames]
+
+
+def existe():
+    return User.objects.filter(username__startswith=PREFIXO).exists()
+
+
+def limpar():
+    """Apaga tudo que foi gerado pelo seed (usuários com o PREFIXO e o que cai em cascata)"""
+    Tarefas.objects.filter(equipe__leader__user__username__startswith=PREFIXO).delete()
+    Projetos.objects.filter(criador__user__username__startswith=PREFIXO).delete()
+    Equipes.objects.filter(leader__user__username__startswith=PREFIXO).delete()
+    return User.objects.filter(username__startswith=PREFIXO).delete()[0]
+
+
+def _criado_em(hoje):
+    """Timestamp fixo (meia-noite de `hoje`) pros campos auto_now do fixture"""
+    criado = datetime.combine(hoje, time())
+    return timezone.make_aware(criado) if settings.USE_TZ else criado
+
+
+@transaction.atomic
+def semear(total_tarefas, batch_size=BATCH_SIZE, semente=42, config=None):
+    """Grava no banco a base do Gerador com `total_tarefas` tarefas; devolve as contagens"""
+    gerador = Gerador(total_tarefas, semente=semente, config=config)
+
+    senha = make_password(SENHA_PADRAO)
+    usuarios = list(gerador.usuarios())
+    inserir(User, (
+        User(username=u['username'], email=u['email'], first_name=u['nome'], last_name=u['sobrenome'],
+             password=senha)
+        for u in usuarios
+    ), batch_size)
+    user_ids = _ids_por_username([u['username'] for u in usuarios])
+    person_ids = [u['person_id'] for u in usuarios]
+    inserir(Integrantes, (
+        Integrantes(person_id=u['person_id'], user_id=user_id, nome=u['nome'], sobrenome=u['sobrenome'],
+                    telefone=u['telefone'], cargo=u['cargo'], role=u['role'])
+        for u, user_id in zip(usuarios, user_ids)
+    ), batch_size)
+    del usuarios
+
+    equipes = list(gerador.equipes())
+    objs = [
+        Equipes(name=e['name'], descricao=e['descricao'], leader_id=person_ids[e['leader']])
+        for e in equipes
+    ]
+    inserir(Equipes, objs, batch_size)
+    if objs[0].pk is None:
+        objs = Equipes.objects.filter(leader__user__username__startswith=PREFIXO).order_by('pk')
+    equipe_ids = [e.pk for e in objs]
+
+    Membro = Equipes.membros.through
+    inserir(Membro, (
+        Membro(equipes_id=equipe_id, integrantes_id=person_ids[i])
+        for equipe_id, e in zip(equipe_ids, equipes)
+        for i in e['membros']
+    ), batch_size, copy=True)
+    # Integrantes.equipe numa tacada só, a partir da tabela de membros
+    Integrantes.objects.filter(user__username__startswith=PREFIXO).update(
+        equipe_id=Subquery(Membro.objects.filter(integrantes_id=OuterRef('pk')).values('equipes_id')[:1])
+    )
+
+    projetos = list(gerador.projetos())
+    objs = [
+        Projetos(name=p['name'], descricao=p['descricao'], criador_id=person_ids[p['criador']],
+                 equipe_id=equipe_ids[p['equipe']], categoria=p['categoria'], prioridade=p['prioridade'],
+                 status=p['status'], prazofinal=p['prazofinal'])
+        for p in projetos
+    ]
+    inserir(Projetos, objs, batch_size)
+    if objs[0].pk is None:
+        objs = Projetos.objects.filter(criador__user__username__startswith=PREFIXO).order_by('pk')
+    projeto_ids = [p.pk for p in objs]
+
+    relatorios = []     # (posição da tarefa, arquivo, quem enviou)
+    agora = timezone.now()
+
+    def tarefas():
+        for t, tarefa in enumerate(gerador.tarefas(projetos)):
+            if tarefa['relatorio'] is not None:
+                enviado_por = tarefa['responsavel']
+                if enviado_por is None:
+                    enviado_por = equipes[tarefa['equipe']]['leader']
+                relatorios.append((t, tarefa['relatorio'], person_ids[enviado_por]))
+            yield Tarefas(
+                name=tarefa['name'], descricao=tarefa['descricao'],
+                projetoparent_id=projeto_ids[tarefa['projeto']], equipe_id=equipe_ids[tarefa['equipe']],
+                responsavel_id=None if tarefa['responsavel'] is None else person_ids[tarefa['responsavel']],
+                status=tarefa['status'], prioridade=tarefa['prioridade'], prazofinal=tarefa['prazofinal'],
+                concluida_em=agora if tarefa['status'] == 'done' else None,
+            )
+    inserir(Tarefas, tarefas(), batch_size, copy=True)
+
+    if relatorios:
+        _anexar_relatorios(gerador, relatorios, batch_size)
+    do_seed = Projetos.objects.filter(criador__user__username__startswith=PREFIXO).values('pk')
+    indicadores.recalcular(do_seed, batch_size)
+    fluxo.reconstruir(Tarefas.objects.filter(projetoparent_id__in=do_seed))
+
+    return {
+        'usuarios': len(person_ids),
+        'equipes': len(equipe_ids),
+        'projetos': len(projeto_ids),
+        'tarefas': total_tarefas,
+        'relatorios': len(relatorios),
+    }
+
+
+def _anexar_relatorios(gerador, relatorios, batch_size):
+    """Cada arquivo distinto vira um Blob (gravado uma vez); os relatórios só apontam pra ele"""
+    # COPY não devolve as pks; as tarefas do seed estão em ordem de inserção
+    tarefa_ids = list(
+        Tarefas.objects.filter(equipe__leader__user__username__startswith=PREFIXO)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    usos = Counter(arquivo for _, arquivo, _ in relatorios)
+    por_arquivo = {}
+    for arquivo, quantidade in usos.items():
+        blob = blobs.armazenar(ContentFile(gerador.conteudo(arquivo), name=f'relatorio_{arquivo}.txt'))
+        Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + quantidade - 1)
+        por_arquivo[arquivo] = blob
+
+    inserir(RelatorioTarefa, (
+        RelatorioTarefa(tarefa_id=tarefa_ids[t], descricao='Relatório sintético', enviado_por_id=enviado_por,
+                        blob=por_arquivo[arquivo], arquivo=por_arquivo[arquivo].arquivo.name)
+        for t, arquivo, enviado_por in relatorios
+    ), batch_size)
+
+
+def exportar_fixture(saida, total_tarefas, semente=42, config=None, hoje=None):
+    """Escreve a base como fixture JSON (manage.py loaddata) em `saida`, sem tocar no banco.
+
+    As pks começam em 1, então o fixture é pra carregar num banco vazio. Os arquivos dos
+    relatórios são gravados no storage (blobs/<sha256>) pra que os links funcionem.
+    """
+    gerador = Gerador(total_tarefas, semente=semente, config=config, hoje=hoje)
+    criado = _criado_em(gerador.hoje)
+    senha = make_password(SENHA_PADRAO, salt=f'seed{semente}')   # salt fixo: fixture reproduzível
+    contagens = Counter()
+    primeiro = True
+
+    def escrever(model, pk, fields):
+        nonlocal primeiro
+        saida.write('[\n' if primeiro else ',\n')
+        primeiro = False
+        json.dump({'model': model._meta.label_lower, 'pk': pk, 'fields': fields}, saida,
+                  cls=DjangoJSONEncoder, ensure_ascii=False)
+        contagens[model._meta.model_name] += 1
+
+    usuarios = list(gerador.usuarios())
+    person_ids = [str(u['person_id']) for u in usuarios]
+    for i, u in enumerate(usuarios):
+        escrever(User, i + 1, {
+            'username': u['username'], 'email': u['email'], 'first_name': u['nome'],
+            'last_name': u['sobrenome'], 'password': senha, 'is_active': True, 'date_joined': criado,
+        })
+    for i, u in enumerate(usuarios):
+        escrever(Integrantes, person_ids[i], {
+            'user': i + 1, 'nome': u['nome'], 'sobrenome': u['sobrenome'], 'telefone': u['telefone'],
+            'role': u['role'], 'cargo': u['cargo'], 'equipe': u['equipe'] + 1,
+        })
+    del usuarios
+
+    equipes = list(gerador.equipes())
+    for e, equipe in enumerate(equipes):
+        escrever(Equipes, e + 1, {
+            'name': equipe['name'], 'descricao': equipe['descricao'],
+            'leader': person_ids[equipe['leader']], 'membros': [person_ids[i] for i in equipe['membros']],
+        })
+
+    projetos = list(gerador.projetos())
+    for p, projeto in enumerate(projetos):
+        escrever(Projetos, p + 1, {
+            'name': projeto['name'], 'descricao': projeto['descricao'], 'criador': person_ids[projeto['criador']],
+            'equipe': projeto['equipe'] + 1, 'categoria': projeto['categoria'], 'inicio': criado,
+            'prioridade': projeto['prioridade'], 'status': projeto['status'], 'prazofinal': projeto['prazofinal'],
+        })
+
+    relatorios = []
+    for t, tarefa in enumerate(gerador.tarefas(projetos)):
+        responsavel = tarefa['responsavel']
+        escrever(Tarefas, t + 1, {
+            'name': tarefa['name'], 'descricao': tarefa['descricao'], 'projetoparent': tarefa['projeto'] + 1,
+            'equipe': tarefa['equipe'] + 1, 'responsavel': None if responsavel is None else person_ids[responsavel],
+            'status': tarefa['status'], 'prazofinal': tarefa['prazofinal'], 'inicio': criado, 'atualizado': criado,
+            'prioridade': tarefa['prioridade'], 'concluida_em': criado if tarefa['status'] == 'done' else None,
+        })
+        if tarefa['relatorio'] is not None:
+            enviado_por = equipes[tarefa['equipe']]['leader'] if responsavel is None else responsavel
+            relatorios.append((t + 1, tarefa['relatorio'], person_ids[enviado_por]))
+
+    usos = Counter(arquivo for _, arquivo, _ in relatorios)
+    blob_pks = {}
+    for arquivo in sorted(usos):
+        conteudo = gerador.conteudo(arquivo)
+        sha256 = hashlib.sha256(conteudo).hexdigest()
+        nome = f'blobs/{sha256[:2]}/{sha256}'
+        if not default_storage.exists(nome):
+            default_storage.save(nome, ContentFile(conteudo))
+        blob_pks[arquivo] = (len(blob_pks) + 1, nome)
+        escrever(Blob, len(blob_pks), {
+            'sha256': sha256, 'arquivo': nome, 'tamanho': len(conteudo), 'refcount': usos[arquivo],
+            'criado': criado,
+        })
+    for r, (tarefa_pk, arquivo, enviado_por) in enumerate(relatorios):
+        blob_pk, nome = blob_pks[arquivo]
+        escrever(RelatorioTarefa, r + 1, {
+            'tarefa': tarefa_pk, 'descricao': 'Relatório sintético', 'arquivo': nome, 'blob': blob_pk,
+            'enviado_por': enviado_por, 'data_envio': criado,
+        })
+
+    saida.write('[]\n' if primeiro else '\n]\n')
+    return dict(contagens)
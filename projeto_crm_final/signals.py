@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from projeto_crm_final.blobs import liberar
+from projeto_crm_final.cache import invalidate_user, bump_equipe_version
+from projeto_crm_final.models import Integrantes, Equipes, Projetos, RelatorioProjeto, RelatorioTarefa
+
+
+def _bump(*equipe_ids):
+    """Troca a versão agora e de novo no commit, pra não sobrar cache lido no meio da transação"""
+    ids = {equipe_id for equipe_id in equipe_ids if equipe_id}
+    for equipe_id in ids:
+        bump_equipe_version(equipe_id)
+    transaction.on_commit(lambda: [bump_equipe_version(equipe_id) for equipe_id in ids])
+
+
+# ---------- Cache do perfil do usuário
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Integrantes)
+def integrante_changed(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Equipes)
+def equipe_changed(sender, instance, **kwargs):
+    _bump(instance.pk)
+
+
+@receiver(m2m_changed, sender=Equipes.membros.through)
+def equipe_membros_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:     # integrante.equipes_set.add(...)
+        invalidate_user(instance.user_id)
+        _bump(*(pk_set or []))
+    else:
+        _bump(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Projetos)
+def projeto_changed(sender, instance, **kwargs):
+    # equipe antiga também perde o projeto quando ele troca de equipe
+    _bump(instance.equipe_id, instance.get_loaded_value('equipe_id'))
+
+
+# ---------- Referências dos blobs de relatório
+
+@receiver(post_delete, sender=RelatorioProjeto)
+@receiver(post_delete, sender=RelatorioTarefa)
+def relatorio_deleted(sender, instance, **kwargs):
+    liberar(instance.blob_id)
@@ -1,8 +1,46 @@
+import hashlib
+import importlib
+import inspect
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from xml.etree import ElementTree
+
+import numpy as np
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
-from django.urls import reverse
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command, CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, DatabaseError, IntegrityError
+from django.test import TestCase as DjangoTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context as TemplateContext, Template
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+
+from config import urls as config_urls
+from projeto_crm_final import auditoria, bench, blobs, fluxo, indicadores, jobs, metricas, notificacoes, prazos, seeding, \
+    uploads
+from projeto_crm_final.cache import get_cached_integrante, get_equipe_version, bump_equipe_version
+from projeto_crm_final.gerador import Gerador
+from projeto_crm_final.models import Integrantes, Equipes, Projetos, Tarefas, Job, RelatorioTarefa, Notificacao, UploadParcial, Blob, \
+    AuditLog, IndicadorDiario, TransicaoTarefa
+from projeto_crm_final.views import AuditLogView, DashboardAsyncView, DashboardView
+from projeto_crm_final.nmais1 import AsyncDetectorClient, Coleta, DetectorClient, NMais1Error, detectar
+
 
-from projeto_crm_final.models import Integrantes, Equipes
+@override_settings(AUDIT_FLUSH_SECONDS=0)   # sem thread de flush da auditoria gravando por outra conexão
+class TestCase(DjangoTestCase):
+    """Todo request feito com self.client / self.async_client falha se tiver N+1 (ver nmais1.py)"""
+    client_class = DetectorClient
+    async_client_class = AsyncDetectorClient
 
 
 class IntegrantesAccessTest(TestCase):
@@ -290,3 +328,1380 @@ class TeamCRUDTest(TestCase):
         response = self.client.post(reverse('equipes_delete', args=[self.team.pk]))
         self.assertNotEqual(response.status_code, 403)      #O Django redireciona entao ...?
         self.assertTrue(Equipes.objects.filter(pk=self.team.pk).exists())
+
+
+class ProjetoBaseTest(TestCase):
+    """Lider logado com equipe, projeto ativo e uma tarefa"""
+
+    # só o filtro pelo usuário; o JOIN de select_related('user') também tem "user_id" =
+    IDENTITY_SQL = 'WHERE "projeto_crm_final_integrantes"."user_id" ='
+
+    def setUp(self):
+        self.lead_user = User.objects.create_user(
+            username='lead', password='senha@123', email='lead@email.com'
+        )
+        self.lead = Integrantes.objects.create(
+            user=self.lead_user,
+            nome='Lead',
+            sobrenome='One',
+            telefone='21 999999999',
+            role='LEAD',
+            cargo='Leader',
+        )
+        self.equipe = Equipes.objects.create(
+            name='Team Alpha',
+            descricao='Test team',
+            leader=self.lead
+        )
+        self.equipe.add_member(self.lead)
+        self.projeto = Projetos.objects.create(
+            name='Projeto Alpha',
+            criador=self.lead,
+            equipe=self.equipe,
+            prazofinal=date.today() + timedelta(days=30),
+        )
+        self.tarefa = Tarefas.objects.create(
+            name='Tarefa Alpha',
+            descricao='Teste',
+            projetoparent=self.projeto,
+            responsavel=self.lead,
+            status='doing',
+            prazofinal=date.today() + timedelta(days=10),
+        )
+        self.client.login(username='lead', password='senha@123')
+
+
+class IdentityQueryCountTest(ProjetoBaseTest):
+    """O perfil do usuário logado deve ser consultado uma única vez por request"""
+
+    def urls(self):
+        return {
+            'home': reverse('home'),
+            'dashboard': reverse('dashboard'),
+            'account_user_detail': reverse('account_user_detail', args=[self.lead.person_id]),
+            'account_profile_edit': reverse('account_profile_edit'),
+            'account_login_info_edit': reverse('account_login_info_edit'),
+            'admin_integ_list': reverse('admin_integ_list'),
+            'equipes_list': reverse('equipes_list'),
+            'equipes_detail': reverse('equipes_detail', args=[self.equipe.pk]),
+            'equipes_edit': reverse('equipes_edit', args=[self.equipe.pk]),
+            'projetos_list': reverse('projetos_list'),
+            'projetos_create': reverse('projetos_create'),
+            'projetos_edit': reverse('projetos_edit', args=[self.projeto.pk]),
+            'projetos_detail': reverse('projetos_detail', args=[self.projeto.pk]),
+            'projetos_tarefas_csv': reverse('projetos_tarefas_csv', args=[self.projeto.pk]),
+            'tarefas_create': reverse('tarefas_create', args=[self.projeto.pk]),
+            'tarefas_edit': reverse('tarefas_edit', args=[self.tarefa.pk]),
+            'tarefas_detail': reverse('tarefas_detail', args=[self.tarefa.pk]),
+            'tarefas_report': reverse('tarefas_report', args=[self.tarefa.pk]),
+        }
+
+    def test_identity_is_fetched_once_per_url(self):
+        for name, url in self.urls().items():
+            with self.subTest(url=name):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertLess(response.status_code, 500)
+                identity = [q for q in ctx.captured_queries if self.IDENTITY_SQL in q['sql']]
+                self.assertLessEqual(len(identity), 1, f"{name}: {len(identity)} consultas de perfil")
+
+    def test_dashboard_uses_preloaded_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Projeto Alpha')
+        identity = [q for q in ctx.captured_queries if self.IDENTITY_SQL in q['sql']]
+        self.assertEqual(len(identity), 1)
+
+
+@override_settings(INTEGRANTE_CACHE_TIMEOUT=300)     # LocMemCache basta aqui: é um processo só
+class IntegranteCacheTest(ProjetoBaseTest):
+    """Perfil em cache entre requests, invalidado pelos signals"""
+
+    def identity_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        return [q for q in ctx.captured_queries if self.IDENTITY_SQL in q['sql']]
+
+    def test_second_request_hits_cache(self):
+        self.assertEqual(len(self.identity_queries(reverse('dashboard'))), 1)
+        self.assertEqual(len(self.identity_queries(reverse('dashboard'))), 0)
+
+    def test_project_change_invalidates_team_members(self):
+        self.client.get(reverse('dashboard'))
+        self.projeto.status = 'done'
+        self.projeto.save()
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertIsNone(response.context['active_projeto'])
+
+    def test_team_version_bump_invalidates_all_members(self):
+        member_user = User.objects.create_user(username='member', password='senha@123')
+        member = Integrantes.objects.create(user=member_user, nome='Member', sobrenome='One')
+        self.equipe.add_member(member)
+
+        self.client.get(reverse('dashboard'))
+        self.client.login(username='member', password='senha@123')
+        self.client.get(reverse('dashboard'))
+        self.assertIsNotNone(get_cached_integrante(self.lead_user.pk))
+        self.assertIsNotNone(get_cached_integrante(member_user.pk))
+
+        bump_equipe_version(self.equipe.pk)
+        self.assertIsNone(get_cached_integrante(self.lead_user.pk))
+        self.assertIsNone(get_cached_integrante(member_user.pk))
+
+    def test_profile_edit_does_not_write_back_the_cached_copy(self):
+        self.client.get(reverse('dashboard'))
+        # promoção feita em outro processo, cuja invalidação não chegou neste
+        Integrantes.objects.filter(pk=self.lead.pk).update(role='ADMIN')
+        self.assertEqual(get_cached_integrante(self.lead_user.pk).role, 'LEAD')
+
+        self.client.post(reverse('account_profile_edit'), {
+            'nome': 'Novo', 'sobrenome': 'Nome', 'telefone': '21 988888888', 'cargo': 'Leader',
+        })
+        self.lead.refresh_from_db()
+        self.assertEqual((self.lead.nome, self.lead.role), ('Novo', 'ADMIN'))
+
+    def test_requires_a_shared_cache_backend(self):
+        config_settings = importlib.import_module('config.settings')
+        try:
+            with mock.patch.dict(os.environ, {'INTEGRANTE_CACHE_TIMEOUT': '300'}):
+                os.environ.pop('CACHE_BACKEND', None)
+                with self.assertRaisesMessage(ImproperlyConfigured, 'CACHE_BACKEND compartilhado'):
+                    importlib.reload(config_settings)
+            with mock.patch.dict(os.environ, {'CACHE_BACKEND': 'django.core.cache.backends.redis.RedisCache'}):
+                importlib.reload(config_settings)
+                self.assertEqual(config_settings.INTEGRANTE_CACHE_TIMEOUT, 300)
+        finally:
+            importlib.reload(config_settings)
+
+
+class DashboardKanbanTest(ProjetoBaseTest):
+    def test_board_is_built_from_one_query(self):
+        for status in ['todo', 'doing', 'done', 'late', 'canceled', 'doing']:
+            Tarefas.objects.create(
+                name=f'Tarefa {status}',
+                descricao='Teste',
+                projetoparent=self.projeto,
+                responsavel=self.lead,
+                status=status,
+                prazofinal=date.today() + timedelta(days=5),
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+
+        tarefas_sql = [q for q in ctx.captured_queries if 'FROM "projeto_crm_final_tarefas"' in q['sql']]
+        self.assertEqual(len(tarefas_sql), 1)
+        self.assertEqual(response.context['kanban_counts'],
+                         {'todo': 1, 'doing': 3, 'done': 1, 'late': 1, 'canceled': 1})
+        self.assertEqual(len(response.context['late_tasks']), 1)
+
+
+class EquipesListTest(ProjetoBaseTest):
+    def create_teams(self, n):
+        for i in range(n):
+            equipe = Equipes.objects.create(name=f'Equipe {i:03d}', descricao='x', leader=self.lead)
+            equipe.membros.add(self.lead)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_teams(self):
+        self.create_teams(3)
+        self.client.get(reverse('equipes_list'))        # aquece o cache do perfil
+        few, _ = self.count_queries(reverse('equipes_list'))
+        self.create_teams(15)
+        self.client.get(reverse('equipes_list'))
+        many, response = self.count_queries(reverse('equipes_list'))
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.context['equipes']), 19)
+
+    def test_cursor_pagination_walks_all_teams_once(self):
+        self.create_teams(45)
+        seen = []
+        url = reverse('equipes_list') + '?cursor='
+        while url:
+            response = self.client.get(url)
+            seen.extend(equipe.pk for equipe in response.context['equipes'])
+            next_cursor = response.context['next_cursor']
+            url = f"{reverse('equipes_list')}?cursor={next_cursor}" if next_cursor else None
+        self.assertEqual(len(seen), 46)
+        self.assertEqual(len(set(seen)), 46)
+
+        # voltando da última página
+        response = self.client.get(f"{reverse('equipes_list')}?cursor={response.context['prev_cursor']}")
+        self.assertEqual(len(response.context['equipes']), 20)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('equipes_list') + '?cursor=lixo!')
+        self.assertEqual(response.status_code, 404)
+
+
+class IntegrantesListaTest(ProjetoBaseTest):
+    def create_people(self, names, **extra):
+        for nome in names:
+            user = User.objects.create(username=f'u_{nome}_{User.objects.count()}')
+            Integrantes.objects.create(user=user, nome=nome, sobrenome='Silva', equipe=self.equipe, **extra)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.create_people(['Ana', 'Bruno'])
+        self.client.get(reverse('admin_integ_list'))
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('admin_integ_list'))
+        self.create_people([f'Pessoa{i}' for i in range(20)])
+        self.client.get(reverse('admin_integ_list'))
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('admin_integ_list'))
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_prefix_search_and_filters(self):
+        self.create_people(['Mariana', 'mario', 'Amaro'])
+        self.create_people(['Marcos'], role='ADMIN', cargo='Diretor')
+
+        response = self.client.get(reverse('admin_integ_list'), {'q': 'mar'})
+        self.assertEqual([p.nome for p in response.context['integrantes']], ['Marcos', 'Mariana', 'mario'])
+
+        response = self.client.get(reverse('admin_integ_list'), {'q': 'mar', 'role': 'ADMIN', 'cargo': 'Diretor'})
+        self.assertEqual([p.nome for p in response.context['integrantes']], ['Marcos'])
+
+        response = self.client.get(reverse('admin_integ_list'), {'equipe': self.equipe.pk + 1})
+        self.assertEqual(len(response.context['integrantes']), 0)
+
+    def test_cursor_pagination_keeps_filters(self):
+        self.create_people([f'Nome{i:03d}' for i in range(60)])
+        response = self.client.get(reverse('admin_integ_list'), {'q': 'nome', 'cursor': ''})
+        self.assertEqual(len(response.context['integrantes']), 50)
+        response = self.client.get(reverse('admin_integ_list'),
+                                   {'q': 'nome', 'cursor': response.context['next_cursor']})
+        self.assertEqual(len(response.context['integrantes']), 10)
+        self.assertIsNone(response.context['next_cursor'])
+
+
+class ProjetoAtivoUnicoTest(ProjetoBaseTest):
+    def novo_projeto(self, **kwargs):
+        return Projetos(name='Projeto Beta', criador=self.lead,
+                        prazofinal=date.today() + timedelta(days=30), **kwargs)
+
+    def test_second_active_project_is_rejected(self):
+        with self.assertRaisesMessage(ValidationError, 'já tem um projeto ativo: Projeto Alpha'):
+            self.novo_projeto(equipe=self.equipe).save()
+
+    def test_database_constraint_is_translated(self):
+        # simula dois requests que passaram pela checagem ao mesmo tempo
+        with mock.patch.object(Projetos, 'clean'):
+            with self.assertRaisesMessage(ValidationError, 'já tem um projeto ativo: Projeto Alpha'):
+                self.novo_projeto(equipe=self.equipe).save()
+        self.assertEqual(Projetos.objects.filter(equipe=self.equipe, status='active').count(), 1)
+
+    def test_unrelated_save_skips_the_check(self):
+        projeto = Projetos.objects.get(pk=self.projeto.pk)
+        projeto.descricao = 'Nova descrição'
+        with CaptureQueriesContext(connection) as ctx:
+            projeto.save()
+        selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(selects, [])
+
+    def test_other_integrity_errors_are_not_swallowed(self):
+        with self.assertRaises(IntegrityError):
+            Projetos(name='Projeto Alpha', criador=self.lead,
+                     prazofinal=date.today() + timedelta(days=30)).save()
+
+    def duplicar_projeto_ativo(self, status='active'):
+        # linhas de antes da constraint (o DROP INDEX volta no rollback do teste)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX projeto_unico_ativo_por_equipe')
+        Projetos.objects.bulk_create([self.novo_projeto(equipe=self.equipe, status=status)])
+
+    def test_migration_cancels_duplicate_active_projects(self):
+        self.duplicar_projeto_ativo()
+        migracao = importlib.import_module('projeto_crm_final.migrations.0004_hot_filter_indexes')
+        migracao.cancelar_projetos_ativos_duplicados(django_apps, None)
+        self.projeto.refresh_from_db()
+        self.assertEqual(self.projeto.status, 'canceled')
+        self.assertEqual(Projetos.objects.get(name='Projeto Beta').status, 'active')
+
+    def test_migration_keeps_the_active_project_over_an_overdue_one(self):
+        self.duplicar_projeto_ativo(status='overdue')
+        migracao = importlib.import_module('projeto_crm_final.migrations.0013_varredura_prazos')
+        migracao.cancelar_projetos_em_andamento_duplicados(django_apps, None)
+        self.projeto.refresh_from_db()
+        self.assertEqual(self.projeto.status, 'active')
+        self.assertEqual(Projetos.objects.get(name='Projeto Beta').status, 'canceled')
+
+
+class TarefasExportTest(ProjetoBaseTest):
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_streams_project_tasks_with_one_query(self):
+        for i in range(30):
+            Tarefas.objects.create(name=f'T{i}', descricao='d', projetoparent=self.projeto,
+                                   responsavel=self.lead, prazofinal=date.today())
+        url = reverse('projetos_tarefas_csv', args=[self.projeto.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response, content = self.export(url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        linhas = content.decode().splitlines()
+        self.assertEqual(len(linhas), 32)
+        self.assertIn('Lead One', linhas[1])
+        tarefas_sql = [q for q in ctx.captured_queries if 'FROM "projeto_crm_final_tarefas"' in q['sql']]
+        self.assertEqual(len(tarefas_sql), 1)
+
+    def test_filters_and_ndjson(self):
+        Tarefas.objects.create(name='Feita', descricao='d', projetoparent=self.projeto,
+                               status='done', prazofinal=date.today() + timedelta(days=60))
+        _, content = self.export(reverse('tarefas_export'), formato='ndjson', status='done',
+                                 prazo_de=(date.today() + timedelta(days=30)).isoformat())
+        linhas = [json.loads(linha) for linha in content.decode().splitlines()]
+        self.assertEqual([linha['Nome'] for linha in linhas], ['Feita'])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        _, content = self.export(reverse('projetos_tarefas_csv', args=[self.projeto.pk]), formato='xlsx')
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            sheet = ElementTree.fromstring(zf.read('xl/worksheets/sheet1.xml'))
+        ns = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        rows = sheet.findall('.//s:row', ns)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1].find('.//s:t', ns).text, 'Tarefa Alpha')
+
+    def test_other_teams_projects_are_forbidden(self):
+        outro_user = User.objects.create(username='outro')
+        outro = Integrantes.objects.create(user=outro_user, nome='Outro', sobrenome='Lider', role='LEAD')
+        outra_equipe = Equipes.objects.create(name='Outra', descricao='x', leader=outro)
+        projeto = Projetos.objects.create(name='Projeto Outro', criador=outro, equipe=outra_equipe,
+                                          prazofinal=date.today() + timedelta(days=30))
+        response = self.client.get(reverse('projetos_tarefas_csv', args=[projeto.pk]))
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(reverse('tarefas_export'), {'projeto': projeto.pk})
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False,
+                   EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class JobQueueTest(ProjetoBaseTest):
+    UPLOAD = 'projeto_crm_final.jobs.cloudinary.uploader.upload'
+
+    def enviar_relatorio_tarefa(self):
+        return self.client.post(reverse('tarefas_report', args=[self.tarefa.pk]), {
+            'descricao': 'Pronto',
+            'arquivo': SimpleUploadedFile('relatorio.txt', b'conteudo'),
+        })
+
+    def test_report_view_only_enqueues(self):
+        with mock.patch(self.UPLOAD) as upload:
+            response = self.enviar_relatorio_tarefa()
+        self.assertEqual(response.status_code, 302)
+        upload.assert_not_called()
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.tipo, 'upload_relatorio_tarefa')
+        self.tarefa.refresh_from_db()
+        self.assertEqual(self.tarefa.status, 'done')
+
+    def test_worker_uploads_then_emails(self):
+        self.enviar_relatorio_tarefa()
+        with mock.patch(self.UPLOAD, return_value={'secure_url': 'https://res.cloudinary.com/x.txt'}):
+            self.assertEqual(jobs.run_pending(), 2)
+        relatorio = RelatorioTarefa.objects.get()
+        self.assertEqual(relatorio.cloudinary_url, 'https://res.cloudinary.com/x.txt')
+        # o e-mail vira notificação e só sai no digest
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Job.objects.filter(tipo='enviar_digests', status='pending').exists())
+        notificacoes.enviar_digests(forcar=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['lead@email.com'])
+        self.assertIn('https://res.cloudinary.com/x.txt', mail.outbox[0].body)
+
+    def test_failures_back_off_and_give_up(self):
+        self.enviar_relatorio_tarefa()
+        job = Job.objects.get()
+        with mock.patch(self.UPLOAD, side_effect=ConnectionError('timeout')):
+            jobs.run_pending()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.tentativas), ('pending', 1))
+            self.assertGreater(job.executar_em, job.atualizado)
+            self.assertIn('timeout', job.erro)
+
+            # ainda no backoff: nada pra rodar
+            self.assertEqual(jobs.run_pending(), 0)
+
+            for _ in range(job.max_tentativas - 1):
+                Job.objects.filter(pk=job.pk).update(executar_em=job.criado)
+                jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), ('failed', job.max_tentativas))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_job_is_claimed_only_once(self):
+        jobs.enqueue('email_tarefa_concluida', relatorio_id=0)
+        self.assertIsNotNone(jobs.claim())
+        self.assertIsNone(jobs.claim())
+
+    def test_handlers_take_explicit_keyword_arguments(self):
+        for tipo, handler in jobs.HANDLERS.items():
+            tipos = {p.kind for p in inspect.signature(handler).parameters.values()}
+            self.assertNotIn(inspect.Parameter.VAR_KEYWORD, tipos, tipo)
+
+
+@override_settings(NOTIFICACOES_JANELA=600, EMAIL_HOST_USER='',
+                   EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NotificacaoDigestTest(ProjetoBaseTest):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            membro_user = User.objects.create(username=f'membro{i}', email=f'membro{i}@email.com')
+            membro = Integrantes.objects.create(user=membro_user, nome=f'Membro{i}', sobrenome='X')
+            self.equipe.add_member(membro)
+
+    def test_team_emails_in_one_query(self):
+        with self.assertNumQueries(4):  # e-mails, bulk insert, checagem e criação do job de digest
+            notificacoes.notificar_equipe(self.equipe, 'Assunto', 'Mensagem')
+        self.assertEqual(Notificacao.objects.count(), 4)
+
+    def test_events_are_coalesced_per_recipient_over_the_window(self):
+        for i in range(5):
+            notificacoes.notificar_equipe(self.equipe, f'Tarefa Concluída: T{i}', f'T{i} feita')
+        self.assertEqual(Job.objects.filter(tipo='enviar_digests').count(), 1)
+
+        self.assertEqual(notificacoes.enviar_digests(), 0)  # janela ainda aberta
+
+        depois = timezone.now() + timedelta(seconds=601)
+        with mock.patch('projeto_crm_final.notificacoes.get_connection',
+                        wraps=notificacoes.get_connection) as get_connection:
+            self.assertEqual(notificacoes.enviar_digests(agora=depois), 4)
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 4)
+        digest = next(m for m in mail.outbox if m.to == ['membro0@email.com'])
+        self.assertEqual(digest.subject, '5 atualizações no CRM')
+        self.assertIn('T4 feita', digest.body)
+        self.assertFalse(Notificacao.objects.filter(enviado_em__isnull=True).exists())
+
+        self.assertEqual(notificacoes.enviar_digests(forcar=True), 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), UPLOAD_TMP_DIR=tempfile.mkdtemp(), UPLOAD_CHUNK_SIZE=1024)
+class UploadEmPartesTest(ProjetoBaseTest):
+    CONTEUDO = os.urandom(2500)
+
+    def iniciar(self, conteudo=CONTEUDO):
+        response = self.client.post(reverse('uploads_iniciar'), {
+            'nome': 'relatorio.pdf',
+            'tamanho': len(conteudo),
+            'sha256': hashlib.sha256(conteudo).hexdigest(),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def enviar(self, url, inicio, fim, conteudo=CONTEUDO):
+        return self.client.put(url, conteudo[inicio:fim], content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {inicio}-{fim - 1}/{len(conteudo)}')
+
+    def test_resumable_upload_is_verified_and_attached_to_report(self):
+        upload = self.iniciar()
+        self.assertEqual(self.enviar(upload['url'], 0, 1024).json()['recebido'], 1024)
+
+        # pulando bytes: recusado, e o servidor diz de onde continuar
+        response = self.enviar(upload['url'], 2048, 2500)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['recebido'], 1024)
+
+        self.assertEqual(self.client.get(upload['url']).json()['recebido'], 1024)
+        self.enviar(upload['url'], 1024, 2048)
+        self.assertTrue(self.enviar(upload['url'], 2048, 2500).json()['concluido'])
+
+        with mock.patch('projeto_crm_final.views.jobs.enqueue'):
+            response = self.client.post(reverse('tarefas_report', args=[self.tarefa.pk]), {
+                'descricao': 'Pronto', 'upload_id': upload['id'],
+            })
+        self.assertEqual(response.status_code, 302)
+        relatorio = RelatorioTarefa.objects.get()
+        with relatorio.arquivo.open('rb') as f:
+            self.assertEqual(f.read(), self.CONTEUDO)
+        self.assertFalse(UploadParcial.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(settings.UPLOAD_TMP_DIR, f"{upload['id']}.part")))
+
+    def test_assembled_file_is_closed(self):
+        upload = self.iniciar()
+        for inicio, fim in ((0, 1024), (1024, 2048), (2048, 2500)):
+            self.enviar(upload['url'], inicio, fim)
+        abertos = []
+        montar = uploads.arquivo_montado
+
+        def arquivo_montado(upload):
+            abertos.append(montar(upload))
+            return abertos[-1]
+
+        with mock.patch('projeto_crm_final.views.jobs.enqueue'), \
+                mock.patch('projeto_crm_final.forms.uploads.arquivo_montado', side_effect=arquivo_montado):
+            self.client.post(reverse('tarefas_report', args=[self.tarefa.pk]), {
+                'descricao': 'Pronto', 'upload_id': upload['id'],
+            })
+        self.assertEqual(len(abertos), 1)
+        self.assertTrue(abertos[0].closed)
+
+    def test_checksum_mismatch_restarts_upload(self):
+        upload = self.iniciar()
+        corrompido = b'x' * len(self.CONTEUDO)
+        self.enviar(upload['url'], 0, 1024, corrompido)
+        self.enviar(upload['url'], 1024, 2048, corrompido)
+        response = self.enviar(upload['url'], 2048, 2500, corrompido)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['recebido'], 0)
+
+    def test_chunk_larger_than_limit_is_rejected(self):
+        upload = self.iniciar()
+        self.assertEqual(self.enviar(upload['url'], 0, 2048).status_code, 409)
+
+    def test_incomplete_upload_cannot_be_attached(self):
+        upload = self.iniciar()
+        self.enviar(upload['url'], 0, 1024)
+        response = self.client.post(reverse('tarefas_report', args=[self.tarefa.pk]), {
+            'descricao': 'Pronto', 'upload_id': upload['id'],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RelatorioTarefa.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+class BlobDedupTest(ProjetoBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.outra_tarefa = Tarefas.objects.create(name='Tarefa Beta', descricao='Teste', projetoparent=self.projeto,
+                                                   responsavel=self.lead, prazofinal=date.today())
+
+    def enviar(self, tarefa, conteudo=b'mesmo relatorio'):
+        return self.client.post(reverse('tarefas_report', args=[tarefa.pk]), {
+            'descricao': 'Pronto', 'arquivo': SimpleUploadedFile('relatorio.txt', conteudo),
+        })
+
+    def test_duplicate_upload_reuses_blob_file_and_cloudinary(self):
+        self.enviar(self.tarefa)
+        with mock.patch('django.core.files.storage.FileSystemStorage._save') as save:
+            self.enviar(self.outra_tarefa)
+        save.assert_not_called()
+
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.sha256, hashlib.sha256(b'mesmo relatorio').hexdigest())
+        self.assertEqual(set(RelatorioTarefa.objects.values_list('arquivo', flat=True)), {blob.arquivo.name})
+
+        with mock.patch('projeto_crm_final.jobs.cloudinary.uploader.upload',
+                        return_value={'secure_url': 'https://res.cloudinary.com/blob'}) as upload:
+            jobs.run_pending()
+        upload.assert_called_once()
+        self.assertEqual(set(RelatorioTarefa.objects.values_list('cloudinary_url', flat=True)),
+                         {'https://res.cloudinary.com/blob'})
+
+    def test_orphan_blobs_are_collected(self):
+        self.enviar(self.tarefa)
+        self.enviar(self.outra_tarefa, b'outro conteudo')
+        orfao = Blob.objects.get(sha256=hashlib.sha256(b'outro conteudo').hexdigest())
+        caminho = orfao.arquivo.path
+
+        self.outra_tarefa.delete()
+        orfao.refresh_from_db()
+        self.assertEqual(orfao.refcount, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('gc_blobs', stdout=io.StringIO())
+        self.assertFalse(Blob.objects.filter(pk=orfao.pk).exists())
+        self.assertFalse(os.path.exists(caminho))
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+    def test_failed_report_save_does_not_leak_a_reference(self):
+        self.enviar(self.tarefa)
+        relatorio = RelatorioTarefa(tarefa=self.outra_tarefa, descricao='x', enviado_por=self.lead)
+        with mock.patch.object(RelatorioTarefa, 'save', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                blobs.anexar(relatorio, SimpleUploadedFile('relatorio.txt', b'mesmo relatorio'))
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+    def test_recontar_fixes_drifted_refcounts(self):
+        self.enviar(self.tarefa)
+        Blob.objects.update(refcount=0)
+        call_command('gc_blobs', '--recontar', stdout=io.StringIO())
+        self.assertEqual(Blob.objects.get().refcount, 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRouterTest(ProjetoBaseTest):
+    """Dois SQLite: 'default' com os dados e 'replica' vazia, simulando uma réplica atrasada"""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings['replica'] = {
+            **connections.settings['default'],
+            'NAME': os.path.join(tempfile.mkdtemp(), 'replica.sqlite3'),
+            'TEST': {'NAME': None, 'MIRROR': None, 'MIGRATE': True, 'CHARSET': None, 'COLLATION': None},
+        }
+        call_command('migrate', database='replica', verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+
+    def test_list_views_read_from_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('projetos_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertNotContains(response, 'Projeto Alpha')   # réplica ainda não tem o projeto
+
+    def test_export_streams_from_replica(self):
+        response = self.client.get(reverse('tarefas_export'))
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1)
+
+    def test_session_sticks_to_primary_after_write(self):
+        outro = Projetos.objects.create(name='Projeto Beta', criador=self.lead,
+                                        prazofinal=date.today() + timedelta(days=30))
+        self.client.post(reverse('equipes_projetos', args=[self.equipe.pk]), {'projeto_id': outro.pk})
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('projetos_detail', args=[outro.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Team Alpha')
+        self.assertFalse(replica.captured_queries)
+
+        # passada a janela volta a ler da réplica
+        session = self.client.session
+        session['_replica_fixado_ate'] = 0
+        session.save()
+        response = self.client.get(reverse('projetos_detail', args=[outro.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_always_go_to_primary(self):
+        self.client.post(reverse('tarefas_report', args=[self.tarefa.pk]), {'descricao': 'x'})
+        self.assertFalse(Tarefas.objects.using('replica').exists())
+
+
+class UrlsAsgi:
+    """config.urls como fica no ASGI (DJANGO_ASGI): o dashboard é a view async"""
+    urlpatterns = [path('dashboard/', DashboardAsyncView.as_view(), name='dashboard')] + config_urls.urlpatterns
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+class AsyncViewsTest(ProjetoBaseTest):
+    @override_settings(ROOT_URLCONF=UrlsAsgi)
+    async def test_dashboard_runs_on_async_client(self):
+        self.assertIs(resolve(reverse('dashboard')).func.view_class, DashboardAsyncView)
+        await self.async_client.aforce_login(self.lead_user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Tarefa Alpha')
+
+    def test_wsgi_dashboard_is_sync(self):
+        self.assertIs(resolve(reverse('dashboard')).func.view_class, DashboardView)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'Tarefa Alpha')
+        self.assertEqual(response.context['kanban_counts']['doing'], 1)
+
+    def test_asgi_turns_off_persistent_connections(self):
+        config_settings = importlib.import_module('config.settings')
+        try:
+            with mock.patch.dict(os.environ, {'DJANGO_ASGI': 'True', 'DB_CONN_MODE': 'persistent'}):
+                importlib.reload(config_settings)
+                self.assertEqual(config_settings.DB_CONN_MODE, 'none')
+                self.assertEqual(config_settings.DATABASES['default']['CONN_MAX_AGE'], 0)
+        finally:
+            importlib.reload(config_settings)
+
+    def test_pool_mode_requires_psycopg3(self):
+        config_settings = importlib.import_module('config.settings')
+        ambiente = {'DB_CONN_MODE': 'pool', 'DB_ENGINE': 'django.db.backends.postgresql'}
+        try:
+            with mock.patch.dict(os.environ, ambiente), mock.patch('importlib.util.find_spec', return_value=None):
+                with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg[binary,pool]'):
+                    importlib.reload(config_settings)
+        finally:
+            importlib.reload(config_settings)
+
+    async def test_anonymous_is_redirected_to_login(self):
+        response = await self.async_client.get(reverse('tarefas_report', args=[self.tarefa.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(str(settings.LOGIN_URL), response.url)
+
+    def test_project_completion(self):
+        response = self.client.post(reverse('equipes_concluir', args=[self.equipe.pk]), {
+            'arquivo': SimpleUploadedFile('final.pdf', b'relatorio final'),
+        })
+        self.assertRedirects(response, reverse('equipes_detail', args=[self.equipe.pk]),
+                             fetch_redirect_response=False)
+        self.projeto.refresh_from_db()
+        self.assertEqual(self.projeto.status, 'done')
+        self.assertTrue(Job.objects.filter(tipo='upload_relatorio_projeto').exists())
+
+    def test_project_completion_without_file_shows_errors(self):
+        response = self.client.post(reverse('equipes_concluir', args=[self.equipe.pk]), {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'projeto_crm_final/equipes_detail.html')
+        self.projeto.refresh_from_db()
+        self.assertEqual(self.projeto.status, 'active')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SeedTest(TestCase):
+    def test_seed_builds_consistent_dataset(self):
+        with mock.patch('projeto_crm_final.seeding.make_password', wraps=seeding.make_password) as hash_:
+            call_command('seed', scale='200', stdout=io.StringIO())
+        hash_.assert_called_once()
+
+        self.assertEqual(Tarefas.objects.count(), 200)
+        for equipe in Equipes.objects.all():
+            self.assertEqual(equipe.projetos_set.filter(status='active').count(), 1)
+            self.assertIn(equipe.leader, equipe.membros.all())
+        self.assertFalse(Integrantes.objects.filter(equipe__isnull=True).exists())
+        self.assertTrue(self.client.login(username='seed_0000000', password=seeding.SENHA_PADRAO))
+        # relatórios iguais compartilham o blob
+        self.assertEqual(sum(Blob.objects.values_list('refcount', flat=True)), RelatorioTarefa.objects.count())
+        self.assertEqual(blobs.recontar(), 0)
+
+    def test_inserts_are_batched(self):
+        with CaptureQueriesContext(connection) as queries:
+            seeding.semear(800, batch_size=1000, config={'relatorios': 0})
+        # 800 tarefas, ~40 projetos, ~80 usuários: só lotes (o SQLite limita variáveis por INSERT)
+        self.assertLess(len(queries), 40)
+
+    def test_existing_seed_requires_limpar(self):
+        call_command('seed', scale='50', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('seed', scale='50', stdout=io.StringIO())
+        call_command('seed', scale='50', limpar=True, stdout=io.StringIO())
+        self.assertEqual(Tarefas.objects.count(), 50)
+
+    def test_fixture_is_reproducible_and_loads(self):
+        hoje = date(2026, 1, 1)
+        primeiro, segundo = io.StringIO(), io.StringIO()
+        seeding.exportar_fixture(primeiro, 300, semente=7, hoje=hoje)
+        seeding.exportar_fixture(segundo, 300, semente=7, hoje=hoje)
+        self.assertEqual(primeiro.getvalue(), segundo.getvalue())
+
+        caminho = os.path.join(settings.MEDIA_ROOT, 'seed.json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(primeiro.getvalue())
+        call_command('loaddata', caminho, verbosity=0)
+        self.assertEqual(Tarefas.objects.count(), 300)
+        # mesmas linhas do semear(): toda tarefa concluída tem concluida_em
+        self.assertTrue(Tarefas.objects.filter(status='done').exists())
+        self.assertFalse(Tarefas.objects.filter(status='done', concluida_em__isnull=True).exists())
+        self.assertFalse(Tarefas.objects.filter(status='late', prazofinal__gte=hoje).exists())
+        self.assertEqual(blobs.recontar(), 0)
+
+
+class GeradorTest(TestCase):
+    def dados(self, **kwargs):
+        g = Gerador(500, hoje=date(2026, 1, 1), **kwargs)
+        projetos = list(g.projetos())
+        return list(g.usuarios()), projetos, list(g.tarefas(projetos))
+
+    def test_same_seed_same_data(self):
+        self.assertEqual(self.dados(semente=1), self.dados(semente=1))
+        self.assertNotEqual(self.dados(semente=1), self.dados(semente=2))
+
+    def test_sections_do_not_depend_on_call_order(self):
+        g = Gerador(500, semente=3)
+        projetos = list(g.projetos())
+        tarefas = list(g.tarefas(projetos))
+        outro = Gerador(500, semente=3)
+        list(outro.usuarios())
+        self.assertEqual(list(outro.tarefas(list(outro.projetos()))), tarefas)
+
+    def test_distributions_can_be_overridden(self):
+        _, projetos, tarefas = self.dados(config={
+            'status_tarefa': {'done': 1}, 'membros_por_equipe': [5, 5], 'relatorios': 0,
+        })
+        self.assertEqual({t['status'] for t in tarefas}, {'done'})
+        self.assertTrue(all(t['relatorio'] is None for t in tarefas))
+        self.assertEqual(len(tarefas), 500)
+        with self.assertRaises(ValueError):
+            Gerador(10, config={'nao_existe': 1})
+
+    def test_late_comes_from_the_deadline(self):
+        _, _, tarefas = self.dados(config={'status_tarefa': {'todo': 1, 'doing': 1, 'late': 1}})
+        hoje = date(2026, 1, 1)
+        # todo/doing vencidas viram 'late'; 'late' sorteada com prazo em dia volta pra todo/doing
+        self.assertEqual({t['status'] for t in tarefas}, {'todo', 'doing', 'late'})
+        self.assertTrue(all((t['status'] == 'late') == (t['prazofinal'] < hoje) for t in tarefas))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+class BenchUrlsTest(TestCase):
+    def test_every_named_route_is_benchmarked_or_explained(self):
+        self.assertEqual(bench.sem_cobertura(), set())
+        self.assertFalse(set(bench.ROTAS) & set(bench.IGNORADAS))
+
+    def test_measures_each_case(self):
+        resultados = bench.medir_escala(300, repeticoes=1)
+        casos = {nome.split('?')[0] for nome in resultados}
+        self.assertEqual(casos, set(bench.ROTAS))
+        for nome in ('dashboard', 'projetos_list?status=overdue', 'equipes_detail', 'projetos_detail',
+                     'admin_integ_list', 'projetos_tarefas_csv'):
+            self.assertEqual(resultados[nome]['status'], 200, nome)
+            self.assertGreater(resultados[nome]['queries'], 0)
+            self.assertGreater(resultados[nome]['pico_kb'], 0)
+            self.assertLessEqual(resultados[nome]['p50_ms'], resultados[nome]['p95_ms'])
+
+    def test_compare_flags_slower_cases_and_extra_queries(self):
+        antes = {'escalas': {'1000': {
+            'dashboard': {'p50_ms': 10, 'queries': 4},
+            'equipes_list': {'p50_ms': 10, 'queries': 5},
+        }}}
+        depois = {'escalas': {'1000': {
+            'dashboard': {'p50_ms': 11, 'queries': 6},
+            'equipes_list': {'p50_ms': 15, 'queries': 5},
+            'novo': {'p50_ms': 99, 'queries': 99},
+        }}}
+        self.assertEqual(bench.comparar(antes, depois, tolerancia=0.2), [
+            ('1000', 'dashboard', 'queries', 4, 6),
+            ('1000', 'equipes_list', 'p50_ms', 10, 15),
+        ])
+
+
+class RequestMetricsTest(ProjetoBaseTest):
+    @override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True, METRICS_SLOW_MS=60000)
+    def test_sampled_request_is_logged_with_sql_and_template_time(self):
+        with self.assertLogs('projeto_crm_final.metricas', 'INFO') as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('projetos_list'))
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['view'], 'projetos_list')
+        self.assertEqual(registro['queries'], len(queries))
+        self.assertGreater(registro['template_ms'], 0)
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+    @override_settings(METRICS_SAMPLE_RATE=0, METRICS_SLOW_MS=0)
+    def test_unsampled_slow_request_goes_to_slow_log_only(self):
+        with self.assertLogs('projeto_crm_final.metricas.lentos', 'WARNING') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual(registro['view'], 'dashboard')
+        self.assertFalse(registro['amostrado'])
+        self.assertNotIn('queries', registro)
+
+    def test_fingerprint_ignores_values_and_in_list_size(self):
+        self.assertEqual(
+            metricas.fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND x = 10'),
+            metricas.fingerprint('SELECT *  FROM t WHERE id IN (%s) AND x = 3'),
+        )
+
+    def test_top_lentos_groups_by_view(self):
+        caminho = os.path.join(tempfile.mkdtemp(), 'lentos.log')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            for view, total in [('dashboard', 1200), ('dashboard', 1500), ('projetos_list', 3000)]:
+                f.write(json.dumps({'view': view, 'path': '/', 'total_ms': total, 'amostrado': False}) + '\n')
+            f.write('linha que não é json\n')
+        saida = io.StringIO()
+        call_command('top_lentos', arquivo=caminho, json=True, stdout=saida)
+        resumo = json.loads(saida.getvalue())
+        self.assertEqual([r['view'] for r in resumo], ['projetos_list', 'dashboard'])
+        self.assertEqual(resumo[1]['requests'], 2)
+        self.assertEqual(resumo[1]['p95_ms'], 1500)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), JOBS_EAGER=False)
+class NMais1Test(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # equipes grandes o bastante pra um N+1 passar do limite
+        seeding.semear(600, config={'membros_por_equipe': [12, 12]})
+
+    # confirmações de exclusão sem template (o GET responde 500); só o POST é usado
+    SEM_TEMPLATE = {'equipes_delete', 'tarefas_delete'}
+
+    def test_no_route_has_n_plus_one(self):
+        ctx = bench.contexto()
+        for nome, quem, url in bench.casos(ctx):
+            with self.subTest(nome):
+                client = self.client_class(raise_request_exception=nome not in self.SEM_TEMPLATE)
+                if quem != 'anonimo':
+                    client.force_login(ctx['usuarios'][quem])
+                response = client.get(url)      # o DetectorClient lê o corpo dos exports (streaming)
+                if nome not in self.SEM_TEMPLATE:
+                    self.assertLess(response.status_code, 500)
+
+    def test_streamed_export_queries_are_checked(self):
+        client = self.client_class()
+        client.force_login(User.objects.get(username='seed_0000000'))
+        with mock.patch.object(Coleta, 'verificar', autospec=True) as verificar:
+            response = client.get(reverse('tarefas_export') + '?formato=ndjson')
+        self.assertTrue(b''.join(response.streaming_content))
+        # a consulta das tarefas só roda quando o corpo é lido, e entra na verificação do request
+        coleta = verificar.call_args.args[0]
+        self.assertTrue(any('FROM "projeto_crm_final_tarefas"' in formato for formato in coleta.origens))
+
+    def test_repeated_queries_are_reported_with_template_line(self):
+        equipe = Equipes.objects.first()
+        template = Template("{% for m in equipe.membros.all %}\n{{ m.user.email }}{% endfor %}")
+        with detectar() as coleta:
+            template.render(TemplateContext({'equipe': equipe}))
+        with self.assertRaises(NMais1Error) as erro:
+            coleta.verificar(limite=5)
+        self.assertIn('12x SELECT ... FROM "auth_user"', str(erro.exception))
+        self.assertIn(':2', str(erro.exception))
+        coleta.verificar(limite=12)
+
+
+@override_settings(AUDIT_BUFFER_SIZE=3)
+class AuditoriaTest(ProjetoBaseTest):
+    def setUp(self):
+        super().setUp()
+        auditoria.buffer.entradas.clear()
+
+    def assign(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('tarefas_assign', args=[self.tarefa.pk]))
+
+    def test_actions_are_buffered_until_the_batch_is_full(self):
+        self.assign()
+        self.assign()
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(auditoria.buffer.pendentes(), 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assign()
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "projeto_crm_final_auditlog"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(auditoria.buffer.pendentes(), 0)
+
+        entrada = AuditLog.objects.first()
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertEqual((entrada.usuario, entrada.action, entrada.onde, entrada.ip_address),
+                         (self.lead, 'tarefa_assumida', f'tarefa:{self.tarefa.pk}', '127.0.0.1'))
+
+    def test_user_without_profile_is_audited_without_usuario(self):
+        User.objects.create_user(username='sem_perfil', password='senha@123')
+        self.client.login(username='sem_perfil', password='senha@123')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('update_role'), {'user_id': self.lead.pk})
+        self.assertEqual(response.status_code, 200)
+        auditoria.flush()
+        entrada = AuditLog.objects.get()
+        self.assertEqual((entrada.usuario, entrada.action), (None, 'role:ADMIN'))
+
+    def test_rolled_back_action_is_not_audited(self):
+        self.client.post(reverse('tarefas_assign', args=[self.tarefa.pk]))    # sem commit
+        self.assertEqual(auditoria.buffer.pendentes(), 0)
+
+    def test_failed_flush_keeps_entries_for_the_next_one(self):
+        self.assign()
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=DatabaseError):
+            self.assertEqual(auditoria.flush(), 0)
+        self.assertEqual(auditoria.buffer.pendentes(), 1)
+        self.assertEqual(auditoria.flush(), 1)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_rollover_archives_closed_months_and_prune_drops_them(self):
+        for dia in [datetime(2026, 8, 15), datetime(2026, 9, 10), datetime(2026, 9, 30, 23), datetime(2026, 10, 5)]:
+            AuditLog.objects.create(usuario=self.lead, action='x', onde='y', ip_address='127.0.0.1',
+                                    timestamp=dia.replace(tzinfo=dt_timezone.utc))
+        agora = datetime(2026, 10, 18, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(auditoria.rollover(agora), [auditoria.nome_particao(2026, 8), auditoria.nome_particao(2026, 9)])
+        self.assertEqual(AuditLog.objects.count(), 1)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{auditoria.nome_particao(2026, 9)}"')
+            self.assertEqual(cursor.fetchone()[0], 2)
+        constraints = connection.introspection.get_constraints(connection.cursor(), auditoria.TABELA)
+        self.assertIn('audit_usuario_ts_idx', constraints)
+        self.assertEqual(auditoria.rollover(agora), [])
+
+        self.assertEqual(auditoria.podar(1, agora), [auditoria.nome_particao(2026, 8)])
+        self.assertEqual(list(auditoria.particoes()), [(2026, 9)])
+
+
+class AuditLogViewTest(ProjetoBaseTest):
+    def setUp(self):
+        super().setUp()
+        self.lead.role = 'ADMIN'
+        self.lead.save()
+        inicio = datetime(2026, 10, 1, 12, tzinfo=dt_timezone.utc)
+        AuditLog.objects.bulk_create([
+            AuditLog(usuario=self.lead if i % 2 else None, action='tarefa_editada' if i % 3 else 'membro_removido',
+                     onde=f'equipe:{i % 4} tarefa:{i}', ip_address='10.0.0.1' if i < 5 else '10.0.0.2',
+                     timestamp=inicio + timedelta(hours=i // 2))   # pares com o mesmo timestamp
+            for i in range(12)
+        ])
+
+    def pagina(self, **params):
+        response = self.client.get(reverse('admin_audit_json'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_walks_all_entries_newest_first(self):
+        vistos, cursor = [], None
+        while True:
+            dados = self.pagina(limite=5, **({'cursor': cursor} if cursor else {}))
+            vistos += [(r['timestamp'], r['id']) for r in dados['resultados']]
+            cursor = dados['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(vistos), 12)
+        self.assertEqual(vistos, sorted(vistos, reverse=True))
+
+    def test_filters(self):
+        def ids(**params):
+            return {r['id'] for r in self.pagina(limite=100, **params)['resultados']}
+
+        todas = list(AuditLog.objects.all())
+        self.assertEqual(ids(action='membro_removido'), {e.id for e in todas if e.action == 'membro_removido'})
+        self.assertEqual(ids(onde='equipe:1'), {e.id for e in todas if e.onde.startswith('equipe:1')})
+        self.assertEqual(ids(ip='10.0.0.1'), {e.id for e in todas if e.ip_address == '10.0.0.1'})
+        self.assertEqual(ids(usuario=str(self.lead.pk)), {e.id for e in todas if e.usuario_id})
+        self.assertEqual(ids(de='2026-10-01T14:00:00+00:00', ate='2026-10-01T15:00:00+00:00'),
+                         {e.id for e in todas if 14 <= e.timestamp.hour < 15})
+        self.assertEqual(len(ids(ate='2026-10-01')), 12)     # a data sozinha vale o dia inteiro
+        self.assertEqual(ids(usuario='nao-e-uuid'), set())
+        self.assertEqual(ids(ip='999.1.1.1'), set())
+        # o maior caractere do Unicode não tem sucessor: filtra sem o limite superior
+        self.assertEqual(ids(onde='equipe:1\U0010ffff'), set())
+
+    def test_filtered_page_is_read_in_index_order(self):
+        view = AuditLogView()
+        view.request = RequestFactory().get('/', {'action': 'tarefa_editada'})
+        sql, params = view.get_queryset()[:50].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plano = ' '.join(str(linha) for linha in cursor.fetchall())
+        self.assertIn('audit_action_ts_idx', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_browser_renders_and_is_admin_only(self):
+        response = self.client.get(reverse('admin_audit_list'), {'action': 'tarefa_editada'})
+        self.assertContains(response, 'tarefa_editada')
+        self.assertNotContains(response, 'membro_removido</a>')
+
+        self.lead.role = 'LEAD'
+        self.lead.save()
+        self.assertRedirects(self.client.get(reverse('admin_audit_json')), reverse('home'))
+
+
+def snapshot_indicadores():
+    """Linhas de indicadores sem as zeradas (o incremental deixa, o recálculo não cria)"""
+    return {
+        tuple(linha) for linha in
+        IndicadorDiario.objects.values_list('equipe_id', 'projeto_id', 'dia', *indicadores.COLUNAS)
+        if any(linha[3:])
+    }
+
+
+class IndicadoresTest(ProjetoBaseTest):
+    def snapshot(self):
+        return snapshot_indicadores()
+
+    def criar(self, **kwargs):
+        dados = {'name': 'T', 'descricao': 'x', 'projetoparent': self.projeto,
+                 'prazofinal': date.today() + timedelta(days=5), **kwargs}
+        return Tarefas.objects.create(**dados)
+
+    def test_incremental_matches_rebuild(self):
+        a = self.criar(prioridade='alta')
+        b = self.criar(status='doing')
+        c = self.criar()
+        a.status = 'done'
+        a.save()
+        b.prazofinal = date.today() + timedelta(days=1)
+        b.prioridade = 'urgente'
+        b.save()
+        c.delete()
+        Tarefas.objects.get(pk=self.tarefa.pk).save()       # sem mudança: nada a aplicar
+        self.tarefa.name = 'Renomeada'
+        self.tarefa.save()
+
+        incremental = self.snapshot()
+        indicadores.recalcular()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_stale_copies_do_not_double_count(self):
+        # dois requests carregaram a mesma tarefa; o segundo salva depois do primeiro
+        primeira, segunda = Tarefas.objects.get(pk=self.tarefa.pk), Tarefas.objects.get(pk=self.tarefa.pk)
+        primeira.status = 'done'
+        primeira.save()
+        segunda.status = 'canceled'
+        segunda.save()
+
+        incremental = self.snapshot()
+        indicadores.recalcular()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_summary_counts(self):
+        self.criar(status='done')
+        self.criar(status='done', prazofinal=date.today() - timedelta(days=1))     # concluída atrasada
+        self.criar(prioridade='urgente', prazofinal=date.today() - timedelta(days=2))
+
+        dados = indicadores.resumo(projeto_id=self.projeto.pk, dias=7)
+        self.assertEqual(dados['criadas'], 4)
+        self.assertEqual(dict((s, n) for s, _, n in dados['status'])['done'], 2)
+        self.assertEqual(dict((p, n) for p, _, n in dados['prioridade'])['urgente'], 1)
+        self.assertEqual((dados['concluidas'], dados['no_prazo_pct']), (2, 50.0))
+        self.assertEqual(dados['vencidas'], 1)
+        self.assertEqual(dados['proximos_prazos'], [(self.tarefa.prazofinal, 1)])
+        self.assertEqual(dados['vazao'][-1], (timezone.localdate(), 4, 2))
+
+    def test_reopening_clears_completion(self):
+        self.tarefa.status = 'done'
+        self.tarefa.save()
+        self.assertIsNotNone(self.tarefa.concluida_em)
+        self.tarefa.status = 'doing'
+        self.tarefa.save()
+        self.assertIsNone(self.tarefa.concluida_em)
+        self.assertEqual(indicadores.resumo(projeto_id=self.projeto.pk)['concluidas'], 0)
+
+    def test_view_reads_rollups_not_tasks(self):
+        for url in (reverse('projetos_indicadores', args=[self.projeto.pk]),
+                    reverse('equipes_indicadores', args=[self.equipe.pk])):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in ctx.captured_queries if 'projeto_crm_final_tarefas' in q['sql']])
+            self.assertContains(response, 'Indicadores')
+
+    def test_view_is_restricted_to_team(self):
+        outro = User.objects.create_user(username='outro', password='senha@123')
+        Integrantes.objects.create(user=outro, nome='Outro', sobrenome='Um')
+        self.client.login(username='outro', password='senha@123')
+        response = self.client.get(reverse('equipes_indicadores', args=[self.equipe.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_without_profile_is_forbidden(self):
+        User.objects.create_user(username='sem_perfil', password='senha@123')
+        self.client.login(username='sem_perfil', password='senha@123')
+        for url in (reverse('projetos_indicadores', args=[self.projeto.pk]),
+                    reverse('equipes_indicadores', args=[self.equipe.pk])):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class FluxoTest(ProjetoBaseTest):
+    def historico(self, tarefa):
+        return list(tarefa.transicoes.order_by('em', 'pk').values_list('de', 'para'))
+
+    def test_stale_copies_log_the_stored_status(self):
+        c = TransicaoTarefa.CODIGOS
+        copias = [Tarefas.objects.get(pk=self.tarefa.pk) for _ in range(3)]
+        for copia, status in zip(copias, ('done', 'done', 'canceled')):
+            copia.status = status
+            copia.save()
+        # a segunda já encontra 'done' no banco; a terceira parte de 'done', não de 'doing'
+        self.assertEqual(self.historico(self.tarefa), [
+            (TransicaoTarefa.CRIADA, c['doing']), (c['doing'], c['done']), (c['done'], c['canceled']),
+        ])
+
+    def test_status_changes_are_logged(self):
+        c = TransicaoTarefa.CODIGOS
+        tarefa = Tarefas.objects.create(name='T', descricao='x', projetoparent=self.projeto,
+                                        prazofinal=date.today() + timedelta(days=3))
+        tarefa.prioridade = 'alta'
+        tarefa.save()                                       # sem mudança de status
+        self.client.post(reverse('tarefas_assign', args=[tarefa.pk]))
+        tarefa.refresh_from_db()
+        tarefa.status = 'done'
+        tarefa.save()
+
+        self.assertEqual(self.historico(tarefa), [
+            (TransicaoTarefa.CRIADA, c['todo']), (c['todo'], c['doing']), (c['doing'], c['done']),
+        ])
+        ultima = tarefa.transicoes.latest('em')
+        self.assertEqual((ultima.equipe_id, ultima.projeto_id, ultima.em),
+                         (self.equipe.pk, self.projeto.pk, tarefa.atualizado))
+
+    def test_log_is_append_only_and_shares_the_transaction(self):
+        transicao = self.tarefa.transicoes.get()
+        with self.assertRaises(ValueError):
+            transicao.save()
+        with self.assertRaises(ValueError):
+            transicao.delete()
+
+        self.tarefa.status = 'done'
+        with mock.patch.object(TransicaoTarefa, 'registrar', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.tarefa.save()
+        self.assertEqual(Tarefas.objects.get(pk=self.tarefa.pk).status, 'doing')
+        self.assertEqual(self.tarefa.transicoes.count(), 1)
+
+    def test_metrics_per_team(self):
+        c = TransicaoTarefa.CODIGOS
+        hoje = date(2026, 3, 10)
+        h = 3_600_000_000
+        dia = fluxo.microssegundos(timezone.make_aware(datetime(2026, 3, 9)))
+        dados = np.array([
+            # equipe 1: A passa por doing (ciclo 8h, lead 10h); B vai direto pra done (lead 4h)
+            (1, 1, 1, TransicaoTarefa.CRIADA, c['todo'], dia),
+            (1, 1, 1, c['todo'], c['doing'], dia + 2 * h),
+            (1, 1, 1, c['doing'], c['done'], dia + 10 * h),
+            (2, 1, 1, TransicaoTarefa.CRIADA, c['todo'], dia - 20 * h),
+            (2, 1, 1, c['todo'], c['done'], dia + 4 * h),
+            # fora da janela
+            (3, 1, 2, TransicaoTarefa.CRIADA, c['done'], dia - 30 * 24 * h),
+            # equipe 2: uma em andamento
+            (4, 2, 3, TransicaoTarefa.CRIADA, c['doing'], dia),
+        ], dtype=fluxo.DTYPE)[::-1]     # a ordem de entrada não importa
+
+        r = fluxo.calcular(dados, dias=7, hoje=hoje)
+        self.assertEqual(r['equipes'].tolist(), [1, 2])
+        self.assertEqual(r['concluidas'].tolist(), [2, 0])
+        self.assertEqual(r['em_andamento'].tolist(), [0, 1])
+        self.assertEqual((r['lead_media_h'][0], r['lead_p50_h'][0], r['lead_p85_h'][0]), (17.0, 10.0, 10.0))
+        self.assertEqual((r['ciclo_media_h'][0], r['ciclo_p50_h'][0]), (8.0, 8.0))
+        self.assertTrue(np.isnan(r['lead_media_h'][1]) and np.isnan(r['ciclo_p50_h'][1]))
+        self.assertEqual(r['vazao'].shape, (2, 7))
+        self.assertEqual(r['vazao'][0].tolist(), [0, 0, 0, 0, 0, 2, 0])
+        self.assertEqual(r['dias'][5], date(2026, 3, 9))
+
+    def test_rebuild_from_tasks(self):
+        c = TransicaoTarefa.CODIGOS
+        feita = Tarefas.objects.create(name='F', descricao='x', projetoparent=self.projeto, status='done',
+                                       prazofinal=date.today())
+        TransicaoTarefa.objects.all()._raw_delete(connection.alias)       # como uma carga sem o save
+
+        self.assertEqual(fluxo.reconstruir(Tarefas.objects.all()), 4)
+        self.assertEqual(self.historico(self.tarefa), [(TransicaoTarefa.CRIADA, c['todo']), (c['todo'], c['doing'])])
+        self.assertEqual(feita.transicoes.get(para=c['done']).em, feita.concluida_em)
+        self.assertEqual(feita.transicoes.get(de=TransicaoTarefa.CRIADA).em, feita.inicio)
+
+    def test_no_history(self):
+        TransicaoTarefa.objects.all()._raw_delete(connection.alias)
+        r = fluxo.calcular(fluxo.exportar(), dias=7)
+        self.assertEqual((len(r['equipes']), len(r['lead_p50_h']), r['vazao'].shape), (0, 0, (0, 7)))
+
+        saida = io.StringIO()
+        call_command('fluxo_tarefas', '--equipe', str(self.equipe.pk + 1), stdout=saida)
+        self.assertIn('0 transições, 0 equipe(s)', saida.getvalue())
+
+    def test_export_and_command(self):
+        self.tarefa.status = 'done'
+        self.tarefa.save()
+        dados = fluxo.exportar(projetos=[self.projeto.pk])
+        self.assertEqual(len(dados), 2)
+        r = fluxo.calcular(dados)
+        self.assertEqual(r['concluidas'].tolist(), [1])
+        self.assertEqual(len(fluxo.exportar(equipes=[self.equipe.pk + 1])), 0)
+
+        saida = io.StringIO()
+        call_command('fluxo_tarefas', stdout=saida)
+        self.assertIn('Team Alpha', saida.getvalue())
+        self.assertIn('2 transições, 1 equipe(s)', saida.getvalue())
+
+
+@override_settings(JOBS_EAGER=False)
+class PrazosTest(ProjetoBaseTest):
+    def setUp(self):
+        super().setUp()
+        ontem = date.today() - timedelta(days=1)
+        self.tarefa.prazofinal = ontem
+        self.tarefa.save()
+        self.sem_responsavel = Tarefas.objects.create(name='Solta', descricao='x', projetoparent=self.projeto,
+                                                      prazofinal=ontem)
+        self.feita = Tarefas.objects.create(name='Feita', descricao='x', projetoparent=self.projeto,
+                                            status='done', prazofinal=ontem)
+        self.em_dia = Tarefas.objects.create(name='Em dia', descricao='x', projetoparent=self.projeto,
+                                             prazofinal=date.today())
+        self.projeto.prazofinal = ontem
+        self.projeto.save()
+
+    def status(self, *objs):
+        return [type(obj).objects.get(pk=obj.pk).status for obj in objs]
+
+    def test_sweep_flips_expired_tasks_and_projects(self):
+        versao = get_equipe_version(self.equipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            contagens = prazos.varrer(batch_size=1)
+        self.assertEqual(contagens, {'tarefas_atrasadas': 2, 'tarefas_reabertas': 0,
+                                     'projetos_vencidos': 1, 'projetos_reabertos': 0})
+        self.assertEqual(self.status(self.tarefa, self.sem_responsavel, self.feita, self.em_dia),
+                         ['late', 'late', 'done', 'todo'])
+        self.assertEqual(self.status(self.projeto), ['overdue'])
+
+        # o que o save faria: transição, indicadores, auditoria e cache da equipe
+        c = TransicaoTarefa.CODIGOS
+        self.assertEqual(self.tarefa.transicoes.latest('em').de, c['doing'])
+        self.assertEqual(self.tarefa.transicoes.latest('em').para, c['late'])
+        self.assertEqual(indicadores.resumo(projeto_id=self.projeto.pk)['status'][3][2], 2)
+        incremental = snapshot_indicadores()
+        indicadores.recalcular()
+        self.assertEqual(incremental, snapshot_indicadores())
+        auditoria.flush()
+        self.assertTrue(AuditLog.objects.filter(action='projeto_vencido', onde=f'projeto:{self.projeto.pk}',
+                                                usuario__isnull=True).exists())
+        self.assertNotEqual(get_equipe_version(self.equipe.pk), versao)
+        avisos = Job.objects.filter(tipo='avisar_prazos')
+        self.assertEqual(avisos.count(), 3)     # um por lote
+
+        # segunda varredura não muda nada
+        self.assertEqual(sum(prazos.varrer().values()), 0)
+
+    def test_overdue_project_is_still_the_team_project(self):
+        prazos.varrer()
+        response = self.client.get(reverse('projetos_list') + '?status=overdue')
+        self.assertEqual([p.pk for p in response.context['projetos']], [self.projeto.pk])
+        filtro = str(response.context['projetos'].query).split(' WHERE ')[1].split(' ORDER BY ')[0]
+        self.assertNotIn('prazofinal', filtro)     # igualdade no status gravado, sem comparar datas
+        self.assertEqual(self.client.get(reverse('projetos_list') + '?status=active').context['projetos'].count(), 0)
+
+        response = self.client.get(reverse('equipes_detail', args=[self.equipe.pk]))
+        self.assertEqual(response.context['active_projeto'], self.projeto)
+        outro = Projetos(name='Outro', criador=self.lead, equipe=self.equipe, prazofinal=date.today())
+        with self.assertRaises(ValidationError):
+            outro.save()
+
+    def test_late_tasks_keep_their_dashboard_actions(self):
+        prazos.varrer()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual({t.pk for t in response.context['late_tasks']}, {self.tarefa.pk, self.sem_responsavel.pk})
+        self.assertContains(response, reverse('tarefas_report', args=[self.tarefa.pk]))
+        # tarefas_assign e tarefas_detail têm a mesma URL: o que conta é o form
+        self.assertContains(response, f'action="{reverse("tarefas_assign", args=[self.sem_responsavel.pk])}"')
+        self.assertNotContains(response, f'action="{reverse("tarefas_assign", args=[self.tarefa.pk])}"')
+        self.assertNotContains(response, reverse('tarefas_report', args=[self.sem_responsavel.pk]))
+
+    def test_extended_deadline_reopens(self):
+        prazos.varrer()
+        Tarefas.objects.filter(pk__in=[self.tarefa.pk, self.sem_responsavel.pk]).update(
+            prazofinal=date.today() + timedelta(days=3))
+        Projetos.objects.filter(pk=self.projeto.pk).update(prazofinal=date.today())
+
+        contagens = prazos.varrer()
+        self.assertEqual((contagens['tarefas_reabertas'], contagens['projetos_reabertos']), (2, 1))
+        self.assertEqual(self.status(self.tarefa, self.sem_responsavel, self.projeto), ['doing', 'todo', 'active'])
+
+    def test_reminders(self):
+        prazos.varrer()
+        self.assertEqual(jobs.run_pending(), 2)        # um job por lote: tarefas e projetos
+        assuntos = dict(Notificacao.objects.values_list('assunto', 'destinatario').order_by('assunto'))
+        self.assertEqual(assuntos, {'2 tarefa(s) com prazo vencido': 'lead@email.com',
+                                    'Projeto Atrasado: Projeto Alpha': 'lead@email.com'})
+        mensagem = Notificacao.objects.get(assunto__endswith='vencido').mensagem
+        self.assertIn('Tarefa Alpha (Projeto Alpha)', mensagem)
+        self.assertIn('Solta (Projeto Alpha)', mensagem)
+
+    def test_schedule_and_command(self):
+        agora = timezone.make_aware(datetime(2026, 5, 4, 13, 0))
+        self.assertEqual(prazos.proxima_execucao(agora), timezone.make_aware(datetime(2026, 5, 5, 0, 5)))
+        job = prazos.agendar()
+        self.assertEqual(prazos.agendar(), job)
+        self.assertEqual(Job.objects.filter(tipo='varrer_prazos').count(), 1)
+
+        # o job varre e se reagenda
+        Job.objects.filter(pk=job.pk).update(executar_em=timezone.now())
+        jobs.run_pending()
+        self.assertEqual(self.status(self.projeto), ['overdue'])
+        self.assertEqual(Job.objects.filter(tipo='varrer_prazos', status='pending').count(), 1)
+
+        Projetos.objects.filter(pk=self.projeto.pk).update(prazofinal=date.today() + timedelta(days=1))
+        saida = io.StringIO()
+        call_command('sweep_deadlines', '--hoje', (date.today() + timedelta(days=2)).isoformat(), stdout=saida)
+        self.assertEqual(self.status(self.projeto, self.em_dia), ['overdue', 'late'])
+        self.assertIn('mudança(s) de status', saida.getvalue())
+
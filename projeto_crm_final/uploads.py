@@ -0,0 +1,168 @@
+"""Upload de relatórios em partes, retomável.
+
+O cliente abre o upload (nome, tamanho, sha256), manda as partes com PUT +
+Content-Range e, se a conexão cair, pergunta quanto já chegou (GET) e continua dali.
+Cada parte é lida do request em blocos pequenos e gravada direto no arquivo
+temporário, então a memória por upload fica limitada ao tamanho do bloco. No fim o
+arquivo é conferido pelo SHA-256 e entregue ao storage pelo caminho (sem ler os bytes).
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.utils import timezone
+
+from projeto_crm_final.models import UploadParcial
+
+RELATORIO_TAMANHO_MAXIMO = 20 * 1024 * 1024
+BLOCO_LEITURA = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class ArquivoMontado(File):
+    """Arquivo já em disco: FileSystemStorage move em vez de copiar (temporary_file_path)"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class _Sha256Mixin:
+    """Calcula o SHA-256 enquanto o upload multipart é lido (arquivo.sha256), sem reler o arquivo"""
+
+    def new_file(self, *args, **kwargs):
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        resto = super().receive_data_chunk(raw_data, start)
+        if resto is None:   # este handler consumiu o bloco
+            self._sha256.update(raw_data)
+        return resto
+
+    def file_complete(self, file_size):
+        arquivo = super().file_complete(file_size)
+        if arquivo is not None:
+            arquivo.sha256 = self._sha256.hexdigest()
+        return arquivo
+
+
+class Sha256MemoryFileUploadHandler(_Sha256Mixin, MemoryFileUploadHandler):
+    pass
+
+
+class Sha256TemporaryFileUploadHandler(_Sha256Mixin, TemporaryFileUploadHandler):
+    pass
+
+
+def caminho(upload):
+    return os.path.join(settings.UPLOAD_TMP_DIR, f'{upload.pk}.part')
+
+
+def iniciar(integrante, nome_arquivo, tamanho, sha256):
+    if tamanho <= 0 or tamanho > RELATORIO_TAMANHO_MAXIMO:
+        raise ValidationError("O arquivo é muito grande (máx. 20MB)")
+    if not re.fullmatch(r'[0-9a-f]{64}', sha256 or ''):
+        raise ValidationError("SHA-256 inválido")
+    upload = UploadParcial.objects.create(
+        usuario=integrante,
+        nome_arquivo=os.path.basename(nome_arquivo)[:255],
+        tamanho=tamanho,
+        sha256=sha256,
+    )
+    os.makedirs(settings.UPLOAD_TMP_DIR, exist_ok=True)
+    open(caminho(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(header, tamanho):
+    """'bytes 0-1048575/5000000' -> (inicio, fim_exclusivo)"""
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        raise ValidationError("Content-Range inválido")
+    inicio, fim, total = (int(g) for g in match.groups())
+    if total != tamanho or fim < inicio or fim >= total:
+        raise ValidationError("Content-Range fora do arquivo")
+    if fim - inicio + 1 > settings.UPLOAD_CHUNK_SIZE:
+        raise ValidationError("Parte maior que UPLOAD_CHUNK_SIZE")
+    return inicio, fim + 1
+
+
+def gravar_parte(upload, inicio, fim, stream):
+    """Grava a parte [inicio, fim) lida de `stream` e devolve o total recebido.
+
+    Reenvio de uma parte já recebida é aceito (sobrescreve); pular bytes não.
+    """
+    if upload.concluido:
+        raise ValidationError("Upload já concluído")
+    if inicio > upload.recebido:
+        raise ValidationError(f"Esperado o byte {upload.recebido}")
+
+    restante = fim - inicio
+    with open(caminho(upload), 'r+b') as destino:
+        destino.truncate(inicio)
+        destino.seek(inicio)
+        while restante:
+            bloco = stream.read(min(BLOCO_LEITURA, restante))
+            if not bloco:
+                break
+            destino.write(bloco)
+            restante -= len(bloco)
+        recebido = destino.tell()
+
+    upload.recebido = recebido
+    if restante:
+        upload.save(update_fields=['recebido', 'atualizado'])
+        raise ValidationError("Parte incompleta")
+    if recebido == upload.tamanho:
+        verificar(upload)
+    upload.save(update_fields=['recebido', 'concluido', 'atualizado'])
+    return recebido
+
+
+def sha256_arquivo(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(BLOCO_LEITURA), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def verificar(upload):
+    if sha256_arquivo(caminho(upload)) != upload.sha256:
+        # recomeça do zero: não dá pra saber qual parte veio corrompida
+        upload.recebido = 0
+        open(caminho(upload), 'wb').close()
+        upload.save(update_fields=['recebido', 'atualizado'])
+        raise ValidationError("Checksum não confere, envie o arquivo novamente")
+    upload.concluido = True
+
+
+def arquivo_montado(upload):
+    """Arquivo aberto do upload concluído; use com `with` pra fechar depois de gravar"""
+    arquivo = ArquivoMontado(open(caminho(upload), 'rb'), name=upload.nome_arquivo)
+    arquivo.sha256 = upload.sha256
+    return arquivo
+
+
+def descartar(upload):
+    """Remove o registro e o temporário (se o storage copiou em vez de mover)"""
+    try:
+        os.remove(caminho(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def limpar_expirados(horas=None):
+    horas = settings.UPLOAD_EXPIRA_HORAS if horas is None else horas
+    limite = timezone.now() - timedelta(hours=horas)
+    expirados = list(UploadParcial.objects.filter(atualizado__lt=limite))
+    for upload in expirados:
+        descartar(upload)
+    return len(expirados)
@@ -1,6 +1,8 @@
-import csv
+import datetime
+import ipaddress
+import uuid
 
-import cloudinary
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash
@@ -10,20 +12,26 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
 from django.contrib.auth.views import PasswordResetCompleteView, PasswordResetConfirmView
 from django.core.exceptions import ValidationError
-from django.core.mail import EmailMessage
-from django.db import models
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponse, HttpResponseBadRequest
-from django.shortcuts import render, get_object_or_404, redirect
+from django.db import models, router
+from django.db.models import Count, Prefetch
+from django.db.models.functions import Upper
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponse, HttpResponseBadRequest, \
+    StreamingHttpResponse
+from django.shortcuts import render, get_object_or_404, redirect, aget_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.views import View
 from django.views.generic import TemplateView, CreateView, DetailView, ListView, DeleteView, UpdateView
 
-from projeto_crm_final.constants import CATEGORIA, PRIORIDADE, STATUS
+from projeto_crm_final import auditoria, blobs, exports, indicadores, jobs, uploads
+from projeto_crm_final.constants import CATEGORIA, PRIORIDADE, STATUS, STATUSPROJETO, HIERARCH, PROJETO_EM_ANDAMENTO
 from projeto_crm_final.forms import SignupForm, ProjetosForm, EquipesForm, ProfileForm, CredentialsForm, RelatorioForm, \
     TarefasForm, RelatorioTarefaForm
-from projeto_crm_final.mixins import LeadRequiredMixin, ProjetoOwnerMixin
-from projeto_crm_final.models import Integrantes, Projetos, Tarefas, Equipes
+from projeto_crm_final.middleware import integrante_para_escrita
+from projeto_crm_final.mixins import LeadRequiredMixin, ProjetoOwnerMixin, KeysetPaginationMixin, ReplicaReadMixin, \
+    AsyncLoginRequiredMixin, AdminRequiredMixin
+from projeto_crm_final.models import Integrantes, Projetos, Tarefas, Equipes, UploadParcial, AuditLog
 
 
 class HomeView(TemplateView):
@@ -50,17 +58,15 @@ class SignUpView(CreateView):
 
 @login_required
 def edit_profile(request):
-    # Editar profile de usuário
-    user = request.user
-    profile = request.user.integrantes
+    # Editar profile de usuário (relido do banco: o form salva o perfil inteiro)
+    profile = integrante_para_escrita(request)
 
     if request.method == 'POST':
         form = ProfileForm(request.POST, instance=profile)
         if form.is_valid():
             form.save()
             messages.success(request, "Perfil atualizado com sucesso!")
-            userprofile = Integrantes.objects.get(user=user)
-            return redirect('account_user_detail', person_id=userprofile.person_id)
+            return redirect('account_user_detail', person_id=profile.person_id)
     else:
         form = ProfileForm(instance=profile)
 
@@ -105,8 +111,7 @@ def edit_account_info(request):
             #Salva
             form.save()
             messages.success(request, "Informações da conta atualizadas com sucesso!")
-            profile = Integrantes.objects.get(user=user)
-            return redirect('account_user_detail', person_id=profile.person_id)
+            return redirect('account_user_detail', person_id=request.integrante.person_id)
     else:
         form = CredentialsForm(instance=user)
 
@@ -136,66 +141,141 @@ def change_password(request):
 
 
 #------------ Dashboard -----------
-class DashboardView(LoginRequiredMixin, TemplateView):
+def tarefas_do_kanban(projeto):
+    return Tarefas.objects.filter(projetoparent=projeto).select_related('responsavel')
+
+
+def separar_kanban(tarefas):
+    """Separa as tarefas do projeto em colunas por status (uma única consulta)"""
+    colunas = {status: [] for status, _ in STATUS}
+    for tarefa in tarefas:
+        colunas.setdefault(tarefa.status, []).append(tarefa)
+    return colunas
+
+
+async def montar_kanban(projeto):
+    return separar_kanban([tarefa async for tarefa in tarefas_do_kanban(projeto)])
+
+
+class DashboardContextMixin:
     template_name = 'projeto_crm_final/dashboard.html'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        user = self.request.user
+    def get_context_data(self, integrante, colunas=None):
+        """`colunas` é o kanban do projeto ativo do integrante (None se não houver)"""
+        context = {'view': self}
 
-        try:
-            integrante = Integrantes.objects.get(user=user)
+        if integrante:
             context['integrante'] = integrante
 
             if integrante.equipe:
                 context['equipe'] = integrante.equipe
 
-                active_projeto = Projetos.objects.filter(       #pega projeto ativo
-                    equipe=integrante.equipe,
-                    status='active'
-                ).first()
+                active_projeto = integrante.active_projeto      #pega projeto ativo
 
                 if active_projeto:
                     context['active_projeto'] = active_projeto
-                    context['todo_tasks'] = Tarefas.objects.filter(
-                        projetoparent=active_projeto,
-                        status='todo'
-                    )
-                    context['doing_tasks'] = Tarefas.objects.filter(
-                        projetoparent=active_projeto,
-                        status='doing'
-                    )
-                    context['done_tasks'] = Tarefas.objects.filter(
-                        projetoparent=active_projeto,
-                        status='done'
-                    )
+                    for status, tarefas in colunas.items():
+                        context[f'{status}_tasks'] = tarefas
+                    context['kanban_counts'] = {status: len(tarefas) for status, tarefas in colunas.items()}
                 else:
                     context['active_projeto'] = None
             else:
                 context['no_team'] = True
 
-        except Integrantes.DoesNotExist:
+        else:
             context['no_profile'] = True
-
         return context
 
+    @staticmethod
+    def projeto_do_kanban(integrante):
+        return integrante.active_projeto if integrante and integrante.equipe else None
+
+
+class DashboardView(DashboardContextMixin, LoginRequiredMixin, View):
+    """Dashboard síncrono, pro WSGI; no ASGI a rota usa DashboardAsyncView (config/urls.py).
+
+    O mesmo código async no WSGI passaria por async_to_sync a cada request e fica mais lento.
+    """
+
+    def get(self, request, *args, **kwargs):
+        integrante = request.integrante
+        projeto = self.projeto_do_kanban(integrante)
+        colunas = separar_kanban(tarefas_do_kanban(projeto)) if projeto else None
+        return render(request, self.template_name, self.get_context_data(integrante, colunas))
+
+
+class DashboardAsyncView(DashboardContextMixin, AsyncLoginRequiredMixin, View):
+    async def get(self, request, *args, **kwargs):
+        integrante = request.integrante     # já carregado pelo AsyncLoginRequiredMixin
+        projeto = self.projeto_do_kanban(integrante)
+        colunas = await montar_kanban(projeto) if projeto else None
+        context = self.get_context_data(integrante, colunas)
+        # template e context processors usam ORM síncrono: renderiza numa thread
+        return await sync_to_async(render)(request, self.template_name, context)
+
 # ------- Tarefas - porque deixei aqui e nao no fim?! ----------
 class TarefasAssign(View):
     def post(self, request, task_id):
-        integrante = Integrantes.objects.get(user=request.user)
+        integrante = request.integrante
         task = Tarefas.objects.get(id=task_id)
         task.responsavel = integrante
         task.status = 'doing'
         task.save()
+        auditoria.registrar(request, 'tarefa_assumida', f'tarefa:{task.pk}')
         return redirect('dashboard')
 
 
 #---Integrantes
 
-class IntegrantesListaView(LoginRequiredMixin, ListView):
+def faixa_do_prefixo(campo, prefixo):
+    """Filtro `campo` começando com `prefixo` como faixa [prefixo, próximo) que usa índice b-tree.
+
+    Sem limite superior quando o último caractere é o maior do Unicode (U+10FFFF não tem próximo).
+    """
+    filtro = {f'{campo}__gte': prefixo, f'{campo}__startswith': prefixo}
+    if ord(prefixo[-1]) < 0x10FFFF:
+        filtro[f'{campo}__lt'] = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    return filtro
+
+
+class IntegrantesListaView(ReplicaReadMixin, LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Integrantes
     template_name = "admin/integ_list.html"
     context_object_name = 'integrantes'
+    paginate_by = 50
+    keyset_ordering = ('nome', 'person_id')
+
+    def get_queryset(self):
+        queryset = Integrantes.objects.select_related('user', 'equipe')
+
+        role = self.request.GET.get('role')
+        equipe = self.request.GET.get('equipe')
+        cargo = self.request.GET.get('cargo')
+        busca = self.request.GET.get('q', '').strip()
+
+        if role:
+            queryset = queryset.filter(role=role)
+        if equipe:
+            queryset = queryset.filter(equipe_id=equipe) if equipe.isdigit() else queryset.none()
+        if cargo:
+            queryset = queryset.filter(cargo=cargo)
+        if busca:
+            # Faixa [BUSCA, BUSCB) em UPPER(nome) usa o índice integ_nome_upper_idx,
+            # ao contrário de icontains/istartswith que varrem a tabela
+            queryset = queryset.annotate(nome_upper=Upper('nome')).filter(
+                **faixa_do_prefixo('nome_upper', busca.upper())
+            )
+        return queryset.order_by(*self.keyset_ordering)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['roles'] = HIERARCH
+        context['equipes'] = Equipes.objects.order_by('name').values_list('id', 'name')
+        context['current_role'] = self.request.GET.get('role', '')
+        context['current_equipe'] = self.request.GET.get('equipe', '')
+        context['current_cargo'] = self.request.GET.get('cargo', '')
+        context['current_q'] = self.request.GET.get('q', '')
+        return context
 
 
 class IntegrantesGetView(LoginRequiredMixin, DetailView):
@@ -211,7 +291,7 @@ class IntegrantesGetView(LoginRequiredMixin, DetailView):
         if perfil.equipe:
             context['active_project'] = Projetos.objects.filter(
                 equipe=perfil.equipe,
-                status='active'
+                status__in=PROJETO_EM_ANDAMENTO
             ).first()
         else:
             context['active_project'] = None
@@ -227,6 +307,7 @@ class UpdateRoleView(LoginRequiredMixin, View):
             integrante = Integrantes.objects.get(person_id=user_id)
             integrante.role = new_role
             integrante.save()
+            auditoria.registrar(request, f'role:{new_role}', f'integrante:{integrante.pk}')
             return JsonResponse({'status': 'success', 'new_role': integrante.get_role_display()})
         except Integrantes.DoesNotExist:
             return JsonResponse({'status': 'error', 'message': 'User not found'}, status=404)
@@ -234,21 +315,30 @@ class UpdateRoleView(LoginRequiredMixin, View):
 
 #--------------- EQUIPES
 
-class EquipesView(LoginRequiredMixin, ListView):
+class EquipesView(ReplicaReadMixin, LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Equipes
     template_name = 'projeto_crm_final/equipes_list.html'
     context_object_name = 'equipes'
+    paginate_by = 20
+    keyset_ordering = ('name', 'id')
+
+    def get_queryset(self):
+        # contagem de membros, lider e projeto ativo já vêm junto - sem consulta por equipe
+        return Equipes.objects.select_related('leader__user').annotate(
+            num_membros=Count('membros', distinct=True)
+        ).prefetch_related(
+            Prefetch('projetos_set', queryset=Projetos.objects.filter(status__in=PROJETO_EM_ANDAMENTO),
+                     to_attr='projetos_ativos')
+        ).order_by(*self.keyset_ordering)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        equipes = Equipes.objects.all()
 
         # pega o time do usuario atual
         user_team = None
-        if self.request.user.is_authenticated and hasattr(self.request.user, 'integrantes'):
-            user_team = self.request.user.integrantes.equipe
+        if self.request.integrante:
+            user_team = self.request.integrante.equipe
 
-        context['equipes'] = equipes
         context['user_team'] = user_team
 
         return context
@@ -267,7 +357,7 @@ class EquipesCreateView(LoginRequiredMixin, CreateView):
 
     def dispatch(self, request, *args, **kwargs):
         # Qm já tem uma equipe nao pode criar uma nova
-        if hasattr(request.user, 'integrantes') and request.user.integrantes.equipe:
+        if request.integrante and request.integrante.equipe:
             messages.warning(
                 request,
                 "Você já faz parte de uma equipe. Saia da sua equipe atual para criar uma nova."
@@ -277,7 +367,7 @@ class EquipesCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         try:
-            integrante = self.request.user.integrantes   #instancia o criador
+            integrante = integrante_para_escrita(self.request)   #instancia o criador (do banco, vai ser salvo)
             if integrante.equipe:                       #garante que usuario nao tem time
                 messages.error(
                     self.request,
@@ -307,7 +397,7 @@ class EquipesCreateView(LoginRequiredMixin, CreateView):
 
 class EquipesLeaveView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
-        integrante = request.user.integrantes
+        integrante = integrante_para_escrita(request)      # do banco, vai ser salvo
 
         #Lider deve passar liderança antes de sair
         if integrante.role == 'LEAD':
@@ -346,7 +436,7 @@ class EquipesUpdateView(LoginRequiredMixin, LeadRequiredMixin, UpdateView):
     def dispatch(self, request, *args, **kwargs):
         # permissão para leads e admin
         equipe = self.get_object()
-        if request.user != equipe.leader.user and request.user.integrantes.role != 'ADMIN':
+        if request.user != equipe.leader.user and request.integrante.role != 'ADMIN':
             messages.error(request, "Você não tem permissão para editar esta equipe.")
             return redirect('equipes_detail', equipe_id=equipe.id)
         return super().dispatch(request, *args, **kwargs)
@@ -367,25 +457,31 @@ class EquipesGetView(LoginRequiredMixin, DetailView):
     context_object_name = "equipe"
     pk_url_kwarg = "equipe_id"
 
+    def get_queryset(self):
+        # líder e membros (com o usuário, pro e-mail nos cards) já carregados pro template
+        return Equipes.objects.select_related('leader__user').prefetch_related(
+            Prefetch('membros', queryset=Integrantes.objects.select_related('user'))
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        equipe = self.get_object()
+        equipe = self.object
 
         # Projetos ativos nesta equipe
         context['active_projeto'] = Projetos.objects.filter(
             equipe=equipe,
-            status='active'
+            status__in=PROJETO_EM_ANDAMENTO
         ).first()
 
         # Projetos disponíveis
         context['available_projetos'] = Projetos.objects.filter(
-            status='active'
+            status__in=PROJETO_EM_ANDAMENTO
         ).filter(
             models.Q(equipe__isnull=True) | models.Q(equipe=equipe)
         ).exclude(pk=context['active_projeto'].pk if context['active_projeto'] else None)
 
         #membros disponíveis para entrar na eequipe
-        current_members_ids = equipe.membros.all().values_list('person_id', flat=True)
+        current_members_ids = [membro.pk for membro in equipe.membros.all()]
         context['available_integrantes'] = Integrantes.objects.exclude(
             person_id__in=current_members_ids
         ).filter(
@@ -394,71 +490,52 @@ class EquipesGetView(LoginRequiredMixin, DetailView):
 
         return context
 
-    def post(self, request, *args, **kwargs):
-        equipe = self.get_object()
-        active_projeto = equipe.projetos_set.filter(status='active').first()
+
+class EquipesConcluirView(AsyncLoginRequiredMixin, View):
+    """Conclui o projeto ativo da equipe com o relatório final"""
+
+    async def post(self, request, equipe_id):
+        equipe = await aget_object_or_404(Equipes, pk=equipe_id)
+        active_projeto = await equipe.projetos_set.filter(status__in=PROJETO_EM_ANDAMENTO).afirst()
 
         if not active_projeto:
             messages.error(request,"Nenhum projeto ativo sendo trabalhado por essa equipe")
             return redirect('equipes_detail', equipe_id=equipe.id)
 
-        form = RelatorioForm(request.POST, request.FILES)
-
-        if form.is_valid():
-            # Salva o relatório
-            relatorio = form.save(commit=False)
-            relatorio.projeto = active_projeto
-            relatorio.enviado_por = request.user.integrantes
-            relatorio.save()
-
-            #Upload pro Cloudinary
-            file = relatorio.arquivo
-            date_prefix = timezone.now().strftime('%Y_%m_%d')
-            filename = f'{date_prefix}_relatorio_{active_projeto.name}'
-
-            upload_result = cloudinary.uploader.upload(
-                file=file,
-                asset_folder='relatorios',
-                public_id=filename,
-                override=True,
-                resource_type="raw"
-            )
-
-            # Atualiza status do Projeto e da equipe
-            active_projeto.status = 'done'
-            active_projeto.save()
-
-            # Email de todos do time
-            team_members = active_projeto.equipe.membros.all()
-            emails = [membro.user.email for membro in team_members]
-
-            # Prepara e manda o e-mail
-            subject = f'Projeto {active_projeto.name} Concluído'
-            message = f'''
-            Parabéns à equipe {equipe.name}!
-            O projeto "{active_projeto.name}" foi concluído pelo líder da equipe.
-            
-            Descrição do projeto:
-            {active_projeto.descricao}
-
-            Relatório disponível em: {upload_result['secure_url']}
-            '''
-
-            email = EmailMessage(
-                subject,
-                message,
-                request.user.email,  # do usuario atual
-                emails,  # pra todos os membros da equipe
-                [settings.EMAIL_HOST_USER],  # BCC pro system
-            )
-            email.send()
+        # parse do multipart (grava o arquivo em disco) fora do event loop
+        data, files = await sync_to_async(lambda: (request.POST, request.FILES))()
+        form = RelatorioForm(data, files, integrante=request.integrante)
 
+        if await sync_to_async(form.is_valid)():
+            await sync_to_async(self.concluir)(form, active_projeto, request.integrante)
             messages.success(request, 'Projeto concluído com sucesso e relatório enviado!')
             return redirect('equipes_detail', equipe_id=equipe.id)
 
-        context = self.get_context_data()
+        return await sync_to_async(self.form_invalid)(request, form, equipe_id)
+
+    def concluir(self, form, active_projeto, integrante):
+        # Salva o relatório
+        relatorio = form.save(commit=False)
+        relatorio.projeto = active_projeto
+        relatorio.enviado_por = integrante
+        with form.arquivo_enviado() as arquivo:
+            blobs.anexar(relatorio, arquivo)
+        if form.upload:
+            uploads.descartar(form.upload)
+
+        # Upload pro Cloudinary e e-mail pra equipe rodam em background (manage.py run_workers)
+        jobs.enqueue('upload_relatorio_projeto', relatorio_id=relatorio.pk)
+
+        # Atualiza status do Projeto e da equipe
+        active_projeto.status = 'done'
+        active_projeto.save()
+
+    def form_invalid(self, request, form, equipe_id):
+        detalhe = EquipesGetView(request=request, args=(), kwargs={'equipe_id': equipe_id})
+        detalhe.object = detalhe.get_object()
+        context = detalhe.get_context_data(object=detalhe.object)
         context['form'] = form
-        return render(request, self.template_name, context)
+        return render(request, detalhe.template_name, context)
 
 def equipes_remove_member(request, equipe_id, member_id):
     equipe = get_object_or_404(Equipes, pk=equipe_id)
@@ -466,7 +543,7 @@ def equipes_remove_member(request, equipe_id, member_id):
 
     # Verifica permissão
     if not (request.user == equipe.leader.user or
-            request.user.integrantes.role == 'ADMIN'):
+            request.integrante.role == 'ADMIN'):
         return HttpResponseForbidden("Sem permissão para esta ação")
 
     # Lideres não podem ser removidos
@@ -475,6 +552,7 @@ def equipes_remove_member(request, equipe_id, member_id):
 
     # kick member
     equipe.remove_member(member)
+    auditoria.registrar(request, 'membro_removido', f'equipe:{equipe.pk} integrante:{member.pk}')
 
     messages.success(request, f"{member.nome} removido da equipe com sucesso!")
     return redirect('equipes_detail', equipe_id=equipe_id)
@@ -497,7 +575,7 @@ def assign_project(request, equipe_id):
             try:
                 existing_active = Projetos.objects.filter(
                     equipe = equipe,
-                    status = 'active'
+                    status__in = PROJETO_EM_ANDAMENTO
                 ).first()
 
                 if existing_active:
@@ -506,6 +584,7 @@ def assign_project(request, equipe_id):
 
                 projeto.equipe = equipe
                 projeto.save()
+                auditoria.registrar(request, 'projeto_atribuido', f'equipe:{equipe.pk} projeto:{projeto.pk}')
                 messages.success(request, f"Projeto '{projeto.name}' atribuído à equipe!")
             except ValidationError as e:
                 messages.error(request, e.message)
@@ -528,6 +607,7 @@ def remove_project(request, equipe_id):
             projeto = get_object_or_404(Projetos, pk=projeto_id)
             projeto.equipe = None
             projeto.save()
+            auditoria.registrar(request, 'projeto_removido', f'equipe:{equipe.pk} projeto:{projeto.pk}')
             messages.success(request, f"Projeto '{projeto.name}' removido da equipe.")
 
     return redirect('equipes_detail', equipe_id=equipe_id)
@@ -540,12 +620,13 @@ def equipes_invite(request, equipe_id):
     if request.method == 'POST':
         integrante_id = request.POST.get('integrante_id')
 
-        if not (request.user == equipe.leader.user or request.user.integrantes.role == 'ADMIN'):
+        if not (request.user == equipe.leader.user or request.integrante.role == 'ADMIN'):
             return HttpResponseForbidden("Permissão negada")
 
         try:
             integrante = Integrantes.objects.get(person_id=integrante_id)
             equipe.add_member(integrante)
+            auditoria.registrar(request, 'membro_convidado', f'equipe:{equipe.pk} integrante:{integrante.pk}')
             messages.success(request, f"{integrante.nome} foi adicionado à equipe!")
         except Integrantes.DoesNotExist:
             messages.error(request, "Integrante não encontrado")
@@ -560,7 +641,7 @@ class EquipesDeleteView(LoginRequiredMixin, LeadRequiredMixin, DeleteView):
     def dispatch(self, request, *args, **kwargs):
         # permissao para lider da equipe e admin
         equipe = self.get_object()
-        if request.user != equipe.leader.user and request.user.integrantes.role != 'ADMIN':
+        if request.user != equipe.leader.user and request.integrante.role != 'ADMIN':
             messages.error(request, "Você não tem permissão para excluir esta equipe.")
             return redirect('equipes_detail', equipe_id=equipe.id)
         return super().dispatch(request, *args, **kwargs)
@@ -578,7 +659,7 @@ class EquipesDeleteView(LoginRequiredMixin, LeadRequiredMixin, DeleteView):
 
 #--------------- PROJETOS
 
-class ProjetosView(LoginRequiredMixin, ListView):
+class ProjetosView(ReplicaReadMixin, LoginRequiredMixin, ListView):
     model= Projetos
     template_name='projeto_crm_final/projetos_list.html'
     context_object_name= 'projetos'
@@ -590,37 +671,24 @@ class ProjetosView(LoginRequiredMixin, ListView):
         prioridade = self.request.GET.get('prioridade')
         queryset = Projetos.objects.all()
 
-        #filtro de status
-        hoje = timezone.now().date()
-        if status == 'active':
-            queryset = queryset.filter(status='active')
-        elif status == 'canceled':
-            queryset = queryset.filter(status='canceled')
-        elif status == 'overdue':
-            queryset = queryset.filter(
-                status='active',
-                prazofinal__lt=hoje
-            )
-        elif status == 'done':
-            queryset = queryset.filter(status='done')
+        #filtro de status ('overdue' é gravado pela varredura de prazos, manage.py sweep_deadlines)
+        if status in dict(STATUSPROJETO):
+            queryset = queryset.filter(status=status)
 
         #Filtros adicionais (acumulativos)
         if categoria:
             queryset = queryset.filter(categoria=categoria)
         if prioridade:
             queryset = queryset.filter(prioridade=prioridade)
-        return queryset.order_by('-inicio')
+        return queryset.select_related('equipe').order_by('-inicio')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Checagem para criação de novos projetos
         context['can_create'] = False
-        if self.request.user.is_authenticated:
-            try:
-                integrante = Integrantes.objects.get(user=self.request.user)
-                context['can_create'] = integrante.role in ['ADMIN', 'LEAD']
-            except Integrantes.DoesNotExist:
-                pass
+        integrante = self.request.integrante
+        if integrante:
+            context['can_create'] = integrante.role in ['ADMIN', 'LEAD']
 
         context['categorias'] = CATEGORIA
         context['prioridades'] = PRIORIDADE
@@ -653,7 +721,7 @@ class ProjetosCreateView(LoginRequiredMixin, LeadRequiredMixin, CreateView):
     success_url = reverse_lazy('projetos_list')
 
     def form_valid(self, form):                    #associa o projeto ao seu criador?
-        integrante = Integrantes.objects.get(user=self.request.user)
+        integrante = self.request.integrante
         form.instance.criador = integrante
         form.instance.user = self.request.user
         return super().form_valid(form)
@@ -664,26 +732,30 @@ class ProjetosUpdateView(LoginRequiredMixin, LeadRequiredMixin, ProjetoOwnerMixi
     template_name = 'projeto_crm_final/projetos_form.html'
     success_url = reverse_lazy('projetos_list')
 
-class ProjetosGetView(LoginRequiredMixin, DetailView):
+class ProjetosGetView(ReplicaReadMixin, LoginRequiredMixin, DetailView):
     model = Projetos
     template_name = "projeto_crm_final/projetos_detail.html"
     context_object_name = "projeto"
     pk_url_kwarg = "projeto_id"
 
+    def get_queryset(self):
+        # membros da equipe aparecem nos selects de responsável do template
+        return Projetos.objects.select_related('criador', 'equipe').prefetch_related('equipe__membros')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        projeto = self.get_object()
+        projeto = self.object
         context["tarefas"] = None
         context["can_create"] = False
         context["user_is_equipe"] = False
 
         if self.request.user.is_authenticated:
-            integrante = self.request.user.integrantes
+            integrante = self.request.integrante
 
             # user é da equipe?
-            if projeto.equipe and integrante in projeto.equipe.membros.all():
+            if projeto.equipe and integrante in projeto.equipe.membros.all():    # já prefetched
                 context["user_is_equipe"] = True
-                context["tarefas"] = projeto.tarefas_do_projeto.all().order_by("prazofinal")
+                context["tarefas"] = projeto.tarefas_do_projeto.select_related('responsavel').order_by("prazofinal")
 
                 # checa se usuario pode criar tareefas
                 if integrante == projeto.criador or integrante.role == "ADMIN":
@@ -692,12 +764,47 @@ class ProjetosGetView(LoginRequiredMixin, DetailView):
             # sempree permite admin ver tarefas mesmo se nao for da equipe
             elif integrante == projeto.criador or integrante.role == "ADMIN":
                 context["user_is_equipe"] = True
-                context["tarefas"] = projeto.tarefas_do_projeto.all().order_by("prazofinal")
+                context["tarefas"] = projeto.tarefas_do_projeto.select_related('responsavel').order_by("prazofinal")
                 context["can_create"] = True
 
         context["PRIORIDADE"] = PRIORIDADE
         return context
 
+class IndicadoresView(ReplicaReadMixin, LoginRequiredMixin, View):
+    """Indicadores da equipe (/equipes/<id>/indicadores/) ou do projeto (/projetos/<id>/indicadores/).
+
+    Lê só as linhas diárias de IndicadorDiario (ver indicadores.py), nunca as tarefas.
+    Membros da equipe, o criador do projeto e ADMIN podem ver; ?dias= de 7 a 365.
+    """
+    template_name = 'projeto_crm_final/indicadores.html'
+
+    def get(self, request, equipe_id=None, projeto_id=None):
+        integrante = request.integrante
+        if not integrante:
+            return HttpResponseForbidden("Sem permissão para ver estes indicadores")
+        if projeto_id:
+            projeto = get_object_or_404(Projetos.objects.select_related('equipe'), pk=projeto_id)
+            equipe = projeto.equipe
+            permitido = projeto.criador_id == integrante.pk or (
+                projeto.equipe_id is not None and projeto.equipe_id == integrante.equipe_id)
+        else:
+            projeto = None
+            equipe = get_object_or_404(Equipes, pk=equipe_id)
+            permitido = equipe.pk == integrante.equipe_id or equipe.leader_id == integrante.pk
+        if not (permitido or integrante.role == 'ADMIN'):
+            return HttpResponseForbidden("Sem permissão para ver estes indicadores")
+
+        try:
+            dias = min(max(int(request.GET.get('dias', 30)), 7), 365)
+        except ValueError:
+            dias = 30
+        dados = indicadores.resumo(equipe_id=None if projeto else equipe.pk, projeto_id=projeto_id, dias=dias)
+        dados['maior_vazao'] = max([max(criadas, concluidas) for _, criadas, concluidas in dados['vazao']] + [1])
+        return render(request, self.template_name, {
+            'equipe': equipe, 'projeto': projeto, 'dias': dias, 'periodos': (7, 30, 90, 365), **dados,
+        })
+
+
 class ProjetosDeleteView(LoginRequiredMixin,LeadRequiredMixin, ProjetoOwnerMixin, DeleteView):
     model = Projetos
     template_name = 'projeto_crm_final/projetos_confirm_del.html'
@@ -726,14 +833,14 @@ class TarefasCreateView(LoginRequiredMixin, CreateView):
             return redirect("projetos_detail", projeto_id=self.projeto.pk)
 
         # Confere se usuario é parte do time que trabalha com o projeto
-        user_team = request.user.integrantes.equipe
+        user_team = request.integrante.equipe
         if not user_team or user_team != self.projeto.equipe:
             messages.error(request, "Você não faz parte da equipe deste projeto.")
             return redirect("projetos_detail", projeto_id=self.projeto.pk)
 
         # Checa se usuario criou a tarefa OU se é ADMIN
-        if not (request.user.integrantes == self.projeto.criador or
-                request.user.integrantes.role == "ADMIN"):
+        if not (request.integrante == self.projeto.criador or
+                request.integrante.role == "ADMIN"):
             messages.error(request, "Você não tem permissão para criar tarefas para este projeto.")
             return redirect("projetos_detail", projeto_id=self.projeto.pk)
 
@@ -751,6 +858,7 @@ class TarefasCreateView(LoginRequiredMixin, CreateView):
         if tarefa.responsavel:
             tarefa.status = 'doing'
         tarefa.save()
+        auditoria.registrar(self.request, 'tarefa_criada', f'tarefa:{tarefa.pk}')
         messages.success(self.request, "Tarefa criada com sucesso!")
         return redirect("projetos_detail", projeto_id=self.projeto.pk)
 
@@ -770,7 +878,7 @@ class TarefasUpdateView(LoginRequiredMixin, UpdateView):
         self.tarefa = self.get_object()
         self.projeto = self.tarefa.projetoparent
         #permissão especial, igual o view de criar
-        if not (request.user.integrantes == self.projeto.criador or request.user.integrantes == self.tarefa.responsavel or request.user.integrantes.role == "ADMIN"):
+        if not (request.integrante == self.projeto.criador or request.integrante == self.tarefa.responsavel or request.integrante.role == "ADMIN"):
             messages.error(request, "Você não tem permissão para editar esta tarefa.")
             return redirect("projetos_detail", projeto_id=self.projeto.pk)
         return super().dispatch(request, *args, **kwargs)
@@ -787,6 +895,7 @@ class TarefasUpdateView(LoginRequiredMixin, UpdateView):
         else:
             tarefa.status = 'todo'
         tarefa.save()
+        auditoria.registrar(self.request, 'tarefa_editada', f'tarefa:{tarefa.pk}')
         messages.success(self.request, "Tarefa atualizada com sucesso!")
         return redirect("projetos_detail", projeto_id=self.projeto.pk)
 
@@ -805,11 +914,15 @@ class TarefasDeleteView(LoginRequiredMixin, DeleteView):
         self.tarefa = self.get_object()
         self.projeto = self.tarefa.projetoparent
         # Permissão
-        if not (request.user.integrantes == self.projeto.criador or request.user.integrantes.role == "ADMIN"):
+        if not (request.integrante == self.projeto.criador or request.integrante.role == "ADMIN"):
             messages.error(request, "Você não tem permissão para excluir esta tarefa.")
             return redirect("projetos_detail", projeto_id=self.projeto.pk)
         return super().dispatch(request, *args, **kwargs)
 
+    def form_valid(self, form):
+        auditoria.registrar(self.request, 'tarefa_excluida', f'tarefa:{self.object.pk}')
+        return super().form_valid(form)
+
     def get_success_url(self):
         messages.success(self.request, "Tarefa excluída com sucesso!")
         return reverse("projetos_detail", kwargs={"projeto_id": self.projeto.pk})
@@ -840,153 +953,261 @@ class TarefasDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class TarefasReportView(LoginRequiredMixin, View):
+class TarefasReportView(AsyncLoginRequiredMixin, View):
     template_name = 'projeto_crm_final/tarefas_report.html'
 
-    def get(self, request, task_id):
-        task = get_object_or_404(Tarefas, id=task_id)
+    async def get(self, request, task_id):
+        task = await aget_object_or_404(Tarefas, id=task_id)
 
         # Responsavel pela tarefa
-        if task.responsavel.user != request.user:
+        if task.responsavel_id != request.integrante.pk:
             messages.error(request, "Você não é o responsável por esta tarefa.")
             return redirect('dashboard')
 
         form = RelatorioTarefaForm()
-        return render(request, self.template_name, {
+        return await sync_to_async(render)(request, self.template_name, {
             'task': task,
             'form': form
         })
 
-    def post(self, request, task_id):
-        task = get_object_or_404(Tarefas, id=task_id)
-        integrante = request.user.integrantes
+    async def post(self, request, task_id):
+        task = await aget_object_or_404(Tarefas, id=task_id)
+        integrante = request.integrante
 
         # Responsavel pela tarefa de novo!
-        if task.responsavel != integrante:
+        if task.responsavel_id != integrante.pk:
             messages.error(request, "Você não é o responsável por esta tarefa.")
             return redirect('dashboard')
 
-        form = RelatorioTarefaForm(request.POST, request.FILES)
+        # parse do multipart (grava o arquivo em disco) fora do event loop
+        data, files = await sync_to_async(lambda: (request.POST, request.FILES))()
+        form = RelatorioTarefaForm(data, files, integrante=integrante)
 
-        if form.is_valid():
-            # Salva o relatorio
-            relatorio = form.save(commit=False)
-            relatorio.tarefa = task
-            relatorio.enviado_por = integrante
-            relatorio.save()
-
-            # Manda pro cloud
-            file = relatorio.arquivo
-            date_prefix = timezone.now().strftime('%Y_%m_%d')
-            filename = f'{date_prefix}_relatorio_{task.id}_{task.name[:20]}'
+        if await sync_to_async(form.is_valid)():
+            await sync_to_async(self.concluir)(form, task, integrante)
+            await sync_to_async(auditoria.registrar)(request, 'tarefa_concluida', f'tarefa:{task.pk}')
+            messages.success(request, 'Tarefa concluída e relatório enviado com sucesso!')
+            return redirect('dashboard')
 
-            try:
-                upload_result = cloudinary.uploader.upload(
-                    file=file,
-                    asset_folder='relatorios_tarefas',
-                    public_id=filename,
-                    override=True,
-                    resource_type="raw"
-                )
-                # URL
-                relatorio.cloudinary_url = upload_result['secure_url']
-                relatorio.save()
-            except Exception as e:      #debugg
-                messages.warning(request, f"Arquivo salvo localmente. Erro no Cloudinary: {str(e)}")
+        return await sync_to_async(render)(request, self.template_name, {
+            'task': task,
+            'form': form
+        })
 
-            # Salva
-            task.status = 'done'
-            task.save()
+    def concluir(self, form, task, integrante):
+        # Salva o relatorio
+        relatorio = form.save(commit=False)
+        relatorio.tarefa = task
+        relatorio.enviado_por = integrante
+        with form.arquivo_enviado() as arquivo:
+            blobs.anexar(relatorio, arquivo)
+        if form.upload:
+            uploads.descartar(form.upload)
+
+        # Upload pro Cloudinary e e-mail pra equipe rodam em background (manage.py run_workers)
+        jobs.enqueue('upload_relatorio_tarefa', relatorio_id=relatorio.pk)
+
+        # Salva
+        task.status = 'done'
+        task.save()
 
-            # Membros da e quipe
-            team_members = task.projetoparent.equipe.membros.all()
-            emails = [membro.user.email for membro in team_members if membro.user.email]
 
-            # manda email pra todos
-            if emails:
-                subject = f'Tarefa Concluída: {task.name}'
-                message = f'''
-                A tarefa "{task.name}" foi concluída por {integrante.nome}.
+class UploadIniciarView(LoginRequiredMixin, View):
+    """Abre um upload em partes: POST nome, tamanho (bytes) e sha256 do arquivo"""
 
-                Descrição da tarefa:
-                {task.descricao}
+    def post(self, request):
+        try:
+            upload = uploads.iniciar(
+                request.integrante,
+                request.POST.get('nome', ''),
+                int(request.POST.get('tamanho', 0)),
+                request.POST.get('sha256', '').lower(),
+            )
+        except (ValueError, ValidationError) as e:
+            return JsonResponse({'error': ' '.join(getattr(e, 'messages', [str(e)]))}, status=400)
+        return JsonResponse({
+            'id': str(upload.pk),
+            'recebido': 0,
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+            'url': reverse('uploads_parte', args=[upload.pk]),
+        }, status=201)
 
-                Relatório:
-                {relatorio.descricao}
 
-                Arquivo do relatório: {relatorio.arquivo.url}
-                '''
+class UploadParteView(LoginRequiredMixin, View):
+    """GET mostra quanto já chegou (pra retomar); PUT com Content-Range grava uma parte"""
 
-                try:
-                    email = EmailMessage(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        emails,
-                        [settings.EMAIL_HOST_USER],
-                    )
-                    if hasattr(relatorio, 'cloudinary_url'):
-                        email.body += f"\nLink Cloudinary: {relatorio.cloudinary_url}"
-                    email.send()
-                except Exception as e:
-                    messages.warning(request, f"Relatório salvo, mas e-mail não enviado: {str(e)}")
+    def get_upload(self, request, upload_id):
+        return get_object_or_404(UploadParcial, pk=upload_id, usuario=request.integrante)
 
-            messages.success(request, 'Tarefa concluída e relatório enviado com sucesso!')
-            return redirect('dashboard')
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        return JsonResponse({'recebido': upload.recebido, 'tamanho': upload.tamanho, 'concluido': upload.concluido})
 
-        return render(request, self.template_name, {
-            'task': task,
-            'form': form
-        })
+    def put(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        try:
+            inicio, fim = uploads.parse_content_range(request.headers.get('Content-Range'), upload.tamanho)
+            # lê direto do stream do request; nunca monta request.body em memória
+            recebido = uploads.gravar_parte(upload, inicio, fim, request)
+        except ValidationError as e:
+            return JsonResponse({'error': ' '.join(e.messages), 'recebido': upload.recebido}, status=409)
+        return JsonResponse({'recebido': recebido, 'concluido': upload.concluido})
+
+
+class TarefasExportCSSView(ReplicaReadMixin, LoginRequiredMixin, LeadRequiredMixin, View):
+    """Exporta tarefas em CSV, NDJSON ou XLSX via streaming.
+
+    /projetos/<id>/export-tasks/ exporta um projeto; /tarefas/exportar/ aceita os filtros
+    projeto, equipe, status (repetível), prazo_de e prazo_ate (AAAA-MM-DD).
+    """
+
+    def get(self, request, projeto_id=None, *args, **kwargs):
+        integrante = request.integrante
+        formato = request.GET.get('formato', 'csv')
+        if formato not in exports.FORMATOS:
+            return HttpResponseBadRequest("Formato inválido")
+
+        filtros = {
+            'projeto': projeto_id or request.GET.get('projeto'),
+            'equipe': request.GET.get('equipe'),
+            'status': request.GET.getlist('status'),
+        }
+        for campo in ('prazo_de', 'prazo_ate'):
+            valor = request.GET.get(campo)
+            if valor:
+                try:
+                    filtros[campo] = parse_date(valor)
+                except ValueError:
+                    filtros[campo] = None
+                if filtros[campo] is None:
+                    return HttpResponseBadRequest(f"Data inválida em {campo}")
+        for campo in ('projeto', 'equipe'):
+            if filtros[campo] and not str(filtros[campo]).isdigit():
+                return HttpResponseBadRequest(f"Valor inválido em {campo}")
 
-class TarefasExportCSSView(LoginRequiredMixin, LeadRequiredMixin, View):
-    def get(self, request, *args, **kwargs):
-        # Checa o projeto ativo do time
-        integrante = request.user.integrantes
-        if not integrante or not integrante.equipe:
-            return HttpResponse("Usuário sem equipe", status=400)
-
-        #Checagem pra ver se a equipe tem projeto ativo
-        active_project = Projetos.objects.filter(
-            equipe=integrante.equipe,
-            status='active'
-        ).first()
+        if projeto_id:
+            projeto = get_object_or_404(Projetos, pk=projeto_id)
+            if not (integrante.role == 'ADMIN' or projeto.criador_id == integrante.pk or
+                    (projeto.equipe_id and projeto.equipe_id == integrante.equipe_id)):
+                return HttpResponseForbidden("Sem permissão para exportar este projeto")
+            nome = projeto.name
+        else:
+            nome = 'exportacao'
 
-        if not active_project:
-            return HttpResponse("Nenhum projeto ativo", status=400)
+        tarefas = exports.filtrar_tarefas(exports.tarefas_visiveis(integrante), **filtros)
+        # o streaming roda depois do dispatch, então o banco de leitura é escolhido aqui
+        tarefas = tarefas.using(router.db_for_read(Tarefas))
 
-        messages.success(self.request, "Download CSV iniciado...")
+        messages.success(self.request, "Download iniciado...")
 
-        # Cria a HttpResponse com header CSV
-        response = HttpResponse(content_type='text/csv')
+        content_type, extensao = exports.FORMATOS[formato]
+        response = StreamingHttpResponse(
+            exports.STREAMS[formato](exports.linhas(tarefas)),
+            content_type=content_type,
+        )
         timestamp = timezone.now().strftime('%Y_%m_%d')
-        filename = f'tarefas_{active_project.name}_{timestamp}.csv'
+        filename = f'tarefas_{nome}_{timestamp}.{extensao}'
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
-        # CSV começa aqui!
-        writer = csv.writer(response)
-
-        # Colunas
-        writer.writerow([
-            'Nome', 'Descrição', 'Status', 'Prioridade',
-            'Responsável', 'Data Criação', 'Prazo Final'
-        ])
-
-        # Linhas
-        tasks = Tarefas.objects.filter(projetoparent=active_project)
-        for task in tasks:
-            writer.writerow([
-                task.name,
-                task.descricao,
-                task.get_status_display(),
-                task.get_prioridade_display(),
-                f"{task.responsavel.nome} {task.responsavel.sobrenome}" if task.responsavel else "Não atribuído",
-                task.inicio.strftime('%d/%m/%Y %H:%M'),
-                task.prazofinal.strftime('%d/%m/%Y') if task.prazofinal else ""
-            ])
-
         # Menssagens
         storage = messages.get_messages(request)
         storage.used = False  #???
 
         return response
+
+
+#--------------- AUDITORIA
+
+def _momento(valor, fim=False):
+    """Data/hora ISO ou AAAA-MM-DD; uma data sozinha em `fim` vale até o fim do dia. None se inválido"""
+    try:
+        dia = parse_date(valor)
+        if dia is not None:
+            momento = datetime.datetime.combine(dia + datetime.timedelta(days=1) if fim else dia, datetime.time())
+        else:
+            momento = parse_datetime(valor)
+            if momento is None:
+                return None
+    except ValueError:
+        return None
+    return timezone.make_aware(momento) if timezone.is_naive(momento) else momento
+
+
+class AuditLogView(ReplicaReadMixin, LoginRequiredMixin, AdminRequiredMixin, KeysetPaginationMixin, ListView):
+    """Navegador da auditoria, só pra ADMIN.
+
+    Filtros: usuario (person_id), action, onde (início do texto, ex.: 'equipe:3'), ip, de e ate
+    (AAAA-MM-DD ou data/hora ISO). Sempre paginado por cursor em (timestamp, id), do mais
+    recente pro mais antigo, e cada filtro tem um índice terminando nessa ordem, então uma
+    página custa o mesmo no primeiro mês ou com dezenas de milhões de linhas.
+
+    No SQLite, depois de auditoria.rollover() os meses anteriores ficam nas tabelas
+    <tabela>_pAAAAMM e o navegador mostra só o mês corrente; os arquivados se consultam
+    direto nessas tabelas. No PostgreSQL as partições fazem parte da tabela e aparecem todas.
+    """
+    model = AuditLog
+    template_name = 'admin/audit_list.html'
+    context_object_name = 'entradas'
+    paginate_by = 50
+    keyset_ordering = ('-timestamp', '-id')
+    keyset_only = True
+    FILTROS = ('usuario', 'action', 'onde', 'ip', 'de', 'ate')
+
+    def get_queryset(self):
+        queryset = AuditLog.objects.select_related('usuario')
+        params = {campo: self.request.GET.get(campo, '').strip() for campo in self.FILTROS}
+
+        if params['usuario']:
+            try:
+                queryset = queryset.filter(usuario_id=uuid.UUID(params['usuario']))
+            except ValueError:
+                return queryset.none()
+        if params['action']:
+            queryset = queryset.filter(action=params['action'])
+        if params['onde']:
+            # mesma faixa do filtro de nome em IntegrantesListaView: usa o índice audit_onde_ts_idx
+            queryset = queryset.filter(**faixa_do_prefixo('onde', params['onde']))
+        if params['ip']:
+            try:
+                queryset = queryset.filter(ip_address=str(ipaddress.ip_address(params['ip'])))
+            except ValueError:
+                return queryset.none()
+        for campo, lookup in (('de', 'timestamp__gte'), ('ate', 'timestamp__lt')):
+            if params[campo]:
+                momento = _momento(params[campo], fim=campo == 'ate')
+                if momento is None:
+                    return queryset.none()
+                queryset = queryset.filter(**{lookup: momento})
+        return queryset.order_by(*self.keyset_ordering)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for campo in self.FILTROS:
+            context[f'current_{campo}'] = self.request.GET.get(campo, '')
+        return context
+
+
+class AuditLogJsonView(AuditLogView):
+    """Mesmos filtros e cursor do navegador, em JSON; ?limite= até 500 por página"""
+
+    def get_paginate_by(self, queryset):
+        try:
+            return min(max(int(self.request.GET.get('limite', self.paginate_by)), 1), 500)
+        except ValueError:
+            return self.paginate_by
+
+    def render_to_response(self, context, **response_kwargs):
+        return JsonResponse({
+            'resultados': [{
+                'id': entrada.id,
+                'timestamp': entrada.timestamp.isoformat(),
+                'usuario': str(entrada.usuario_id) if entrada.usuario_id else None,
+                'usuario_nome': f"{entrada.usuario.nome} {entrada.usuario.sobrenome}" if entrada.usuario else None,
+                'action': entrada.action,
+                'onde': entrada.onde,
+                'ip': entrada.ip_address,
+            } for entrada in context['entradas']],
+            'next_cursor': context['next_cursor'],
+            'prev_cursor': context['prev_cursor'],
+        })
+